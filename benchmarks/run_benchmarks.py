@@ -0,0 +1,526 @@
+"""Performance benchmarks for friendlypics2
+
+Runs headless on the offscreen Qt platform using synthetic images generated with Pillow,
+so results are reproducible on any machine. Results are written as JSON and may be
+compared against a previously saved baseline to detect regressions:
+
+    python benchmarks/run_benchmarks.py --output results.json --compare benchmarks/baseline.json
+
+Use --save-baseline to replace the baseline with the results of the current run. Timings
+are only comparable between runs on the same machine, Python version and Qt binding, so
+the stored baseline should be regenerated whenever any of those change. Regressions
+against a baseline recorded in a different environment are reported but don't cause the
+run to fail.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from copy import deepcopy
+from pathlib import Path
+from types import SimpleNamespace
+
+# These must be set before Qt or the application are imported: the first selects the
+# headless Qt platform plugin, the rest keep the benchmarks away from the user's settings
+# and caches
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+_SANDBOX = tempfile.TemporaryDirectory(prefix="fpics2-bench-")
+for _cur_var in ["XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME"]:
+    os.environ[_cur_var] = os.path.join(_SANDBOX.name, _cur_var.lower())
+
+# pylint: disable=wrong-import-position
+import numpy as np  # noqa: E402
+import qtpy  # noqa: E402
+from PIL import Image  # noqa: E402
+from qtpy.QtCore import QSize, QModelIndex  # noqa: E402
+from qtpy.QtWidgets import QApplication, QListView  # noqa: E402
+from friendlypics2.dialogs.main_window import ImageModel  # noqa: E402
+from friendlypics2.misc.app_settings import AppSettings  # noqa: E402
+from friendlypics2.misc.catalog import Catalog  # noqa: E402
+from friendlypics2.misc.filename_filter import FilenameFilterModel  # noqa: E402
+from friendlypics2.misc.folder_scanner import FolderScanner  # noqa: E402
+from friendlypics2.misc.gui_helpers import estimate_capacity  # noqa: E402
+from friendlypics2.misc.image_decoder import decode_region, decode_thumbnail  # noqa: E402
+from friendlypics2.misc.similarity import EmbeddingStore, EMBEDDING_SIZE  # noqa: E402
+from friendlypics2.misc.thumbnail_cache import MemoryThumbnailCache  # noqa: E402
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader  # noqa: E402
+from friendlypics2.misc.tile_loader import ImagePyramid  # noqa: E402
+from friendlypics2.version import __version__  # noqa: E402
+
+#: Version of the layout of the results file
+RESULTS_VERSION = 1
+# Number of files in the folders used to benchmark the image model
+MODEL_SIZES = [1000, 10000, 100000]
+# Model sizes skipped when running a quick benchmark
+SLOW_MODEL_SIZES = [100000]
+# File formats and extensions of the images used to benchmark thumbnail generation
+THUMBNAIL_FORMATS = [("JPEG", ".jpg"), ("PNG", ".png"), ("WEBP", ".webp"), ("TIFF", ".tif"),
+                     ("BMP", ".bmp"), ("GIF", ".gif")]
+# Dimensions of the images used to benchmark thumbnail generation
+SOURCE_SIZES = [(800, 600), (4000, 3000)]
+# Resolutions thumbnails are generated at, matching screens with a scale factor of 1 and 2
+THUMBNAIL_SIZES = [100, 200]
+# Dimensions of the image used to benchmark decoding tiles for the image viewer
+TILED_SOURCE_SIZE = (8000, 6000)
+# Query typed one character at a time to benchmark filtering images by file name. Matches
+# every image in the folder until the last few characters
+FILTER_QUERY = "img_000"
+# Number of embeddings in the libraries used to benchmark similarity searches
+SIMILARITY_SIZES = [100000, 1000000]
+# Library sizes skipped when running a quick benchmark
+SLOW_SIMILARITY_SIZES = [1000000]
+# Number of images in the folder similarity searches are limited to
+SIMILARITY_FOLDER_SIZE = 10000
+# Number of similar images to find
+SIMILARITY_RESULTS = 100
+# Number of settings added to the settings file used to benchmark loading and saving settings
+SETTINGS_ENTRIES = 2000
+# Default amount, as a fraction, by which a benchmark may be slower than its baseline
+DEFAULT_TOLERANCE = 0.5
+# Differences smaller than this, in seconds, are too small to measure reliably and are ignored
+MIN_SIGNIFICANT = 0.002
+# Maximum amount of time, in seconds, to wait for the event loop to finish a task
+EVENT_TIMEOUT = 600
+# Properties of the results that must match those of the baseline for regressions to fail the run
+ENVIRONMENT_KEYS = ["python", "qt", "machine", "cpu_count"]
+
+
+class Runner:
+    """Times benchmarks and collects their results"""
+    def __init__(self, repeat, fixtures, prefix=""):
+        """
+        Args:
+            repeat (int): number of times to run each benchmark
+            fixtures (pathlib.Path): folder to generate the test images in
+            prefix (str): only run benchmarks whose names start with this
+        """
+        self._repeat = repeat
+        self._prefix = prefix
+        self.fixtures = fixtures
+        self.results = dict()
+
+    def selected(self, group):
+        """Checks whether any of a group of benchmarks will be run
+
+        Args:
+            group (str): common prefix of the names of the benchmarks in the group
+
+        Returns:
+            bool: True if at least one benchmark in the group may be run
+        """
+        return group.startswith(self._prefix) or self._prefix.startswith(group)
+
+    def time(self, name, func, setup=None, teardown=None, repeat=None):
+        """Times a benchmark, recording the median and fastest run
+
+        Args:
+            name (str): unique identifier for the benchmark
+            func (callable): code to benchmark. Receives whatever setup returns.
+            setup (callable): optional code to run, untimed, before each run
+            teardown (callable): optional code to run, untimed, after each run.
+                Receives whatever setup returns.
+            repeat (int): optional number of runs, overriding the default
+        """
+        if not name.startswith(self._prefix):
+            return
+        timings = list()
+        for _ in range(repeat or self._repeat):
+            context = setup() if setup else None
+            start = time.perf_counter()
+            func(context)
+            timings.append(time.perf_counter() - start)
+            if teardown:
+                teardown(context)
+        self.results[name] = {
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "runs": len(timings),
+        }
+        print(f"{name:<40} {self.results[name]['median'] * 1000:10.2f} ms", flush=True)
+
+
+def _wait_for(condition):
+    """Runs the Qt event loop until a condition is met
+
+    Args:
+        condition (callable): returns True once we should stop waiting
+    """
+    app = QApplication.instance()
+    deadline = time.monotonic() + EVENT_TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Timed out waiting for the event loop")
+        app.processEvents()
+
+
+def _make_folder(fixtures, count):
+    """Generates a folder containing empty image files. The image model never reads the
+    contents of the files, so empty files are enough to benchmark it.
+
+    Args:
+        fixtures (pathlib.Path): folder to create the new folder in
+        count (int): number of files to create
+
+    Returns:
+        pathlib.Path: the folder that was generated
+    """
+    folder = fixtures.joinpath(f"model_{count}")
+    if not folder.exists():
+        folder.mkdir()
+        for cur_index in range(count):
+            folder.joinpath(f"IMG_{cur_index:06}.jpg").touch()
+    return folder
+
+
+def _make_image(fixtures, image_format, extension, size):
+    """Generates a synthetic photo like image, with smooth gradients and fine noise so it
+    compresses like a real photo
+
+    Args:
+        fixtures (pathlib.Path): folder to create the image in
+        image_format (str): Pillow name of the file format to save the image in
+        extension (str): file extension for the image
+        size (tuple (int, int)): width and height of the image
+
+    Returns:
+        pathlib.Path: the image that was generated
+    """
+    file_path = fixtures.joinpath(f"image_{size[0]}x{size[1]}{extension}")
+    if not file_path.exists():
+        red = Image.linear_gradient("L").resize(size)
+        green = Image.radial_gradient("L").resize(size)
+        blue = Image.effect_noise(size, 48)
+        image = Image.merge("RGB", (red, green, blue))
+        if image_format == "GIF":
+            image = image.quantize(256)
+        image.save(file_path, image_format)
+    return file_path
+
+
+def _create_model(folder):
+    """Creates an image model for a folder, without starting its scan
+
+    Args:
+        folder (pathlib.Path): folder the model is to present
+
+    Returns:
+        ImageModel: the new model
+    """
+    loader = ThumbnailLoader(1, 256)
+    return ImageModel(folder, loader, MemoryThumbnailCache(64 * 1024 * 1024), FolderScanner(folder))
+
+
+def _load_model(model):
+    """Populates an image model, waiting for the scan of its folder to finish
+
+    Args:
+        model (ImageModel): model to populate
+    """
+    finished = list()
+    model.scan_finished.connect(finished.append)
+    model.start_scan()
+    _wait_for(lambda: finished)
+
+
+def bench_image_model(runner, sizes):
+    """Times populating an image model from folders of various sizes
+
+    Args:
+        runner (Runner): collects the results
+        sizes (list (int)): number of files in each of the folders to benchmark
+    """
+    for cur_size in sizes:
+        folder = _make_folder(runner.fixtures, cur_size)
+        runner.time(f"image_model/{cur_size}", _load_model,
+                    setup=lambda folder=folder: _create_model(folder),
+                    teardown=lambda model: model.close())
+
+
+def bench_fetch_more(runner, sizes):
+    """Times scrolling a thumbnail view to the end of image models of various sizes, which
+    exercises the cascade of fetchMore calls used to lazily reveal the images
+
+    Args:
+        runner (Runner): collects the results
+        sizes (list (int)): number of files in each of the models to benchmark
+    """
+    view = QListView()
+    view.setViewMode(QListView.IconMode)
+    view.setIconSize(QSize(100, 100))
+    view.setUniformItemSizes(True)
+    view.resize(1024, 768)
+    view.show()
+
+    def setup(folder):
+        model = _create_model(folder)
+        _load_model(model)
+        view.setModel(model)
+        model.set_viewport_capacity(estimate_capacity(view))
+        return model
+
+    def scroll_to_end(model):
+        while model.canFetchMore(QModelIndex()):
+            view.scrollToBottom()
+            QApplication.instance().processEvents()
+
+    def teardown(model):
+        view.setModel(None)
+        model.close()
+
+    for cur_size in sizes:
+        folder = _make_folder(runner.fixtures, cur_size)
+        # the view lays out every revealed row again as each batch arrives, so scrolling through
+        # the largest models takes minutes and is only run once
+        repeat = 1 if cur_size in SLOW_MODEL_SIZES else None
+        runner.time(f"fetch_more/{cur_size}", scroll_to_end, lambda folder=folder: setup(folder), teardown, repeat)
+    view.close()
+
+
+def bench_filename_filter(runner, sizes):
+    """Times filtering image models of various sizes by file name as the query is typed,
+    and checking whether there are more matching images for the view to fetch
+
+    Args:
+        runner (Runner): collects the results
+        sizes (list (int)): number of files in each of the models to benchmark
+    """
+    def type_query(proxy):
+        for cur_length in range(1, len(FILTER_QUERY) + 1):
+            proxy.set_query(FILTER_QUERY[:cur_length])
+
+    def can_fetch_more(proxy):
+        for _ in range(100):
+            proxy.canFetchMore(QModelIndex())
+
+    for cur_size in sizes:
+        if not runner.selected(f"filename_filter/{cur_size}/"):
+            continue
+        model = _create_model(_make_folder(runner.fixtures, cur_size))
+        _load_model(model)
+        proxy = FilenameFilterModel()
+        proxy.setSourceModel(model)
+        runner.time(f"filename_filter/{cur_size}/type", type_query,
+                    setup=lambda proxy=proxy: proxy.set_query("") or proxy)
+        proxy.set_query(FILTER_QUERY[:-2])
+        runner.time(f"filename_filter/{cur_size}/can_fetch_more_x100", can_fetch_more, setup=lambda proxy=proxy: proxy)
+        proxy.setSourceModel(None)
+        model.close()
+
+
+def bench_thumbnails(runner):
+    """Times generating thumbnails from images of various formats and sizes
+
+    Args:
+        runner (Runner): collects the results
+    """
+    for cur_format, cur_extension in THUMBNAIL_FORMATS:
+        for cur_source in SOURCE_SIZES:
+            file_path = _make_image(runner.fixtures, cur_format, cur_extension, cur_source)
+            for cur_size in THUMBNAIL_SIZES:
+                size = QSize(cur_size, cur_size)
+                name = f"thumbnail/{cur_format.lower()}/{cur_source[0]}x{cur_source[1]}/{cur_size}"
+                runner.time(name, lambda _, file_path=file_path, size=size: decode_thumbnail(file_path, size))
+
+
+def bench_tiles(runner):
+    """Times decoding rows of tiles from a large JPEG at the top, bottom and coarsest
+    levels of its pyramid, as done by the image viewer
+
+    Args:
+        runner (Runner): collects the results
+    """
+    file_path = _make_image(runner.fixtures, "JPEG", ".jpg", TILED_SOURCE_SIZE)
+    pyramid = ImagePyramid.from_file(file_path)
+    coarsest = pyramid.level_count - 1
+    columns, rows = pyramid.tile_grid(0)
+    for name, level, row in [("top", 0, 0), ("bottom", 0, rows - 1), ("coarsest", coarsest, 0)]:
+        last_column = columns - 1 if level == 0 else 0
+        clip = pyramid.tile_rect(level, 0, row).united(pyramid.tile_rect(level, last_column, row))
+        runner.time(f"tiles/{name}_row", lambda _, level=level, clip=clip: decode_region(
+            file_path, pyramid.level_size(level), clip))
+
+
+def bench_similarity(runner, sizes):
+    """Times searching libraries of various sizes for similar images, across the whole library
+    and limited to the images in one folder, as done when browsing a folder
+
+    Args:
+        runner (Runner): collects the results
+        sizes (list (int)): number of embeddings in each of the libraries to benchmark
+    """
+    rng = np.random.default_rng(0)
+    stats = SimpleNamespace(st_size=1, st_mtime_ns=1)
+    folder = Path(_SANDBOX.name, "similarity")
+    folder.mkdir(exist_ok=True)
+    for cur_size in sizes:
+        # filling the larger libraries takes a while, so only do it if they will be searched
+        if not runner.selected(f"similarity/{cur_size}/"):
+            continue
+        store = EmbeddingStore(folder.joinpath(f"{cur_size}.npy"), Catalog(folder.joinpath(f"{cur_size}.db")))
+        paths = [f"/library/{cur // SIMILARITY_FOLDER_SIZE:04}/IMG_{cur:07}.jpg" for cur in range(cur_size)]
+        for cur_start in range(0, cur_size, SIMILARITY_FOLDER_SIZE):
+            vectors = rng.random((SIMILARITY_FOLDER_SIZE, EMBEDDING_SIZE), np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            store.add([(cur_path, stats, cur_vector)
+                       for cur_path, cur_vector in zip(paths[cur_start:cur_start + SIMILARITY_FOLDER_SIZE], vectors)])
+        query = store.get(paths[0])
+        folder_paths = frozenset(paths[:SIMILARITY_FOLDER_SIZE])
+        library_paths = frozenset(paths)
+        runner.time(f"similarity/{cur_size}/library", lambda _, store=store, query=query: store.nearest(
+            query, SIMILARITY_RESULTS, paths[0]))
+        # the first search limited to a set of images works out which rows belong to them,
+        # later searches limited to the same images reuse them
+        for cur_name, cur_candidates in [("folder", folder_paths), ("library_mode", library_paths)]:
+            runner.time(f"similarity/{cur_size}/new_{cur_name}", lambda candidates, store=store, query=query:
+                        store.nearest(query, SIMILARITY_RESULTS, paths[0], candidates),
+                        setup=lambda candidates=cur_candidates: frozenset(list(candidates)))
+            store.nearest(query, SIMILARITY_RESULTS, paths[0], cur_candidates)
+            runner.time(f"similarity/{cur_size}/{cur_name}",
+                        lambda _, store=store, query=query, candidates=cur_candidates:
+                        store.nearest(query, SIMILARITY_RESULTS, paths[0], candidates))
+        store.catalog.close()
+
+
+def bench_app_settings(runner):
+    """Times loading and saving the application settings
+
+    Args:
+        runner (Runner): collects the results
+    """
+    settings = AppSettings()
+    data = deepcopy(settings.data)
+    data["benchmark"] = {f"entry_{cur}": {"name": f"value {cur}", "values": [cur, cur * 2]}
+                         for cur in range(SETTINGS_ENTRIES)}
+    settings.data = data
+    settings.save()
+    runner.time("app_settings/load", lambda _: AppSettings())
+    runner.time("app_settings/save", lambda _: settings.save(force=True))
+    runner.time("app_settings/save_unchanged", lambda _: settings.save())
+
+
+def compare(results, baseline, tolerance):
+    """Compares benchmark results against a baseline, reporting any regressions
+
+    Args:
+        results (dict): results of the current run
+        baseline (dict): results of a previous run to compare against
+        tolerance (float): amount, as a fraction, by which a benchmark may be slower than
+            its baseline before it is considered to have regressed
+
+    Returns:
+        list (str): names of the benchmarks that have regressed
+    """
+    regressions = list()
+    print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for cur_name, cur_result in sorted(results.items()):
+        expected = baseline.get(cur_name)
+        if expected is None:
+            print(f"{cur_name:<40} {'-':>10} {cur_result['median'] * 1000:10.2f}")
+            continue
+        change = cur_result["median"] / expected["median"] - 1 if expected["median"] else 0
+        regressed = change > tolerance and cur_result["median"] - expected["median"] > MIN_SIGNIFICANT
+        if regressed:
+            regressions.append(cur_name)
+        print(f"{cur_name:<40} {expected['median'] * 1000:10.2f} {cur_result['median'] * 1000:10.2f} "
+              f"{change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def environment():
+    """dict: describes the environment the benchmarks are run in"""
+    return {
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "qt": f"{qtpy.API_NAME} {qtpy.QT_VERSION}",
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def environment_differences(results, baseline):
+    """Finds the ways in which the environment a baseline was recorded in differs from the current one
+
+    Args:
+        results (dict): output of the current run
+        baseline (dict): output of the run the baseline was recorded from
+
+    Returns:
+        list (str): description of each difference
+    """
+    return [f"{cur_key} {baseline.get(cur_key, 'unknown')} != {results[cur_key]}"
+            for cur_key in ENVIRONMENT_KEYS if baseline.get(cur_key) != results[cur_key]]
+
+
+def main(args=None):
+    """Entry point for the benchmark suite
+
+    Args:
+        args (list): command line arguments, excluding the program name
+
+    Returns:
+        int: return code to report back to the shell with
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", type=Path, help="file to write the results to")
+    parser.add_argument("--compare", type=Path, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", type=Path, help="file to save the results to as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="fraction by which a benchmark may be slower than the baseline (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of times to run each benchmark")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"skip models with {SLOW_MODEL_SIZES} files and libraries with "
+                             f"{SLOW_SIMILARITY_SIZES} images")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose names start with this")
+    parser.add_argument("--fixtures", type=Path,
+                        help="folder to generate the test images in, so they may be reused between runs")
+    options = parser.parse_args(args)
+
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    app.setOrganizationName("The Friendly Coder")
+    app.setApplicationName("Friendly Pics 2 Benchmarks")
+
+    fixtures = options.fixtures or Path(_SANDBOX.name, "fixtures")
+    fixtures.mkdir(parents=True, exist_ok=True)
+    runner = Runner(max(1, options.repeat), fixtures, options.filter)
+    sizes = [cur for cur in MODEL_SIZES if not (options.quick and cur in SLOW_MODEL_SIZES)]
+    bench_image_model(runner, sizes)
+    bench_fetch_more(runner, sizes)
+    bench_filename_filter(runner, sizes)
+    bench_thumbnails(runner)
+    bench_tiles(runner)
+    bench_similarity(runner, [cur for cur in SIMILARITY_SIZES if not (options.quick and cur in SLOW_SIMILARITY_SIZES)])
+    bench_app_settings(runner)
+
+    output = {
+        "version": RESULTS_VERSION,
+        "friendlypics2": __version__,
+        "platform": platform.platform(),
+        "results": runner.results,
+    }
+    output.update(environment())
+    for cur_path in filter(None, [options.output, options.save_baseline]):
+        cur_path.write_text(json.dumps(output, indent=4, sort_keys=True))
+
+    if options.compare:
+        if not options.compare.exists():
+            print(f"\nNo baseline found at {options.compare}, skipping comparison")
+            return 0
+        baseline = json.loads(options.compare.read_text())
+        regressions = compare(runner.results, baseline.get("results", dict()), options.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks are more than {options.tolerance:.0%} slower than the baseline")
+            differences = environment_differences(output, baseline)
+            if differences:
+                print(f"The baseline was recorded in a different environment ({', '.join(differences)}), "
+                      "so the regressions are not treated as failures. Record a new baseline with "
+                      "--save-baseline to enable regression checks.")
+                return 0
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,9 @@ a = Analysis(['src/friendlypics2/scripts/fpics2.py'],
              pathex=['src/friendlypics2'],
              binaries=[],
              datas=[('./src/friendlypics2/data/ui/*', 'friendlypics2/data/ui')],
-             hiddenimports=['PySide2.QtXml'],
+             # compiled forms are imported dynamically by gui_helpers.load_ui
+             hiddenimports=['PySide2.QtXml', 'friendlypics2.forms.about_dlg_ui', 'friendlypics2.forms.main_window_ui',
+                            'friendlypics2.forms.settings_dlg_ui'],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
@@ -0,0 +1,308 @@
+"""Headless commands for preparing a library ahead of time, such as overnight from cron
+
+Each command walks a tree of folders and processes the images it finds on a pool of
+worker processes, without creating any windows:
+
+* index: records the metadata for each image in the catalog
+* thumbs: generates the thumbnail for each image in the thumbnail cache
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from qtpy.QtCore import QSize
+from friendlypics2.misc.app_settings import AppSettings
+from friendlypics2.misc.catalog import Catalog, default_catalog_path, read_metadata, UPDATE_BATCH_SIZE
+from friendlypics2.misc.file_types import FileClassifier
+from friendlypics2.misc.image_decoder import decode_thumbnail, thumbnail_pixel_size
+from friendlypics2.misc.library_walker import walk_library
+from friendlypics2.misc.thumbnail_cache import DiskThumbnailCache, default_cache_folder
+from friendlypics2.misc.thumbnail_loader import DEFAULT_THUMBNAIL_SIZE
+
+#: Names of the supported commands
+BATCH_COMMANDS = ["index", "thumbs"]
+# Minimum amount of time, in seconds, between progress reports
+REPORT_INTERVAL = 5.0
+# Number of images handed to a worker process at a time
+CHUNK_SIZE = 16
+
+# Outcomes of processing a single image
+PROCESSED = "processed"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# Thumbnail cache used by each worker process, created when the worker starts
+_WORKER_CACHE = None
+
+
+class Progress:
+    """Tracks and reports the progress of a batch command"""
+    def __init__(self, action, total, output=None):
+        """
+        Args:
+            action (str): description of the work being done, such as "Indexed"
+            total (int): number of images to process
+            output (file): stream to write reports to. Defaults to the current standard output.
+        """
+        self._action = action
+        self._total = total
+        self._output = output if output is not None else sys.stdout
+        self._counts = {PROCESSED: 0, SKIPPED: 0, FAILED: 0}
+        self._start = time.monotonic()
+        self._last_report = self._start
+
+    @property
+    def done(self):
+        """int: number of images handled so far, whatever their outcome"""
+        return sum(self._counts.values())
+
+    @property
+    def failed(self):
+        """int: number of images that could not be processed"""
+        return self._counts[FAILED]
+
+    def update(self, outcome):
+        """Records the outcome of processing an image, reporting progress periodically
+
+        Args:
+            outcome (str): one of PROCESSED, SKIPPED or FAILED
+        """
+        self._counts[outcome] += 1
+        now = time.monotonic()
+        if now - self._last_report >= REPORT_INTERVAL:
+            self._last_report = now
+            elapsed = now - self._start
+            rate = self.done / elapsed
+            remaining = (self._total - self.done) / rate if rate else 0
+            percent = 100 * self.done / self._total if self._total else 100
+            self._write(f"{self.done} of {self._total} images ({percent:.1f}%), "
+                        f"{rate:.1f} images/s, {remaining:.0f}s remaining")
+
+    def summary(self, completed=True):
+        """Writes the final results of the command
+
+        Args:
+            completed (bool): False if the command was interrupted before it finished
+        """
+        elapsed = max(time.monotonic() - self._start, 1e-6)
+        status = "Finished" if completed else "Interrupted"
+        self._write(f"{status} in {elapsed:.1f}s: {self._action} {self._counts[PROCESSED]}, "
+                    f"skipped {self._counts[SKIPPED]}, failed {self._counts[FAILED]} "
+                    f"of {self._total} images ({self.done / elapsed:.1f} images/s)")
+
+    def _write(self, message):
+        """Writes a message to our output stream"""
+        print(message, file=self._output, flush=True)
+
+
+def _read_metadata(file_path):
+    """Extracts the catalog metadata for an image. Executed in a worker process.
+
+    Args:
+        file_path (pathlib.Path): path to the image
+
+    Returns:
+        tuple (str, CatalogRecord): outcome, and the metadata if it could be read
+    """
+    try:
+        return PROCESSED, read_metadata(file_path, os.stat(file_path))
+    except OSError:
+        return FAILED, None
+
+
+def _init_thumbnail_worker(cache_folder, max_bytes):
+    """Prepares a worker process to generate thumbnails
+
+    Args:
+        cache_folder (pathlib.Path): location of the thumbnail cache
+        max_bytes (int): maximum amount of disk space the cache may use
+    """
+    global _WORKER_CACHE  # pylint: disable=global-statement
+    _WORKER_CACHE = DiskThumbnailCache(cache_folder, max_bytes)
+
+
+def _generate_thumbnail(task):
+    """Generates the thumbnail for an image and saves it in the cache. Executed in a worker process.
+
+    Args:
+        task (tuple): path to the image, width and height of the thumbnail in device pixels,
+            and whether to skip images that already have a thumbnail in the cache
+
+    Returns:
+        str: outcome of generating the thumbnail
+    """
+    file_path, width, height, resume = task
+    pixel_size = QSize(width, height)
+    try:
+        stats = os.stat(file_path)
+    except OSError:
+        return FAILED
+    key = _WORKER_CACHE.make_key(file_path, stats.st_size, stats.st_mtime_ns, pixel_size)
+    if resume and key in _WORKER_CACHE:
+        return SKIPPED
+    image = decode_thumbnail(file_path, pixel_size)
+    if image.isNull():
+        return FAILED
+    _WORKER_CACHE.put(key, image)
+    return PROCESSED
+
+
+def _find_images(folder, settings):
+    """Walks a library, reporting how many images were found
+
+    Args:
+        folder (pathlib.Path): root of the library
+        settings (AppSettings): settings controlling which files and folders are included
+
+    Returns:
+        list (pathlib.Path): paths to all images in the library
+    """
+    start = time.monotonic()
+    retval = list(walk_library(folder, settings.library_max_depth, settings.library_exclude,
+                               FileClassifier(settings.image_formats)))
+    print(f"Found {len(retval)} images in {folder} in {time.monotonic() - start:.1f}s", flush=True)
+    return retval
+
+
+def index_library(folder, jobs, resume, settings):
+    """Records the metadata for every image in a library in the catalog
+
+    Args:
+        folder (pathlib.Path): root of the library
+        jobs (int): number of worker processes to use
+        resume (bool): True to skip images whose catalog entries are already up to date
+        settings (AppSettings): settings controlling which files and folders are included
+
+    Returns:
+        Progress: the results of the command
+    """
+    catalog = Catalog(default_catalog_path())
+    paths = _find_images(folder, settings)
+    progress = Progress("indexed", len(paths))
+
+    pending = list()
+    if resume:
+        known = {cur.path: cur for cur in catalog.list_folder(folder, recursive=True)}
+        for cur_path in paths:
+            record = known.get(str(cur_path))
+            try:
+                stats = os.stat(cur_path)
+            except OSError:
+                progress.update(FAILED)
+                continue
+            if record and record.size == stats.st_size and record.mtime_ns == stats.st_mtime_ns:
+                progress.update(SKIPPED)
+            else:
+                pending.append(cur_path)
+    else:
+        pending = paths
+
+    batch = list()
+    completed = False
+    try:
+        with multiprocessing.Pool(jobs) as pool:
+            for outcome, record in pool.imap_unordered(_read_metadata, pending, CHUNK_SIZE):
+                progress.update(outcome)
+                if record is not None:
+                    batch.append(record)
+                if len(batch) >= UPDATE_BATCH_SIZE:
+                    catalog.update(batch)
+                    batch = list()
+        completed = True
+    finally:
+        # keep whatever was indexed before an interruption, so the next run can resume
+        catalog.update(batch)
+        catalog.close()
+        progress.summary(completed)
+    return progress
+
+
+def build_thumbnails(folder, jobs, resume, settings, device_pixel_ratio):
+    """Generates the thumbnail for every image in a library in the thumbnail cache
+
+    Each worker process manages the cache independently, so the cache may briefly grow
+    beyond its size limit until the application next trims it.
+
+    Args:
+        folder (pathlib.Path): root of the library
+        jobs (int): number of worker processes to use
+        resume (bool): True to skip images that already have a thumbnail in the cache
+        settings (AppSettings): settings controlling which files and folders are included
+        device_pixel_ratio (float): ratio of device pixels to logical pixels on the
+            screen the thumbnails will be shown on
+
+    Returns:
+        Progress: the results of the command
+    """
+    paths = _find_images(folder, settings)
+    progress = Progress("generated", len(paths))
+    pixel_size = thumbnail_pixel_size(DEFAULT_THUMBNAIL_SIZE, device_pixel_ratio)
+    completed = False
+    try:
+        initargs = (default_cache_folder(), settings.thumbnail_cache_mb * 1024 * 1024)
+        with multiprocessing.Pool(jobs, _init_thumbnail_worker, initargs) as pool:
+            tasks = ((cur_path, pixel_size.width(), pixel_size.height(), resume) for cur_path in paths)
+            for outcome in pool.imap_unordered(_generate_thumbnail, tasks, CHUNK_SIZE):
+                progress.update(outcome)
+        completed = True
+    finally:
+        progress.summary(completed)
+    return progress
+
+
+def build_parser():
+    """argparse.ArgumentParser: generates the parser for the batch command line options"""
+    parser = argparse.ArgumentParser(prog="fpics2", description="Prepares a library of images without the GUI")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+    for cur_name, cur_help in [("index", "record the metadata for each image in the catalog"),
+                               ("thumbs", "generate the thumbnail for each image")]:
+        command = commands.add_parser(cur_name, help=cur_help, description=cur_help)
+        command.add_argument("folder", type=Path, help="root folder of the library to process")
+        command.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                             help="number of worker processes (default: %(default)s)")
+        command.add_argument("--resume", action="store_true",
+                             help="skip images that were processed by a previous run and haven't changed")
+        if cur_name == "thumbs":
+            command.add_argument("--device-pixel-ratio", type=float, default=1.0,
+                                 help="scale factor of the screen the thumbnails are for (default: %(default)s)")
+    return parser
+
+
+def run_batch(args):
+    """Entry point for the batch commands
+
+    Args:
+        args (list): command line arguments, excluding the program name
+
+    Returns:
+        int: return code to report back to the shell with
+    """
+    options = build_parser().parse_args(args)
+    logging.basicConfig(level=logging.WARNING)
+    folder = options.folder.absolute()
+    if not folder.is_dir():
+        print(f"{folder} is not a folder", file=sys.stderr)
+        return 2
+
+    settings = AppSettings()
+    jobs = max(1, options.jobs)
+    try:
+        if options.command == "index":
+            progress = index_library(folder, jobs, options.resume, settings)
+        else:
+            progress = build_thumbnails(folder, jobs, options.resume, settings, options.device_pixel_ratio)
+    except KeyboardInterrupt:
+        return 130
+    except sqlite3.Error as err:
+        print(f"Unable to update catalog: {err}", file=sys.stderr)
+        return 1
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_batch(sys.argv[1:]))
@@ -9,11 +9,12 @@ from friendlypics2.misc.app_helpers import is_mac_app_bundle, is_pyinstaller_bun
 
 class AboutDialog(QDialog):  # pylint: disable=too-many-instance-attributes
     """Logic for managing about box"""
-    def __init__(self, parent, app_settings):
+    def __init__(self, parent, app_settings, thumbnail_cache):
         super().__init__(parent)
         self._log = logging.getLogger(__name__)
         self._settings = QSettings()
         self._app_settings = app_settings
+        self._thumbnail_cache = thumbnail_cache
         self._load_ui()
         # Flag indicating whether the user has requested the GUI settings to be reset.
         # If so, the caller should disable any further settings recording logic
@@ -43,10 +44,30 @@ class AboutDialog(QDialog):  # pylint: disable=too-many-instance-attributes
         self.app_settings_label = self.findChild(QLabel, "app_settings_label")
         self.app_settings_label.setText(f"<b>App Settings:</b> {self._app_settings.path}")
 
+        self.thumbnail_cache_label = self.findChild(QLabel, "thumbnail_cache_label")
+        self._update_thumbnail_cache_label()
+
+        self.thumbnail_cache_clear_button = self.findChild(QPushButton, "thumbnail_cache_clear_button")
+        self.thumbnail_cache_clear_button.clicked.connect(self._clear_thumbnail_cache)
+
         # Center the about box on the parent window
         parent_geom = self.parent().geometry()
         self.move(parent_geom.center() - self.rect().center())
 
+    def _update_thumbnail_cache_label(self):
+        """Displays the location and current size of the thumbnail cache"""
+        used_mb = self._thumbnail_cache.total_bytes / (1024 * 1024)
+        max_mb = self._thumbnail_cache.max_bytes / (1024 * 1024)
+        self.thumbnail_cache_label.setText(
+            f"<b>Thumbnail Cache:</b> {self._thumbnail_cache.path} ({used_mb:.1f} of {max_mb:.0f} MB)")
+
+    @Slot()
+    def _clear_thumbnail_cache(self):
+        """Callback for when user selects the clear thumbnail cache button"""
+        self._thumbnail_cache.clear()
+        self._update_thumbnail_cache_label()
+        self.thumbnail_cache_clear_button.setEnabled(False)
+
     @Slot()
     def _clear_gui_settings(self):
         """Callback for when user selects the clear gui settings button"""
@@ -0,0 +1,370 @@
+"""Window for looking at a single image at full resolution"""
+import logging
+from qtpy.QtCore import Qt, QPointF, QRectF, Signal, Slot
+from qtpy.QtGui import QPainter, QPixmap, QTransform
+from qtpy.QtWidgets import QLabel, QMainWindow, QWidget
+from friendlypics2.misc.thumbnail_cache import MemoryThumbnailCache
+from friendlypics2.misc.tile_loader import ImagePyramid, TileLoader, REGIONLESS_SOURCE_LIMIT, TILE_SIZE
+from friendlypics2.misc import instrumentation
+
+# Factor the zoom changes by for each step of the mouse wheel, or each press of a zoom key
+ZOOM_STEP = 1.25
+# Maximum zoom, in screen pixels per pixel of the image
+MAX_ZOOM = 16.0
+# Fraction of the window the view moves by when panning with the arrow keys
+PAN_STEP = 0.1
+
+
+class TiledImageView(QWidget):
+    """Widget that shows an image at any zoom, drawing it from tiles decoded in the background
+
+    Only the tiles covering the visible part of the image are decoded, at the level of the
+    image pyramid closest to the current zoom. Until they are ready, the area they cover is
+    drawn from any coarser tiles that are already in memory, so panning and zooming never
+    wait for the decoder. The image may be dragged with the mouse and zoomed with the wheel.
+    """
+    #: Signal emitted when the zoom changes, providing the number of screen pixels per pixel of the image
+    zoom_changed = Signal(float)
+
+    def __init__(self, cache_bytes, worker_count, parent=None):
+        """
+        Args:
+            cache_bytes (int):
+                maximum amount of memory used to hold decoded tiles
+            worker_count (int):
+                number of worker threads used to decode tiles
+            parent (QWidget):
+                optional widget that owns this one
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._file_path = None
+        self._pyramid = None
+        self._zoom = 1.0
+        # point of the upright image, in full resolution pixels, shown at the center of the widget
+        self._center = QPointF()
+        # True while the zoom follows the size of the widget, so the whole image is visible
+        self._fit = True
+        self._drag_start = None
+        self._tiles = MemoryThumbnailCache(cache_bytes)
+        self._loader = TileLoader(worker_count, self)
+        self._loader.tiles_ready.connect(self._tiles_ready)
+
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setCursor(Qt.OpenHandCursor)
+
+    @property
+    def file_path(self):
+        """pathlib.Path: image being shown, or None if no image is shown"""
+        return self._file_path
+
+    @property
+    def pyramid(self):
+        """ImagePyramid: layout of the image being shown, or None if no image is shown"""
+        return self._pyramid
+
+    @property
+    def zoom(self):
+        """float: number of screen pixels per pixel of the image"""
+        return self._zoom
+
+    def set_image(self, file_path):
+        """Shows an image, zoomed to fit the widget
+
+        Args:
+            file_path (pathlib.Path): path to the image to show
+
+        Returns:
+            bool: True if the image could be read, False if not or if it is too large to decode
+        """
+        self.clear()
+        pyramid = ImagePyramid.from_file(file_path)
+        if pyramid is None:
+            return False
+        if not pyramid.decodable:
+            self._log.warning(f"Unable to show {file_path}: its format must be decoded at full resolution, "
+                              f"which needs more than {REGIONLESS_SOURCE_LIMIT * 4 // (1024 * 1024)}MB")
+            return False
+        self._file_path = file_path
+        self._pyramid = pyramid
+        self._loader.set_image(file_path, pyramid)
+        self.zoom_to_fit()
+        return True
+
+    def clear(self):
+        """Stops showing the current image, releasing the memory used by its tiles"""
+        self._file_path = None
+        self._pyramid = None
+        self._loader.clear()
+        self._tiles.clear()
+        self.update()
+
+    def shutdown(self):
+        """Releases the current image and waits for the tiles being decoded to finish"""
+        self.clear()
+        self._loader.shutdown()
+
+    def zoom_to_fit(self):
+        """Zooms the image so it fits in the widget, and keeps it fitted when the widget is resized"""
+        self._fit = True
+        if self._pyramid is None:
+            return
+        self._zoom = self._fit_zoom()
+        size = self._pyramid.display_size
+        self._center = QPointF(size.width() / 2, size.height() / 2)
+        self._view_changed()
+
+    def set_zoom(self, zoom, anchor=None):
+        """Changes the zoom, keeping the part of the image under a given point in place
+
+        Args:
+            zoom (float): number of screen pixels per pixel of the image
+            anchor (QPointF): point in the widget to zoom around. Defaults to the center of the widget
+        """
+        if self._pyramid is None:
+            return
+        zoom = max(min(self._fit_zoom(), 1.0), min(MAX_ZOOM, zoom))
+        if anchor is None:
+            anchor = QPointF(self.width() / 2, self.height() / 2)
+        offset = anchor - QPointF(self.width() / 2, self.height() / 2)
+        point = self._center + offset / self._zoom
+        self._fit = False
+        self._zoom = zoom
+        self._center = point - offset / zoom
+        self._view_changed()
+
+    def _fit_zoom(self):
+        """float: zoom at which the whole image fits in the widget. Images are never enlarged to fit"""
+        size = self._pyramid.display_size
+        return min(1.0, max(1, self.width()) / size.width(), max(1, self.height()) / size.height())
+
+    def _image_transform(self):
+        """QTransform: maps points in the image, as stored in the file, to points in the widget"""
+        view = QTransform()
+        view.translate(self.width() / 2, self.height() / 2)
+        view.scale(self._zoom, self._zoom)
+        view.translate(-self._center.x(), -self._center.y())
+        return self._pyramid.display_transform() * view
+
+    def _visible_tiles(self):
+        """Finds the tiles needed to draw the visible part of the image
+
+        Returns:
+            tuple (int, QRectF, list (tuple (int, int))): level of the pyramid to draw,
+            visible area of the image as stored in the file, and the column and row of
+            each tile covering the visible area
+        """
+        level = self._pyramid.level_for_scale(self._zoom * self.devicePixelRatioF())
+        rect = self._image_transform().inverted()[0].mapRect(QRectF(self.rect()))
+        return level, rect, self._pyramid.tiles_in(level, rect)
+
+    def _view_changed(self):
+        """Keeps the image on screen after the view moves, and requests the tiles it now needs"""
+        size = self._pyramid.display_size
+        center = [self._center.x(), self._center.y()]
+        for axis, (image_extent, widget_extent) in enumerate([(size.width(), self.width()),
+                                                              (size.height(), self.height())]):
+            half = widget_extent / self._zoom / 2
+            if image_extent <= half * 2:
+                center[axis] = image_extent / 2
+            else:
+                center[axis] = min(max(center[axis], half), image_extent - half)
+        self._center = QPointF(*center)
+
+        # the loader services the newest requests first, so request the tiles nearest
+        # the center of the view last
+        self._loader.clear()
+        level, rect, tiles = self._visible_tiles()
+        coarsest = self._pyramid.level_count - 1
+        if (coarsest, 0, 0) not in self._tiles:
+            self._loader.request(coarsest, 0, 0)
+        span = TILE_SIZE << level
+        center = rect.center() / span - QPointF(0.5, 0.5)
+        for cur_column, cur_row in sorted(tiles, key=lambda cur: -abs(cur[0] - center.x()) - abs(cur[1] - center.y())):
+            if (level, cur_column, cur_row) not in self._tiles:
+                self._loader.request(level, cur_column, cur_row)
+        self.update()
+        self.zoom_changed.emit(self._zoom)
+
+    def _draw_tiles(self, painter, level, tiles):
+        """Draws the tiles of a level of the pyramid that are in memory
+
+        Args:
+            painter (QPainter): painter to draw with, mapping image coordinates to the widget
+            level (int): level of the pyramid the tiles belong to
+            tiles (list (tuple (int, int))): column and row of the tiles to draw
+        """
+        scale = 1 << level
+        for cur_column, cur_row in tiles:
+            pixmap = self._tiles.get((level, cur_column, cur_row))
+            if pixmap is None:
+                continue
+            rect = self._pyramid.tile_rect(level, cur_column, cur_row)
+            target = QRectF(rect.x() * scale, rect.y() * scale, rect.width() * scale, rect.height() * scale)
+            painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+    def paintEvent(self, _event):  # pylint: disable=invalid-name
+        """Draws the visible part of the image"""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().dark())
+        if self._pyramid is None:
+            return
+        with instrumentation.span("viewer/paint"):
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.setTransform(self._image_transform())
+            level, rect, tiles = self._visible_tiles()
+            if any((level, cur_column, cur_row) not in self._tiles for cur_column, cur_row in tiles):
+                # fill the gaps with coarser tiles until the missing tiles are ready
+                for cur_level in range(self._pyramid.level_count - 1, level, -1):
+                    self._draw_tiles(painter, cur_level, self._pyramid.tiles_in(cur_level, rect))
+            self._draw_tiles(painter, level, tiles)
+
+    def resizeEvent(self, event):  # pylint: disable=invalid-name
+        """Keeps the image fitted to the widget, if it was fitted before"""
+        super().resizeEvent(event)
+        if self._pyramid is None:
+            return
+        if self._fit:
+            self.zoom_to_fit()
+        else:
+            self._view_changed()
+
+    def wheelEvent(self, event):  # pylint: disable=invalid-name
+        """Zooms around the mouse pointer"""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self._zoom * ZOOM_STEP ** steps, event.position())
+
+    def mousePressEvent(self, event):  # pylint: disable=invalid-name
+        """Starts dragging the image"""
+        if event.button() != Qt.LeftButton:
+            super().mousePressEvent(event)
+            return
+        self._drag_start = (QPointF(event.pos()), QPointF(self._center))
+        self.setCursor(Qt.ClosedHandCursor)
+
+    def mouseMoveEvent(self, event):  # pylint: disable=invalid-name
+        """Moves the image along with the mouse while it is dragged"""
+        if self._drag_start is None or self._pyramid is None:
+            return
+        start, center = self._drag_start
+        self._center = center - (QPointF(event.pos()) - start) / self._zoom
+        self._fit = False
+        self._view_changed()
+
+    def mouseReleaseEvent(self, event):  # pylint: disable=invalid-name
+        """Stops dragging the image"""
+        if event.button() == Qt.LeftButton:
+            self._drag_start = None
+            self.setCursor(Qt.OpenHandCursor)
+
+    def mouseDoubleClickEvent(self, event):  # pylint: disable=invalid-name
+        """Switches between showing the whole image and showing the clicked point at full size"""
+        if self._fit and self._zoom < 1.0:
+            self.set_zoom(1.0, QPointF(event.pos()))
+        else:
+            self.zoom_to_fit()
+
+    def keyPressEvent(self, event):  # pylint: disable=invalid-name
+        """Zooms and pans the image with the keyboard"""
+        key = event.key()
+        if key in (Qt.Key_Plus, Qt.Key_Equal):
+            self.set_zoom(self._zoom * ZOOM_STEP)
+        elif key == Qt.Key_Minus:
+            self.set_zoom(self._zoom / ZOOM_STEP)
+        elif key == Qt.Key_0:
+            self.zoom_to_fit()
+        elif key == Qt.Key_1:
+            self.set_zoom(1.0)
+        elif key in (Qt.Key_Left, Qt.Key_Right, Qt.Key_Up, Qt.Key_Down) and self._pyramid is not None:
+            step_x = self.width() * PAN_STEP / self._zoom
+            step_y = self.height() * PAN_STEP / self._zoom
+            self._center += {Qt.Key_Left: QPointF(-step_x, 0), Qt.Key_Right: QPointF(step_x, 0),
+                             Qt.Key_Up: QPointF(0, -step_y), Qt.Key_Down: QPointF(0, step_y)}[key]
+            self._fit = False
+            self._view_changed()
+        else:
+            super().keyPressEvent(event)
+
+    @Slot(object, object)
+    def _tiles_ready(self, file_path, tiles):
+        """Callback for when the loader has decoded a batch of tiles
+
+        Args:
+            file_path (pathlib.Path): image the tiles belong to
+            tiles (list (tuple (tuple, QImage))): key and image of each tile
+        """
+        if file_path != self._file_path:
+            return
+        for cur_key, cur_image in tiles:
+            self._tiles.put(cur_key, QPixmap.fromImage(cur_image), cur_image.sizeInBytes())
+        if tiles:
+            self.update()
+
+
+class ImageViewer(QMainWindow):
+    """Window that shows a single image, which may be zoomed in to full resolution"""
+    def __init__(self, settings, parent=None):
+        """
+        Args:
+            settings (AppSettings):
+                application settings controlling the resources used to decode images
+            parent (QWidget):
+                optional window that owns the viewer
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self.view = TiledImageView(settings.viewer_cache_mb * 1024 * 1024, settings.viewer_workers, self)
+        self.view.zoom_changed.connect(self._zoom_changed)
+        self.setCentralWidget(self.view)
+        self.zoom_label = QLabel(self)
+        self.statusBar().addPermanentWidget(self.zoom_label)
+        self.setWindowTitle("Friendly Pics")
+        self.resize(1024, 768)
+
+    def show_image(self, file_path):
+        """Shows an image in the viewer, bringing the viewer to the front
+
+        Args:
+            file_path (pathlib.Path): path to the image to show
+        """
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.setWindowTitle(f"{file_path.name} - Friendly Pics")
+        if not self.view.set_image(file_path):
+            self.statusBar().showMessage(f"Unable to open {file_path}")
+            self.zoom_label.clear()
+            return
+        size = self.view.pyramid.display_size
+        self.statusBar().showMessage(f"{size.width()} x {size.height()} pixels")
+
+    @Slot(float)
+    def _zoom_changed(self, zoom):
+        """Callback for when the zoom of the view changes
+
+        Args:
+            zoom (float): number of screen pixels per pixel of the image
+        """
+        self.zoom_label.setText(f"{zoom:.0%}")
+
+    def keyPressEvent(self, event):  # pylint: disable=invalid-name
+        """Closes the viewer when escape is pressed"""
+        if event.key() == Qt.Key_Escape:
+            self.close()
+        else:
+            super().keyPressEvent(event)
+
+    def closeEvent(self, event):  # pylint: disable=invalid-name
+        """Releases the memory used by the image when the viewer is closed
+
+        Args:
+            event (QCloseEvent): reference to the event object being raised
+        """
+        self.view.clear()
+        event.accept()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -1,36 +1,135 @@
 """GUI dialog defining behavior of main application window"""
 import logging
+import bisect
+import time
+from functools import partial
 from pathlib import Path
-from qtpy.QtWidgets import QMainWindow, QApplication, QFileDialog
-from qtpy.QtCore import Slot, QSettings, QPoint, QSize, QRect, QModelIndex, QAbstractListModel, Qt
-from qtpy.QtGui import QKeySequence, QIcon
+from qtpy.QtWidgets import QMainWindow, QApplication, QFileDialog, QStyle, QPushButton, QTreeWidgetItem, QMenu, \
+    QStyledItemDelegate, QActionGroup, QProgressBar
+from qtpy.QtCore import Slot, Signal, QSettings, QPoint, QSize, QRect, QModelIndex, QAbstractListModel, Qt, QTimer
+from qtpy.QtGui import QKeySequence, QIcon, QImage, QPixmap, QFont
 
-from friendlypics2.misc.gui_helpers import load_ui, generate_screen_id, settings_group_context
+from friendlypics2.misc.gui_helpers import load_ui, generate_screen_id, settings_group_context, visible_rows, \
+    estimate_capacity, FirstPaintWatcher
 from friendlypics2.misc.app_helpers import is_mac_app_bundle
-from friendlypics2.dialogs.about_dlg import AboutDialog
-from friendlypics2.misc.app_settings import AppSettings
-from friendlypics2.dialogs.settings_dlg import SettingsDialog
+from friendlypics2.misc.app_settings import AppSettings, DEFAULT_THUMBNAIL_PREFETCH, DEFAULT_THUMBNAIL_QUEUE_SIZE
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader
+from friendlypics2.misc.thumbnail_scheduler import ThumbnailScheduler
+from friendlypics2.misc.row_reveal import RowRevealPolicy
+from friendlypics2.misc.file_types import FileClassifier
+from friendlypics2.misc.folder_scanner import FolderScanner
+from friendlypics2.misc.library_walker import LibraryWalker
+from friendlypics2.misc.folder_watcher import FolderWatcher
+from friendlypics2.misc.catalog import Catalog, CatalogLoader, CatalogUpdater, default_catalog_path
+from friendlypics2.misc.thumbnail_cache import DiskThumbnailCache, MemoryThumbnailCache, default_cache_folder
+from friendlypics2.misc.duplicate_finder import DuplicateFinder
+from friendlypics2.misc.similarity import EmbeddingStore, SimilarityFinder, default_embeddings_path
+from friendlypics2.misc.image_decoder import thumbnail_pixel_size
+from friendlypics2.misc.filename_filter import FilenameFilterModel
+from friendlypics2.misc import instrumentation
+from friendlypics2.misc.image_sort import natural_key, sort_key, group_label, SORT_NAME, SORT_TAKEN, SORT_MODIFIED, \
+    SORT_SIZE, SORT_DIMENSIONS, GROUP_NONE, GROUP_DAY, GROUP_MONTH
+
+
+# Maximum number of new images found when reconciling a catalog with the file system that are
+# inserted individually. Larger numbers of new images are appended and then sorted in one pass.
+MAX_INCREMENTAL_INSERTS = 1000
+# Amount of time, in milliseconds, to wait for scrolling to settle before prefetching thumbnails
+PREFETCH_DELAY = 100
+# Amount of time, in milliseconds, to wait for catalog updates to settle before sorting images again
+RESORT_DELAY = 500
+# Amount of time, in milliseconds, between updates of the performance statistics in the debug window
+STATS_REFRESH_INTERVAL = 1000
+#: Item data role providing the header for the group of images that starts at an index. Only
+#: the first image in each group has a header.
+GROUP_HEADER_ROLE = Qt.UserRole + 1
 
 
 class ImageItem:
     """Abstraction around an image that appears in the main list view"""
-    def __init__(self, file_path):
+    def __init__(self, file_path, metadata=None):
         """
         Args:
             file_path (pathlib.Path):
                 path to the file managed by this instance
+            metadata (CatalogRecord):
+                optional catalog metadata describing the image
         """
         self._log = logging.getLogger(__name__)
         self._file_path = file_path
-        self._thumbnail = None
+        self._metadata = metadata
+        self._thumbnail_failed = False
+        self._mtime = None
+        self._name_key = None
+        self._sort_keys = dict()
+        self._group_labels = dict()
+
+    @property
+    def thumbnail_failed(self):
+        """bool: True if an attempt to generate a thumbnail for this image has failed"""
+        return self._thumbnail_failed
+
+    @thumbnail_failed.setter
+    def thumbnail_failed(self, value):
+        self._thumbnail_failed = value
+
+    @property
+    def mtime(self):
+        """int: modification time, in nanoseconds, of the file when its thumbnail was generated.
+        None if the thumbnail has not been generated."""
+        return self._mtime
+
+    @mtime.setter
+    def mtime(self, value):
+        self._mtime = value
+
+    @property
+    def metadata(self):
+        """CatalogRecord: catalog metadata describing the image, or None if it hasn't been cataloged"""
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+        self._sort_keys.clear()
+        self._group_labels.clear()
+
+    def sort_key(self, order):
+        """Gets the key used to sort this image, calculating it on first use
+
+        Args:
+            order (str): one of the sort orders defined in :mod:`friendlypics2.misc.image_sort`
+
+        Returns:
+            tuple: the sort key
+        """
+        retval = self._sort_keys.get(order)
+        if retval is None:
+            if self._name_key is None:
+                self._name_key = natural_key(self._file_path)
+            retval = sort_key(order, self._name_key, self._metadata)
+            self._sort_keys[order] = retval
+        return retval
+
+    def group_label(self, order, grouping):
+        """Gets the header for the group of images this image belongs to, calculating it on first use
+
+        Args:
+            order (str): one of the sort orders defined in :mod:`friendlypics2.misc.image_sort`
+            grouping (str): one of the groupings defined in :mod:`friendlypics2.misc.image_sort`
+
+        Returns:
+            str: the header, or None if the image isn't grouped
+        """
+        key = (order, grouping)
+        if key not in self._group_labels:
+            self._group_labels[key] = group_label(order, grouping, self._metadata)
+        return self._group_labels[key]
 
     @property
-    def thumbnail(self):
-        """QIcon: thumbnail representation of the image, lazy loaded when needed"""
-        if self._thumbnail:
-            return self._thumbnail
-        self._thumbnail = QIcon(str(self._file_path))
-        return self._thumbnail
+    def file_path(self):
+        """pathlib.Path: path to the file managed by this object"""
+        return self._file_path
 
     @property
     def file_name(self):
@@ -38,25 +137,552 @@ class ImageItem:
         return self._file_path.name
 
 
+def _catalog_items(sort_order, records):
+    """Creates and sorts the images for a set of catalog records. Executed on a worker thread.
+
+    Args:
+        sort_order (str): order to sort the images in
+        records (list (CatalogRecord)): catalog records describing the images
+
+    Returns:
+        tuple (str, list (ImageItem)): the sort order, and the sorted images
+    """
+    items = [ImageItem(Path(cur_record.path), cur_record) for cur_record in records]
+    items.sort(key=lambda item: item.sort_key(sort_order))
+    return sort_order, items
+
+
 class ImageModel(QAbstractListModel):
-    """Qt model that manages a list of images"""
-    def __init__(self, folder):
+    """Qt model that manages a list of images
+
+    The contents of the folder are scanned in the background once :meth:`start_scan` is
+    called, and images are added to the model in batches as they are found. Images are
+    presented in the order they are found until the scan completes, at which point they
+    are sorted. From then on the folders containing the images are monitored and the
+    model is updated in place as images are added, removed or modified.
+
+    Sort keys are derived from the catalog metadata for each image and cached, so changing
+    the sort order reorders the model in place without reading any files or discarding
+    any thumbnails.
+
+    When a catalog is provided, the images recorded in the catalog for the folder are
+    loaded and sorted on a worker thread and shown as soon as they are ready. The folder
+    is scanned once they are shown, and the scan is used to reconcile the model and the
+    catalog with the current contents of the folder.
+    """
+    #: Signal emitted each time a batch of images is added to the model. Provides the total
+    #: number of images found so far
+    scan_progress = Signal(int)
+    #: Signal emitted once the folder scan ends. Provides a boolean that is True if the
+    #: scan ran to completion and False if it was cancelled
+    scan_finished = Signal(bool)
+    #: Signal emitted when images are added to or removed from the folder after the scan
+    #: has finished. Provides the total number of images in the model
+    images_changed = Signal(int)
+    #: Signal emitted each time images are added to the model, before views are told about
+    #: any of the rows that were inserted. Provides the paths to the new images, including
+    #: those in rows that have not been exposed to the view yet
+    images_added = Signal(list)
+    #: Signal emitted each time images are removed from the model, once all of their rows
+    #: have been removed. Provides the paths to the removed images, including those in rows
+    #: that had not been exposed to the view yet
+    images_removed = Signal(list)
+
+    def __init__(self, folder, loader, thumbnail_cache, scanner=None, catalog=None,
+                 prefetch_rows=DEFAULT_THUMBNAIL_PREFETCH, queue_size=DEFAULT_THUMBNAIL_QUEUE_SIZE,
+                 sort_order=SORT_NAME, grouping=GROUP_NONE):
         """
         Args:
             folder (pathlib.Path):
                 path containing images to be presented to the user
+            loader (ThumbnailLoader):
+                service used to generate thumbnails in the background
+            thumbnail_cache (MemoryThumbnailCache):
+                shared cache holding the thumbnails that have already been generated
+            scanner (FolderScanner):
+                optional service used to find the images in the folder. Defaults to a
+                scanner that only looks at the immediate contents of the folder.
+            catalog (Catalog):
+                optional catalog used to populate the model before the scan completes
+            prefetch_rows (int):
+                number of rows above and below the visible rows to generate thumbnails for
+            queue_size (int):
+                maximum number of thumbnail requests to hold before discarding the
+                ones furthest from view
+            sort_order (str):
+                order to show the images in. One of the sort orders defined in
+                :mod:`friendlypics2.misc.image_sort`
+            grouping (str):
+                how to group the images. One of the groupings defined in
+                :mod:`friendlypics2.misc.image_sort`
         """
         super().__init__(None)
         self._log = logging.getLogger(__name__)
         self._folder = folder
-        self._cache_size = 50  # only load the first 50 image thumbnails to reduce load times
-        self._data = self._setup_model_data()
+        self._sort_order = sort_order
+        self._grouping = grouping
+        # sort keys may change as catalog metadata arrives, so sort again once the updates settle
+        self._resort_timer = QTimer(self)
+        self._resort_timer.setSingleShot(True)
+        self._resort_timer.setInterval(RESORT_DELAY)
+        self._resort_timer.timeout.connect(self._sort)
+        self._loader = loader
+        self._thumbnail_cache = thumbnail_cache
+        # only expose a few screens worth of images to the view at first to reduce load times
+        self._reveal_policy = RowRevealPolicy()
+        self._cache_size = self._reveal_policy.initial_rows
+        self._data = list()
+        self._rows = dict()
+        self._path_keys = None
+        self._placeholder = QApplication.style().standardIcon(QStyle.SP_FileIcon)
+        self._loader.thumbnail_ready.connect(self._thumbnail_ready)
+        self._scheduler = ThumbnailScheduler(loader, prefetch_rows, queue_size, self)
+
+        self._scanner = scanner or FolderScanner(folder)
+        self._scanner.setParent(self)
+        self._scanner.files_found.connect(self._files_found)
+        self._scanner.finished.connect(self._scan_complete)
+
+        self._watcher = FolderWatcher(self._scanner.exclude, self._scanner.classifier, self)
+        self._watcher.folders_changed.connect(self._folders_changed)
+        self._closed = False
+
+        # When populated from the catalog, we track the files seen by the scanner
+        # so we can work out what has changed since the catalog was last updated
+        self._catalog = catalog
+        self._seen = None
+        self._new_files = list()
+        self._updater = None
+        self._catalog_loader = None
+        if catalog is not None:
+            self._updater = CatalogUpdater(catalog, self)
+            self._updater.records_updated.connect(self._records_updated)
+            self._catalog_loader = CatalogLoader(catalog, self)
+            self._catalog_loader.loaded.connect(self._catalog_loaded)
+
+    def start_scan(self):
+        """Starts loading the images contained in our folder in the background"""
+        if self._catalog_loader is None:
+            self._scanner.start()
+            return
+        self._catalog_loader.start(self._folder, self._scanner.recursive, partial(_catalog_items, self._sort_order))
+
+    @Slot(object)
+    def _catalog_loaded(self, result):
+        """Callback for when the images recorded in the catalog for our folder have been loaded.
+        Populates the model with the images and starts scanning the folder.
+
+        Args:
+            result (tuple (str, list (ImageItem))):
+                sort order the images were sorted in, and the images themselves
+        """
+        if self._closed:
+            return
+        sort_order, items = result
+        if items:
+            self._populate(items if sort_order == self._sort_order else sorted(items, key=self._sort_key))
+        self._scanner.start()
+
+    def _populate(self, items):
+        """Populates the model with the images recorded in the catalog for our folder
+
+        Args:
+            items (list (ImageItem)): images to show, in our current sort order
+        """
+        self._seen = set()
+        self._data = items
+        self._rows = {cur_item.file_path: row for row, cur_item in enumerate(self._data)}
+        self._path_keys = None
+        self.images_added.emit([cur_item.file_path for cur_item in items])
+        visible = self.rowCount(QModelIndex())
+        self.beginInsertRows(QModelIndex(), 0, visible - 1)
+        self.endInsertRows()
+        self.scan_progress.emit(len(self._data))
+
+    def cancel_scan(self):
+        """Stops loading images from our folder. Images found so far remain in the model"""
+        if self._catalog_loader is not None and self._catalog_loader.is_running:
+            # the folder scan hasn't started yet, so report the end of the scan ourselves
+            self._catalog_loader.cancel()
+            self.scan_finished.emit(False)
+            return
+        self._scanner.cancel()
+
+    def close(self):
+        """Stops the folder scan, stops receiving thumbnails and discards any outstanding
+        thumbnail requests. Should be called before the model is discarded
+
+        Results from background work that finishes after this call are ignored, so a model
+        that is being replaced never reports progress once the next model has been shown.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._scanner.cancel()
+        self._scanner.files_found.disconnect(self._files_found)
+        self._scanner.finished.disconnect(self._scan_complete)
+        if self._catalog_loader is not None:
+            self._catalog_loader.cancel()
+            self._catalog_loader.loaded.disconnect(self._catalog_loaded)
+        if self._updater is not None:
+            self._updater.cancel()
+            self._updater.records_updated.disconnect(self._records_updated)
+        self._watcher.folders_changed.disconnect(self._folders_changed)
+        self._watcher.stop()
+        self._resort_timer.stop()
+        self._loader.thumbnail_ready.disconnect(self._thumbnail_ready)
+        self._scheduler.clear()
+        self._loader.clear()
+
+    def set_visible_rows(self, first, last):
+        """Updates the range of rows visible to the user, so thumbnails for those rows are
+        generated first. Pending requests for rows that have scrolled well out of view
+        are discarded.
+
+        Args:
+            first (int): first visible row
+            last (int): last visible row
+        """
+        self._scheduler.set_visible_range(first, last)
+
+    def prefetch(self):
+        """Requests thumbnails for the visible rows and the rows just outside of view,
+        so they are ready before the user scrolls to them"""
+        if self._scheduler.prefetch_range is None:
+            return
+        low, high = self._scheduler.prefetch_range
+        for cur_row in range(low, min(high + 1, self.rowCount(QModelIndex()))):
+            item = self._data[cur_row]
+            if not item.thumbnail_failed and item.file_path not in self._thumbnail_cache:
+                self._scheduler.request(item.file_path, cur_row)
+
+    @property
+    def folder(self):
+        """pathlib.Path: path containing the images managed by this model"""
+        return self._folder
+
+    @property
+    def is_scanning(self):
+        """bool: True if images are still being loaded from our folder"""
+        loading = self._catalog_loader is not None and self._catalog_loader.is_running
+        return loading or self._scanner.is_running
+
+    @property
+    def scan_stats(self):
+        """ScanStats: progress and throughput of the folder scan. None if the scan hasn't started"""
+        return self._scanner.stats
 
     @property
     def max_count(self):
         """int: gets the total number of images managed by this model"""
         return len(self._data)
 
+    @property
+    def recursive(self):
+        """bool: True if the model includes the images from all sub folders of our folder"""
+        return self._scanner.recursive
+
+    @property
+    def sort_order(self):
+        """str: order the images are shown in"""
+        return self._sort_order
+
+    @property
+    def grouping(self):
+        """str: how the images are grouped"""
+        return self._grouping
+
+    def set_sort_order(self, sort_order, grouping):
+        """Changes the order the images are shown in, preserving any selections held by the view
+
+        Args:
+            sort_order (str):
+                one of the sort orders defined in :mod:`friendlypics2.misc.image_sort`
+            grouping (str):
+                one of the groupings defined in :mod:`friendlypics2.misc.image_sort`
+        """
+        if sort_order == self._sort_order and grouping == self._grouping:
+            return
+        self._sort_order = sort_order
+        self._grouping = grouping
+        self._sort()
+
+    @property
+    def file_paths(self):
+        """list (pathlib.Path): paths to all images managed by this model, in display order"""
+        return [cur_item.file_path for cur_item in self._data]
+
+    @property
+    def path_keys(self):
+        """frozenset (str): paths to all images managed by this model, as strings. The same
+        object is returned until images are added to or removed from the model, so consumers
+        may cache anything they derive from it."""
+        if self._path_keys is None:
+            self._path_keys = frozenset(map(str, self._rows))
+        return self._path_keys
+
+    def paths_in(self, first, last):
+        """Gets the paths to the images in a range of rows
+
+        Args:
+            first (int): first row to include
+            last (int): last row to include
+
+        Returns:
+            list (pathlib.Path): paths to the images in the given rows
+        """
+        return [cur_item.file_path for cur_item in self._data[first:last + 1]]
+
+    def index_for(self, file_path):
+        """Locates the model index for an image, exposing it to the view if necessary
+
+        Args:
+            file_path (pathlib.Path): path to the image to locate
+
+        Returns:
+            QModelIndex: index of the image, which will be invalid if the image isn't in the model
+        """
+        row = self._rows.get(file_path)
+        if row is None:
+            return QModelIndex()
+        if row >= self._cache_size:
+            self._reveal(row + 1 - self._cache_size)
+        return self.index(row)
+
+    def path_for(self, index):
+        """Locates the image shown at a given model index
+
+        Args:
+            index (QModelIndex): index of the image to locate
+
+        Returns:
+            pathlib.Path: path to the image, or None if the index doesn't refer to an image
+        """
+        if not index.isValid() or index.row() >= len(self._data):
+            return None
+        return self._data[index.row()].file_path
+
+    @Slot(list)
+    def _files_found(self, files):
+        """Callback for when the folder scan finds a batch of files
+
+        Args:
+            files (list (pathlib.Path)):
+                paths to the files that were found
+        """
+        if self._closed:
+            return
+        if self._seen is not None:
+            # populated from the catalog, so just keep track of what has changed
+            self._seen.update(files)
+            self._new_files.extend(cur_file for cur_file in files if cur_file not in self._rows)
+            self.scan_progress.emit(len(self._seen))
+            return
+        self._files_found_unsorted(files)
+
+    def _files_found_unsorted(self, files):
+        """Appends images to the end of the model, without regard to their sort order
+
+        Args:
+            files (list (pathlib.Path)):
+                paths to the files to add
+        """
+        old_visible = self.rowCount(QModelIndex())
+        for cur_file in files:
+            self._rows[cur_file] = len(self._data)
+            self._data.append(ImageItem(cur_file))
+        self._path_keys = None
+        self.images_added.emit(list(files))
+
+        new_visible = self.rowCount(QModelIndex())
+        if new_visible > old_visible:
+            self.beginInsertRows(QModelIndex(), old_visible, new_visible - 1)
+            self.endInsertRows()
+        self.scan_progress.emit(len(self._data))
+
+    @Slot(bool)
+    def _scan_complete(self, completed):
+        """Callback for when the folder scan ends. Sorts the images that were found
+
+        Args:
+            completed (bool):
+                True if the scan ran to completion, False if it was cancelled
+        """
+        if self._closed:
+            # results delivered after the model was closed belong to a folder no longer shown
+            return
+        if self._seen is None:
+            self._sort()
+        else:
+            self._reconcile(completed)
+
+        folders = {cur_item.file_path.parent for cur_item in self._data}
+        folders.add(self._folder)
+        self._watcher.watch(folders)
+
+        if completed and self._updater is not None:
+            self._updater.start(self._folder, self._scanner.recursive,
+                                [cur_item.file_path for cur_item in self._data], self._scanner.visited_folders)
+        self.scan_finished.emit(completed)
+
+    def _reconcile(self, completed):
+        """Brings a model populated from the catalog in line with the results of the folder scan
+
+        Args:
+            completed (bool):
+                True if the scan ran to completion, False if it was cancelled. Images
+                are only removed from the model after a complete scan.
+        """
+        if completed:
+            removed = [row for row, cur_item in enumerate(self._data) if cur_item.file_path not in self._seen]
+            self._remove_rows(removed)
+
+        if len(self._new_files) <= MAX_INCREMENTAL_INSERTS:
+            self._insert_files(self._new_files)
+        else:
+            self._files_found_unsorted(self._new_files)
+            self._sort()
+        self._seen = None
+        self._new_files = list()
+
+    @Slot(list)
+    def _records_updated(self, records):
+        """Callback for when catalog metadata for some of our images has been updated
+
+        Args:
+            records (list (CatalogRecord)): the updated metadata
+        """
+        for cur_record in records:
+            row = self._rows.get(Path(cur_record.path))
+            if row is not None:
+                self._data[row].metadata = cur_record
+        if self._sort_order != SORT_NAME:
+            self._resort_timer.start()
+
+    @Slot(object)
+    def _folders_changed(self, changes):
+        """Callback for when the contents of one or more of our folders have changed
+
+        Args:
+            changes (dict):
+                maps the path of each folder that changed to a dictionary that maps
+                each image now in the folder to its modification time
+        """
+        current = dict()
+        for cur_contents in changes.values():
+            current.update(cur_contents)
+
+        removed = list()
+        for row, cur_item in enumerate(self._data):
+            if cur_item.file_path.parent not in changes:
+                continue
+            mtime = current.pop(cur_item.file_path, None)
+            if mtime is None:
+                removed.append(row)
+            elif cur_item.mtime is not None and cur_item.mtime != mtime:
+                self._invalidate(row)
+
+        # whatever is left over has been added
+        self._remove_rows(removed)
+        self._insert_files(list(current))
+        self.images_changed.emit(len(self._data))
+
+    def _invalidate(self, row):
+        """Discards the thumbnail for an image that has been modified so it gets regenerated
+
+        Args:
+            row (int): index of the image that was modified
+        """
+        item = self._data[row]
+        item.mtime = None
+        item.thumbnail_failed = False
+        self._thumbnail_cache.remove(item.file_path)
+        if row < self.rowCount(QModelIndex()):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def _remove_rows(self, rows):
+        """Removes images from the model, notifying views once for each contiguous range of rows
+
+        Args:
+            rows (list (int)): sorted list of the indexes of the images to remove
+        """
+        if not rows:
+            return
+        paths = [self._data[cur_row].file_path for cur_row in rows]
+        # group the rows into contiguous ranges, and remove them from last to first
+        # so the indexes of the remaining ranges aren't affected
+        ranges = list()
+        for cur_row in rows:
+            if ranges and ranges[-1][1] == cur_row - 1:
+                ranges[-1][1] = cur_row
+            else:
+                ranges.append([cur_row, cur_row])
+
+        for first, last in reversed(ranges):
+            visible = self.rowCount(QModelIndex())
+            if first < visible:
+                last_visible = min(last, visible - 1)
+                self.beginRemoveRows(QModelIndex(), first, last_visible)
+                del self._data[first:last + 1]
+                self._cache_size -= last_visible - first + 1
+                self.endRemoveRows()
+            else:
+                del self._data[first:last + 1]
+        self._rows = {cur_item.file_path: row for row, cur_item in enumerate(self._data)}
+        self._path_keys = None
+        self.images_removed.emit(paths)
+
+    def _insert_files(self, files):
+        """Adds new images to the model at their sorted positions, notifying views once for
+        each group of images inserted at the same position
+
+        Args:
+            files (list (pathlib.Path)): paths of the images to add
+        """
+        if not files:
+            return
+        self.images_added.emit(list(files))
+        keys = [self._sort_key(cur_item) for cur_item in self._data]
+        groups = dict()
+        for cur_item in sorted((ImageItem(cur_file) for cur_file in files), key=self._sort_key):
+            position = bisect.bisect_left(keys, self._sort_key(cur_item))
+            groups.setdefault(position, list()).append(cur_item)
+
+        # insert from last to first so the positions of the remaining groups aren't affected
+        for position in sorted(groups, reverse=True):
+            new_items = groups[position]
+            if position < self.rowCount(QModelIndex()):
+                self.beginInsertRows(QModelIndex(), position, position + len(new_items) - 1)
+                self._data[position:position] = new_items
+                self._cache_size += len(new_items)
+                self.endInsertRows()
+            else:
+                self._data[position:position] = new_items
+        self._rows = {cur_item.file_path: row for row, cur_item in enumerate(self._data)}
+        self._path_keys = None
+
+    def _sort_key(self, item):
+        """tuple: gets the key used to sort an image in our current sort order"""
+        return item.sort_key(self._sort_order)
+
+    @Slot()
+    def _sort(self):
+        """Sorts the images in the model, preserving any selections held by the view"""
+        self._resort_timer.stop()
+        self.layoutAboutToBeChanged.emit()
+        old_items = self._data
+        self._data = sorted(self._data, key=self._sort_key)
+        self._rows = {cur_item.file_path: row for row, cur_item in enumerate(self._data)}
+
+        old_indexes = self.persistentIndexList()
+        new_indexes = list()
+        for cur_index in old_indexes:
+            new_row = self._rows[old_items[cur_index.row()].file_path]
+            new_indexes.append(self.index(new_row, cur_index.column()))
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
     def data(self, index, role):
         """retrieves data for a specific image given a specific role
 
@@ -69,22 +695,62 @@ class ImageModel(QAbstractListModel):
 
         Returns:
             str or QIcon:
-                returns the name of the file when using the Display role, and returns
-                the image thumbnail when using the Decoration role
+                returns the name of the file when using the Display role, the image
+                thumbnail when using the Decoration role, and the header for the group
+                the image starts, if any, when using the GROUP_HEADER_ROLE
         """
-        if not index.isValid() or role not in (Qt.DisplayRole, Qt.DecorationRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.DecorationRole, GROUP_HEADER_ROLE):
             return None
 
-        if index.row() > len(self._data):
+        if index.row() >= len(self._data):
             return None
 
+        item = self._data[index.row()]
+        if role == GROUP_HEADER_ROLE:
+            label = item.group_label(self._sort_order, self._grouping)
+            if index.row() > 0:
+                previous = self._data[index.row() - 1]
+                if previous.group_label(self._sort_order, self._grouping) == label:
+                    return None
+            return label
         if role == Qt.DecorationRole:
-            return self._data[index.row()].thumbnail
-        return self._data[index.row()].file_name
+            thumbnail = self._thumbnail_cache.get(item.file_path)
+            if thumbnail is not None:
+                instrumentation.count("thumbnail/memory_hit")
+                return thumbnail
+            instrumentation.count("thumbnail/memory_miss")
+            if not item.thumbnail_failed:
+                self._scheduler.request(item.file_path, index.row())
+            return self._placeholder
+        return item.file_name
+
+    @Slot(object, QImage, object)
+    def _thumbnail_ready(self, file_path, image, mtime):
+        """Callback for when the thumbnail for one of our images has been generated
+
+        Args:
+            file_path (pathlib.Path):
+                path to the image the thumbnail was generated for
+            image (QImage):
+                the generated thumbnail
+            mtime (int):
+                modification time of the image when the thumbnail was generated
+        """
+        row = self._rows.get(file_path)
+        if row is None:
+            return
+        self._data[row].mtime = mtime
+        if image.isNull():
+            self._data[row].thumbnail_failed = True
+        else:
+            self._thumbnail_cache.put(file_path, QIcon(QPixmap.fromImage(image)), image.sizeInBytes())
+        if row < self._cache_size:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
 
     def rowCount(self, _):  # pylint: disable=invalid-name
         """int: number of images in the model, lazy loaded as needed"""
-        return self._cache_size
+        return min(self._cache_size, len(self._data))
 
     def canFetchMore(self, parent):  # pylint: disable=invalid-name
         """Is there more data to load from our model
@@ -116,36 +782,127 @@ class ImageModel(QAbstractListModel):
         if parent.isValid():
             return
         remainder = len(self._data) - self._cache_size
-        next_batch = min(10, remainder)
+        next_batch = self._reveal_policy.next_batch(remainder)
         if next_batch <= 0:
             return
-        self.beginInsertRows(QModelIndex(), self._cache_size, self._cache_size + next_batch - 1)
-        self._cache_size += next_batch
+        with instrumentation.span("model/fetch_more"):
+            self._reveal(next_batch)
+        instrumentation.count("model/rows_revealed", next_batch)
+        self._log.debug(f"Revealed {next_batch} rows, {self._reveal_policy.reveal_rate:.0f} rows/s")
+
+    def _reveal(self, count):
+        """Exposes more of our images to the view
+
+        Args:
+            count (int): number of additional rows to expose
+        """
+        start = time.monotonic()
+        self.beginInsertRows(QModelIndex(), self._cache_size, self._cache_size + count - 1)
+        self._cache_size += count
         self.endInsertRows()
+        # The view lays out the new rows the next time the event loop runs, so measure
+        # the time taken up to that point
+        QTimer.singleShot(0, partial(self._reveal_finished, count, start))
 
-    def _setup_model_data(self):
-        """list (ImageItem): Loads image metadata for all images in the model"""
-        retval = list()
-        for cur_file in sorted(self._folder.glob("*")):
-            if not cur_file.is_file():
-                continue
-            if not cur_file.suffix:
-                continue
-            retval.append(ImageItem(cur_file))
-        return retval
+    def _reveal_finished(self, count, start):
+        """Records the time taken to reveal a batch of rows, including the time the view
+        spent laying them out
+
+        Args:
+            count (int): number of rows revealed
+            start (float): time at which the rows were revealed
+        """
+        self._reveal_policy.record(count, time.monotonic() - start)
+
+    @property
+    def reveal_rate(self):
+        """float: average number of rows exposed to the view per second over the last few seconds"""
+        return self._reveal_policy.reveal_rate
+
+    def set_viewport_capacity(self, capacity):
+        """Updates the number of images that fit in the view at once, which determines
+        how many rows are exposed to the view at a time
+
+        Args:
+            capacity (int): number of images that fit in the view
+        """
+        self._reveal_policy.capacity = capacity
+        if len(self._data) <= self._cache_size:
+            self._cache_size = max(self._cache_size, self._reveal_policy.initial_rows)
+            return
+        missing = min(self._reveal_policy.initial_rows, len(self._data)) - self._cache_size
+        if missing > 0:
+            self._reveal(missing)
+
+
+class GroupHeaderDelegate(QStyledItemDelegate):
+    """Item delegate that draws a header across the top of the first image in each group"""
+    def paint(self, painter, option, index):
+        """Draws an image, followed by the header for its group if it starts one
+
+        Args:
+            painter (QPainter): painter to draw with
+            option (QStyleOptionViewItem): parameters describing how to draw the image
+            index (QModelIndex): index of the image to draw
+        """
+        super().paint(painter, option, index)
+        label = index.data(GROUP_HEADER_ROLE)
+        if not label:
+            return
+        painter.save()
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        rect = QRect(option.rect)
+        rect.setHeight(painter.fontMetrics().height() + 4)
+        painter.fillRect(rect, option.palette.highlight())
+        painter.setPen(option.palette.highlightedText().color())
+        text = painter.fontMetrics().elidedText(label, Qt.ElideRight, rect.width() - 8)
+        painter.drawText(rect.adjusted(4, 0, -4, 0), Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
 
 
 class MainWindow(QMainWindow):
     """Main window interface"""
     def __init__(self):
         super().__init__(parent=None)
+        start = time.perf_counter_ns()
         # Initialize private properties
         self._log = logging.getLogger(__name__)
         self._disable_window_save = False
         self._last_path = None
+        self._model = None
+        # True while the folder from the previous session is waiting to be restored
+        self._restore_pending = False
+        # window for viewing images at full resolution, created the first time it is needed
+        self._viewer = None
 
         # Initialize app settings
         self._app_settings = AppSettings()
+        self._app_settings.enable_auto_save()
+
+        # Initialize background services
+        self._thumbnail_cache = DiskThumbnailCache(
+            default_cache_folder(),
+            self._app_settings.thumbnail_cache_mb * 1024 * 1024)
+        self._catalog = Catalog(default_catalog_path())
+        self._icon_cache = MemoryThumbnailCache(self._app_settings.thumbnail_memory_mb * 1024 * 1024)
+        self._thumbnail_loader = ThumbnailLoader(
+            self._app_settings.thumbnail_workers,
+            self._app_settings.thumbnail_queue_size,
+            self._thumbnail_cache,
+            self)
+        self._duplicate_finder = DuplicateFinder(
+            self._catalog, self._app_settings.duplicate_distance, self._thumbnail_cache, self)
+        self._duplicate_finder.progress.connect(self._duplicates_progress)
+        self._duplicate_finder.finished.connect(self._duplicates_found)
+        self._similarity_finder = SimilarityFinder(
+            EmbeddingStore(default_embeddings_path(), self._catalog),
+            self._app_settings.similarity_results, self._thumbnail_cache, self)
+        self._similarity_finder.progress.connect(self._similarity_progress)
+        self._similarity_finder.finished.connect(self._similar_found)
+        # True once every image in the current folder has been analysed for similarity searches
+        self._similarity_indexed = False
 
         # Initialize window
         self._log.debug("Initializing main window...")
@@ -155,6 +912,7 @@ class MainWindow(QMainWindow):
         self._settings = QSettings()
         self._load_ui()
         self._load_window_state()
+        instrumentation.record("startup/main_window", start)
         self._log.debug("Main window initialized")
 
     def _find_default_screen(self):
@@ -195,11 +953,87 @@ class MainWindow(QMainWindow):
         self.file_open_menu.triggered.connect(self.file_open_click)
         self.file_open_menu.setShortcut(QKeySequence.Open)
         self.file_settings_menu.triggered.connect(self.file_settings_click)
+        self.file_library_mode_menu.setChecked(self._app_settings.library_mode)
+        self.file_library_mode_menu.triggered.connect(self.file_library_mode_click)
+
+        self.tools_find_duplicates_menu.triggered.connect(self.tools_find_duplicates_click)
+
+        # map each sort and grouping menu item to the setting it represents
+        self._sort_actions = {
+            self.view_sort_name_menu: SORT_NAME,
+            self.view_sort_taken_menu: SORT_TAKEN,
+            self.view_sort_modified_menu: SORT_MODIFIED,
+            self.view_sort_size_menu: SORT_SIZE,
+            self.view_sort_dimensions_menu: SORT_DIMENSIONS,
+        }
+        self._group_actions = {
+            self.view_group_none_menu: GROUP_NONE,
+            self.view_group_day_menu: GROUP_DAY,
+            self.view_group_month_menu: GROUP_MONTH,
+        }
+        for cur_actions, cur_value in [(self._sort_actions, self._app_settings.sort_order),
+                                       (self._group_actions, self._app_settings.group_by)]:
+            group = QActionGroup(self)
+            for cur_action, cur_setting in cur_actions.items():
+                group.addAction(cur_action)
+                cur_action.setChecked(cur_setting == cur_value)
+            group.triggered.connect(self.view_sort_click)
+        self.thumbnail_view.setItemDelegate(GroupHeaderDelegate(self.thumbnail_view))
+        self.thumbnail_find_similar_menu.triggered.connect(self.thumbnail_find_similar_click)
+        self.thumbnail_open_menu.triggered.connect(self.thumbnail_open_click)
+        self.thumbnail_view.activated.connect(self.thumbnail_open_click)
+        self.thumbnail_view.customContextMenuRequested.connect(self._thumbnail_context_menu)
 
         self.window_debug_menu.triggered.connect(self.window_debug_click)
+        self.stats_record_button.setChecked(instrumentation.is_enabled())
+        self.stats_record_button.toggled.connect(self.stats_record_click)
+        self.stats_clear_button.clicked.connect(self.stats_clear_click)
+        self.stats_save_trace_button.clicked.connect(self.stats_save_trace_click)
+        self.stats_view.header().setStretchLastSection(False)
+        # only update the statistics while they are visible
+        self._stats_timer = QTimer(self)
+        self._stats_timer.setInterval(STATS_REFRESH_INTERVAL)
+        self._stats_timer.timeout.connect(self._refresh_stats)
+        self.debug_dock.visibilityChanged.connect(self._update_stats_timer)
+        self.debug_tabs.currentChanged.connect(self._update_stats_timer)
+        self.menuWindow.addAction(self.duplicates_dock.toggleViewAction())
+        self.duplicates_dock.hide()
+        self.duplicates_view.itemActivated.connect(self._search_result_activated)
+        self.menuWindow.addAction(self.similar_dock.toggleViewAction())
+        self.similar_dock.hide()
+        self.similar_view.itemActivated.connect(self._search_result_activated)
 
         self.help_about_menu.triggered.connect(self.help_about_click)
 
+        # the view shows the current folder through a filter, which persists across folders
+        self._filter_model = FilenameFilterModel(self)
+        self.thumbnail_view.setModel(self._filter_model)
+        self.filter_edit.textChanged.connect(self.filter_changed)
+
+        self._thumbnail_loader.thumbnail_size = self.thumbnail_view.iconSize()
+        self._thumbnail_loader.device_pixel_ratio = self.devicePixelRatioF()
+
+        # Track which rows are visible so the thumbnails the user is looking at are
+        # generated first, and prefetch the surrounding thumbnails once scrolling settles
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(PREFETCH_DELAY)
+        self._prefetch_timer.timeout.connect(self._prefetch_thumbnails)
+        self.thumbnail_view.verticalScrollBar().valueChanged.connect(self._update_visible_rows)
+        self.thumbnail_view.verticalScrollBar().rangeChanged.connect(self._update_visible_rows)
+
+        self.scan_cancel_button = QPushButton("Cancel", self)
+        self.scan_cancel_button.setToolTip("Stop loading images from the current folder")
+        self.scan_cancel_button.clicked.connect(self.scan_cancel_click)
+        self.scan_cancel_button.hide()
+        self.scan_progress_bar = QProgressBar(self)
+        # we never know how many images remain, so show a busy indicator
+        self.scan_progress_bar.setRange(0, 0)
+        self.scan_progress_bar.setMaximumWidth(120)
+        self.scan_progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.scan_progress_bar)
+        self.statusBar().addPermanentWidget(self.scan_cancel_button)
+
         # Hack: for testing on MacOS we convert menu bar to non native
         #       works around the bug where native menu bar on Mac is read only on app launch
         #       problem is non existent when running app from a .app package
@@ -237,9 +1071,141 @@ class MainWindow(QMainWindow):
                 self.window_debug_menu.setChecked(False)
         self._last_path = self._settings.value("last_path", None)
         if self._last_path:
-            model = ImageModel(self._last_path)
-            self.thumbnail_view.setModel(model)
-            self.statusBar().showMessage(f"Loaded {model.max_count} images")
+            # restore the last folder once the window has been painted, so large folders
+            # don't delay the window appearing
+            self._restore_pending = True
+            watcher = FirstPaintWatcher(self.thumbnail_view.viewport(), self)
+            watcher.painted.connect(self._restore_last_folder)
+
+    @Slot()
+    def _restore_last_folder(self):
+        """Loads the folder that was open at the end of the previous session"""
+        if not self._restore_pending:
+            # the user opened another folder first
+            return
+        self._log.debug(f"Restoring last folder {self._last_path}")
+        self._load_folder(Path(self._last_path))
+
+    def _load_folder(self, folder):
+        """Replaces the images shown in the thumbnail view with those from another folder
+
+        Args:
+            folder (pathlib.Path):
+                path to the folder containing the images to show
+        """
+        self._restore_pending = False
+        old_model = self._model
+        if old_model is not None:
+            old_model.close()
+        self.filter_edit.clear()
+        self._duplicate_finder.cancel()
+        self.duplicates_view.clear()
+        self._similarity_finder.cancel()
+        self._similarity_indexed = False
+        self.similar_view.clear()
+
+        # Make sure thumbnails are decoded at the resolution of the screen we're currently on
+        device_pixel_ratio = self.devicePixelRatioF()
+        if device_pixel_ratio != self._thumbnail_loader.device_pixel_ratio:
+            self._thumbnail_loader.device_pixel_ratio = device_pixel_ratio
+            self._icon_cache.clear()
+        self._log.debug(f"Thumbnail memory cache: {self._icon_cache}")
+        classifier = FileClassifier(self._app_settings.image_formats)
+        if self._app_settings.library_mode:
+            scanner = LibraryWalker(
+                folder,
+                self._app_settings.library_max_depth,
+                self._app_settings.library_exclude,
+                self._app_settings.library_workers,
+                classifier=classifier)
+        else:
+            scanner = FolderScanner(folder, classifier=classifier)
+        model = ImageModel(folder, self._thumbnail_loader, self._icon_cache, scanner, self._catalog,
+                           self._app_settings.thumbnail_prefetch, self._app_settings.thumbnail_queue_size,
+                           self._app_settings.sort_order, self._app_settings.group_by)
+        model.set_viewport_capacity(estimate_capacity(self.thumbnail_view))
+        model.scan_progress.connect(self._scan_progress)
+        model.scan_finished.connect(self._scan_finished)
+        model.images_changed.connect(self._images_changed)
+        self._model = model
+        self._filter_model.setSourceModel(model)
+        if old_model is not None:
+            old_model.deleteLater()
+
+        self.statusBar().showMessage(f"Loading {folder}...")
+        self.scan_progress_bar.show()
+        self.scan_cancel_button.show()
+        model.start_scan()
+
+    @Slot()
+    def _update_visible_rows(self):
+        """Reports the range of rows currently visible in the thumbnail view to its model"""
+        model = self._model
+        if model is None:
+            return
+        rows = visible_rows(self.thumbnail_view)
+        if rows is not None:
+            first, last = rows
+            source_rows = [self._filter_model.mapToSource(self._filter_model.index(cur, 0)).row() for cur in rows]
+            model.set_visible_rows(*source_rows)
+            # the rows around the visible ones may be hidden by the filter, so only prefetch when unfiltered
+            if not self._filter_model.query:
+                self._prefetch_timer.start()
+            model.set_viewport_capacity(max(estimate_capacity(self.thumbnail_view), last - first + 1))
+
+    @Slot()
+    def _prefetch_thumbnails(self):
+        """Requests thumbnails for the images around those currently visible"""
+        model = self._model
+        if model is not None:
+            model.prefetch()
+
+    @Slot(int)
+    def _scan_progress(self, count):
+        """Callback for when the current model has found more images
+
+        Args:
+            count (int): number of images found so far
+        """
+        message = f"Scanning... {count} images found"
+        stats = self._model.scan_stats
+        if stats is not None and stats.files:
+            message += f" ({stats.file_rate:.0f} files/s)"
+        self.statusBar().showMessage(message)
+
+    @Slot(bool)
+    def _scan_finished(self, completed):
+        """Callback for when the current model has finished scanning its folder
+
+        Args:
+            completed (bool): True if the scan ran to completion, False if it was cancelled
+        """
+        self.scan_cancel_button.hide()
+        self.scan_progress_bar.hide()
+        count = self._model.max_count
+        message = f"Loaded {count} images" if completed else f"Scan cancelled, loaded {count} images"
+        stats = self._model.scan_stats
+        if stats is not None:
+            message += f", scanned {stats.folders} folders in {stats.elapsed:.1f}s " \
+                f"({stats.folder_rate:.0f} folders/s, {stats.file_rate:.0f} files/s)"
+        self.statusBar().showMessage(message)
+
+    @Slot(int)
+    def _images_changed(self, count):
+        """Callback for when images have been added to or removed from the current folder
+
+        Args:
+            count (int): number of images now in the folder
+        """
+        self._similarity_indexed = False
+        self.statusBar().showMessage(f"Loaded {count} images")
+
+    @Slot()
+    def scan_cancel_click(self):
+        """callback for the button used to cancel a folder scan"""
+        model = self._model
+        if model is not None:
+            model.cancel_scan()
 
     def _save_window_state(self):
         """Saves the current window state so it can be restored on next run"""
@@ -253,7 +1219,7 @@ class MainWindow(QMainWindow):
                 self._settings.setValue("pos", self.pos())
             self._settings.setValue("window_debug", self.window_debug_menu.isChecked())
         if self._last_path:
-            self._settings.setValue("last_path", self._last_path)
+            self._settings.setValue("last_path", str(self._last_path))
         self._settings.sync()
 
     @Slot()
@@ -264,17 +1230,191 @@ class MainWindow(QMainWindow):
         if not new_path:
             return
         self._last_path = Path(new_path)
-        model = ImageModel(self._last_path)
-        self.thumbnail_view.setModel(model)
-        self.statusBar().showMessage(f"Loaded {model.max_count} images")
+        self._load_folder(self._last_path)
+
+    @Slot()
+    def file_library_mode_click(self):
+        """callback for the file-library mode menu. Reloads the current folder in the new mode"""
+        self._app_settings.library_mode = self.file_library_mode_menu.isChecked()
+        if self._last_path:
+            self._load_folder(Path(self._last_path))
+
+    @Slot(str)
+    def filter_changed(self, text):
+        """callback for when the text in the filter box changes. Shows only the matching images
+
+        Args:
+            text (str): text the paths of the images must contain
+        """
+        self._filter_model.set_query(text)
+        self._update_visible_rows()
+
+    @Slot()
+    def view_sort_click(self):
+        """callback for the view-sort by and view-group by menus. Reorders the current images"""
+        sort_order = next(value for action, value in self._sort_actions.items() if action.isChecked())
+        grouping = next(value for action, value in self._group_actions.items() if action.isChecked())
+        self._app_settings.sort_order = sort_order
+        self._app_settings.group_by = grouping
+        model = self._model
+        if model is not None:
+            model.set_sort_order(sort_order, grouping)
 
     @Slot()
     def help_about_click(self):
         """callback for the help-about menu"""
-        dlg = AboutDialog(self, self._app_settings)
+        # dialogs are imported when first used, to keep them out of the startup path
+        from friendlypics2.dialogs.about_dlg import AboutDialog  # pylint: disable=import-outside-toplevel
+        dlg = AboutDialog(self, self._app_settings, self._thumbnail_cache)
         dlg.exec_()
         self._disable_window_save = dlg.cleared
 
+    @Slot()
+    def tools_find_duplicates_click(self):
+        """callback for the tools-find duplicates menu"""
+        model = self._model
+        if model is None or self._duplicate_finder.is_running:
+            return
+        self.statusBar().showMessage("Finding duplicates...")
+        pixel_size = thumbnail_pixel_size(self._thumbnail_loader.thumbnail_size,
+                                          self._thumbnail_loader.device_pixel_ratio)
+        self._duplicate_finder.start(model.folder, model.recursive, model.file_paths, pixel_size)
+
+    @Slot(int, int)
+    def _duplicates_progress(self, done, total):
+        """Callback for when the duplicate search has hashed another batch of images
+
+        Args:
+            done (int): number of images processed so far
+            total (int): total number of images to process
+        """
+        self.statusBar().showMessage(f"Finding duplicates... {done} of {total} images checked")
+
+    @Slot(object)
+    def _duplicates_found(self, groups):
+        """Callback for when the duplicate search finishes
+
+        Args:
+            groups (list (list (pathlib.Path))):
+                paths of the images in each group of similar images. None if the search was cancelled.
+        """
+        self.duplicates_view.clear()
+        if groups is None:
+            self.statusBar().showMessage("Duplicate search cancelled")
+            return
+        placeholder = QApplication.style().standardIcon(QStyle.SP_FileIcon)
+        for cur_group in groups:
+            group_item = QTreeWidgetItem(self.duplicates_view, [f"{len(cur_group)} similar images"])
+            for cur_path in cur_group:
+                child = QTreeWidgetItem(group_item, [cur_path.name])
+                child.setToolTip(0, str(cur_path))
+                child.setData(0, Qt.UserRole, cur_path)
+                child.setIcon(0, self._icon_cache.get(cur_path) or placeholder)
+            group_item.setExpanded(True)
+        self.statusBar().showMessage(f"Found {len(groups)} groups of similar images")
+        self.duplicates_dock.show()
+
+    @Slot(QPoint)
+    def _thumbnail_context_menu(self, pos):
+        """Callback for when the user requests the context menu for the thumbnail view
+
+        Args:
+            pos (QPoint): location of the request, relative to the view
+        """
+        index = self.thumbnail_view.indexAt(pos)
+        if not index.isValid():
+            return
+        self.thumbnail_view.setCurrentIndex(index)
+        menu = QMenu(self)
+        menu.addAction(self.thumbnail_open_menu)
+        menu.addAction(self.thumbnail_find_similar_menu)
+        menu.exec_(self.thumbnail_view.viewport().mapToGlobal(pos))
+
+    @Slot()
+    def thumbnail_open_click(self):
+        """callback for the open image menu, and for when an image is activated in the thumbnail view"""
+        model = self._model
+        if model is None:
+            return
+        file_path = model.path_for(self._filter_model.mapToSource(self.thumbnail_view.currentIndex()))
+        if file_path is None:
+            return
+        if self._viewer is None:
+            from friendlypics2.dialogs.image_viewer import ImageViewer  # pylint: disable=import-outside-toplevel
+            self._viewer = ImageViewer(self._app_settings, self)
+        self._viewer.show_image(file_path)
+
+    @Slot()
+    def thumbnail_find_similar_click(self):
+        """callback for the find similar images menu"""
+        model = self._model
+        if model is None or self._similarity_finder.is_running:
+            return
+        query_path = model.path_for(self._filter_model.mapToSource(self.thumbnail_view.currentIndex()))
+        if query_path is None:
+            return
+        self.statusBar().showMessage(f"Finding images similar to {query_path.name}...")
+        pixel_size = thumbnail_pixel_size(self._thumbnail_loader.thumbnail_size,
+                                          self._thumbnail_loader.device_pixel_ratio)
+        # only the first search needs to check every image in the folder, later searches
+        # reuse the embeddings calculated by the first one
+        paths = list() if self._similarity_indexed else model.file_paths
+        self._similarity_finder.start(query_path, paths, pixel_size, model.path_keys)
+
+    @Slot(int, int)
+    def _similarity_progress(self, done, total):
+        """Callback for when the similarity search has analysed another batch of images
+
+        Args:
+            done (int): number of images processed so far
+            total (int): total number of images to process
+        """
+        self.statusBar().showMessage(f"Finding similar images... {done} of {total} images checked")
+
+    @Slot(object)
+    def _similar_found(self, results):
+        """Callback for when the similarity search finishes
+
+        Args:
+            results (list (tuple (pathlib.Path, float))):
+                path and similarity of each matching image, most similar first. None if the
+                search was cancelled or failed.
+        """
+        self.similar_view.clear()
+        if results is None:
+            self.statusBar().showMessage("Similarity search cancelled")
+            return
+        self._similarity_indexed = True
+        placeholder = QApplication.style().standardIcon(QStyle.SP_FileIcon)
+        for cur_path, cur_score in results:
+            item = QTreeWidgetItem(self.similar_view, [f"{cur_path.name} ({cur_score:.0%})"])
+            item.setToolTip(0, str(cur_path))
+            item.setData(0, Qt.UserRole, cur_path)
+            item.setIcon(0, self._icon_cache.get(cur_path) or placeholder)
+        self.statusBar().showMessage(f"Found {len(results)} similar images")
+        self.similar_dock.show()
+
+    @Slot(QTreeWidgetItem, int)
+    def _search_result_activated(self, item, _column):
+        """Callback for when the user activates an image in the duplicates or similar images
+        views. Selects the image in the thumbnail view
+
+        Args:
+            item (QTreeWidgetItem): item that was activated
+        """
+        file_path = item.data(0, Qt.UserRole)
+        model = self._model
+        if file_path is None or model is None:
+            return
+        index = model.index_for(file_path)
+        if index.isValid() and not self._filter_model.mapFromSource(index).isValid():
+            # the image is hidden by the filter, so show everything again
+            self.filter_edit.clear()
+        index = self._filter_model.mapFromSource(index)
+        if index.isValid():
+            self.thumbnail_view.setCurrentIndex(index)
+            self.thumbnail_view.scrollTo(index)
+
     @Slot()
     def window_debug_click(self):
         """event handler for when the window->debug menu is clicked"""
@@ -283,9 +1423,60 @@ class MainWindow(QMainWindow):
         else:
             self.debug_dock.hide()
 
+    @Slot()
+    def _update_stats_timer(self):
+        """Starts refreshing the performance statistics when they are shown, and stops when they are hidden"""
+        if self.debug_dock.isVisible() and self.debug_tabs.currentWidget() is self.debug_stats_tab:
+            self._refresh_stats()
+            self._stats_timer.start()
+        else:
+            self._stats_timer.stop()
+
+    @Slot()
+    def _refresh_stats(self):
+        """Shows the latest performance statistics in the debug window"""
+        spans, counters = instrumentation.stats()
+        rows = [[cur.name, str(cur.count), f"{cur.p50 * 1000:.2f}", f"{cur.p95 * 1000:.2f}",
+                 f"{cur.max * 1000:.2f}", f"{cur.rate:.1f}"] for cur in spans]
+        rows.extend([cur.name, str(cur.total), "", "", "", f"{cur.rate:.1f}"] for cur in counters)
+
+        self.stats_view.setUpdatesEnabled(False)
+        self.stats_view.clear()
+        for cur_row in rows:
+            item = QTreeWidgetItem(cur_row)
+            for cur_column in range(1, len(cur_row)):
+                item.setTextAlignment(cur_column, Qt.AlignRight | Qt.AlignVCenter)
+            self.stats_view.addTopLevelItem(item)
+        self.stats_view.setUpdatesEnabled(True)
+
+    @Slot(bool)
+    def stats_record_click(self, checked):
+        """event handler for when the record button in the debug window is toggled"""
+        instrumentation.set_enabled(checked)
+
+    @Slot()
+    def stats_clear_click(self):
+        """event handler for when the clear button in the debug window is clicked"""
+        instrumentation.clear()
+        self.stats_view.clear()
+
+    @Slot()
+    def stats_save_trace_click(self):
+        """event handler for when the save trace button in the debug window is clicked"""
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "Chrome trace (*.json)")
+        if not file_name:
+            return
+        try:
+            instrumentation.write_chrome_trace(file_name)
+        except OSError as err:
+            self._log.error(f"Unable to save trace to {file_name}: {err}")
+            return
+        self.statusBar().showMessage(f"Saved trace to {file_name}")
+
     @Slot()
     def file_settings_click(self):
         """event handler for when the file->settings menu is clicked"""
+        from friendlypics2.dialogs.settings_dlg import SettingsDialog  # pylint: disable=import-outside-toplevel
         dlg = SettingsDialog(self, self._app_settings)
         dlg.exec_()
 
@@ -300,6 +1491,12 @@ class MainWindow(QMainWindow):
         if not self._disable_window_save:
             self._save_window_state()
         self._app_settings.save()
+        if self._viewer is not None:
+            self._viewer.view.shutdown()
+        self._duplicate_finder.cancel()
+        self._similarity_finder.cancel()
+        self._thumbnail_loader.shutdown()
+        self._log.debug(f"Thumbnail memory cache: {self._icon_cache}")
         event.accept()
 
 
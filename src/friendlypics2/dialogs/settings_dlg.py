@@ -5,29 +5,112 @@ from qtpy.QtWidgets import QDialog
 from qtpy.QtCore import Slot, QAbstractItemModel, QModelIndex, Qt
 from friendlypics2.misc.gui_helpers import load_ui
 
+# Number of child settings added to the tree at a time when a settings group is expanded
+FETCH_BATCH_SIZE = 500
+# Maximum number of settings matching a filter for the tree to be expanded automatically to show them
+AUTO_EXPAND_LIMIT = 200
+# Text shown in the column headers of the settings tree
+COLUMN_HEADERS = ("Setting", "Value")
+
+
+def _matches(key, value, text):
+    """Checks whether a setting, or any of the settings nested within it, matches a filter
+
+    Args:
+        key (str): name of the setting
+        value: value of the setting. Dictionaries are settings groups.
+        text (str): lower case text to search for in the names and values of the settings
+
+    Returns:
+        bool: True if the setting or one of its children contains the filter text
+    """
+    if text in str(key).lower():
+        return True
+    if isinstance(value, dict):
+        return any(_matches(cur_key, cur_value, text) for cur_key, cur_value in value.items())
+    return text in str(value).lower()
+
+
+def count_matches(data, text):
+    """Counts the number of settings whose names or values match a filter
+
+    Args:
+        data (dict): settings to search
+        text (str): lower case text to search for
+
+    Returns:
+        int: number of matching settings, including those nested within matching groups
+    """
+    retval = 0
+    for cur_key, cur_value in data.items():
+        if text in str(cur_key).lower():
+            retval += 1 + (_count_all(cur_value) if isinstance(cur_value, dict) else 0)
+        elif isinstance(cur_value, dict):
+            retval += count_matches(cur_value, text)
+        elif text in str(cur_value).lower():
+            retval += 1
+    return retval
+
+
+def _count_all(data):
+    """int: number of settings in a settings group, including all nested settings"""
+    return sum(1 + (_count_all(cur) if isinstance(cur, dict) else 0) for cur in data.values())
+
+
 # TODO: fix pylint warnings with this class - it's only used internally by the model below
 class SettingsItem:
     """Interface to a single application setting or group of application settings
 
+    The children of a settings group are created on demand, a batch at a time, so only the
+    parts of the settings tree that have been expanded in the view are ever built.
+
     Loosely based on example code found
     `here <https://github.com/pyside/Examples/blob/master/examples/itemviews/simpletreemodel/simpletreemodel.py>`__
     """
-    def __init__(self, data, parent=None):
+    def __init__(self, key, value, parent=None, row=0, filter_text=""):
         """
         Args:
-            data (tuple):
-                fields associated with this setting, providing data for each column in the view
+            key (str):
+                name of this setting
+            value:
+                value of this setting. Dictionaries are treated as settings groups, whose
+                entries become the children of this item.
             parent (SettingsItem):
                 parent setting that owns this one. Set to None to indicate this item is a root
                 setting with no parent
+            row (int):
+                offset of this item within the children of its parent
+            filter_text (str):
+                lower case text the children of this item must contain, in their names or
+                values or those of their own children, to be shown. Empty to show all children.
         """
-        self._log = logging.getLogger(__name__)
         self._parent_item = parent
-        self._item_data = data
+        self._row = row
+        self._key = key
+        self._value = value
+        self._filter_text = filter_text
+        self._path = parent.path + (key,) if parent else tuple()
         self._child_items = list()
+        # names of the children to show, found the first time the children are needed
+        self._child_keys = None
 
     def __str__(self):
-        return json.dumps(self._item_data, indent=4)
+        return json.dumps({self._key: self._value}, indent=4, default=str)
+
+    @property
+    def path(self):
+        """tuple (str): names of the settings groups containing this setting, followed by its own name"""
+        return self._path
+
+    @property
+    def is_group(self):
+        """bool: True if this item is a group of settings rather than a single setting"""
+        return isinstance(self._value, dict)
+
+    @property
+    def value(self):
+        """the value of this setting, or the dictionary of settings for a settings group"""
+        return self._value
 
     def set_data(self, value):
         """Modifies the data value for this setting
@@ -36,21 +119,55 @@ class SettingsItem:
             value (str):
                 new value for this setting
         """
-        self._item_data = (self._item_data[0], value)
+        self._value = value
 
     @property
     def child_items(self):
-        """list (SettingsItem): list of children owned by this item"""
+        """list (SettingsItem): list of children of this item that have been created so far"""
         return self._child_items
 
-    def appendChild(self, item):  # pylint: disable=invalid-name
-        """Adds a new child element to this setting in the tree
+    @property
+    def total_children(self):
+        """int: number of children shown for this item, including those not created yet"""
+        if self._child_keys is None:
+            if not self.is_group:
+                self._child_keys = list()
+            elif not self._filter_text:
+                self._child_keys = list(self._value)
+            else:
+                self._child_keys = [cur_key for cur_key, cur_value in self._value.items()
+                                    if _matches(cur_key, cur_value, self._filter_text)]
+        return len(self._child_keys)
+
+    def can_fetch_more(self):
+        """bool: True if some of the children of this item have not been created yet"""
+        return len(self._child_items) < self.total_children
+
+    def fetch_more(self, count, values=None):
+        """Creates the next batch of children for this item
 
         Args:
-            item (SettingsItem):
-                child item related to this one
+            count (int):
+                maximum number of children to create
+            values (dict):
+                values to show in place of the original ones, keyed by the path of the setting
+
+        Returns:
+            int: number of children created
         """
-        self._child_items.append(item)
+        first = len(self._child_items)
+        last = min(first + count, self.total_children)
+        for cur_key in self._child_keys[first:last]:
+            cur_value = self._value[cur_key]
+            child_filter = self._filter_text
+            if child_filter and child_filter in str(cur_key).lower():
+                # show the entire contents of groups whose names match
+                child_filter = ""
+            child = SettingsItem(cur_key, cur_value, self, len(self._child_items), child_filter)
+            if values and child.path in values:
+                child.set_data(values[child.path])
+            self._child_items.append(child)
+        return len(self._child_items) - first
 
     def child(self, row):
         """Gets a specific child item from this parent
@@ -65,19 +182,21 @@ class SettingsItem:
         return self._child_items[row]
 
     def childCount(self):  # pylint: disable=invalid-name
-        """int: number of children contained within this item"""
+        """int: number of children that have been created for this item"""
         return len(self._child_items)
 
-    def columnCount(self):  # pylint: disable=invalid-name
+    def columnCount(self):  # pylint: disable=invalid-name,no-self-use
         """int: number of columns or fields associated with this item"""
-        return len(self._item_data)
+        return len(COLUMN_HEADERS)
 
     def data(self, column):
         """str: data associated with this item for the given field / column.
         May be None if no data for the specified column exists."""
-        if column > len(self._item_data):
-            return None
-        return self._item_data[column]
+        if column == 0:
+            return self._key
+        if column == 1:
+            return "" if self.is_group else self._value
+        return None
 
     def parent(self):
         """SettingItem: parent object that owns this item, or None if this is a root item"""
@@ -85,15 +204,15 @@ class SettingsItem:
 
     def row(self):
         """int: gets the relative offset of this item with respect to its siblings"""
-        if self._parent_item:
-            return self._parent_item.child_items.index(self)
-
-        return 0
+        return self._row
 
 
 class AppSettingsModel(QAbstractItemModel):
     """Interface for rendering application settings stored in a hierarchical format
 
+    Settings groups are populated as they are expanded in the view, and edits are tracked
+    separately from the tree so they are retained when the tree is rebuilt by a filter.
+
     Loosely based on example code found
     `here <https://github.com/pyside/Examples/blob/master/examples/itemviews/simpletreemodel/simpletreemodel.py>`__
     """
@@ -106,34 +225,99 @@ class AppSettingsModel(QAbstractItemModel):
         super().__init__(None)
         self._log = logging.getLogger(__name__)
         self._settings = data
-        self._root_item = SettingsItem(("Setting", "Value"))
-        self._setup_model_data(self._settings.data, self._root_item)
+        self._filter_text = ""
+        # new values for the settings that have been edited, keyed by the path of the setting
+        self._edits = dict()
+        self._root_item = SettingsItem("", self._settings.data)
 
     @property
     def root_item(self):
         """SettingsItem: gets the root node of our settings tree"""
         return self._root_item
 
-    def _setup_model_data(self, data, parent):
-        """Helper method used to populate our model data
+    @property
+    def filter_text(self):
+        """str: text the names or values of the settings must contain to be shown"""
+        return self._filter_text
+
+    def set_filter(self, text):
+        """Shows only the settings whose names or values contain the given text, along with the
+        groups containing them. All of the settings within a matching group are shown.
 
         Args:
-            data (dict):
-                dictionary of settings to be managed by our model
-                nodes in the dictionary that contain nested dictionaries are assumed to be settings groups,
-                and all other nodes are assumed to be simple settings / data values
-            parent (SettingsItem):
-                reference to the parent item that will own all child items defined by the given data block
+            text (str): text to search for. Case insensitive. Empty to show all settings.
         """
-        for cur_key, cur_val in data.items():
-            if isinstance(cur_val, dict):
-                temp = SettingsItem((cur_key, ""), parent)
-            else:
-                temp = SettingsItem((cur_key, cur_val), parent)
+        text = text.strip().lower()
+        if text == self._filter_text:
+            return
+        self.beginResetModel()
+        self._filter_text = text
+        self._root_item = SettingsItem("", self._settings.data, filter_text=text)
+        self.endResetModel()
+
+    def settings_data(self):
+        """Generates the settings data with all of the edits made through the model applied
 
-            parent.appendChild(temp)
-            if isinstance(cur_val, dict):
-                self._setup_model_data(cur_val, temp)
+        Only the settings groups containing edited settings are copied, the rest of the
+        data is shared with the original settings.
+
+        Returns:
+            dict: updated settings data
+        """
+        retval = dict(self._settings.data)
+        copied = set()
+        for cur_path, cur_value in self._edits.items():
+            group = retval
+            for cur_depth, cur_key in enumerate(cur_path[:-1], 1):
+                if cur_path[:cur_depth] not in copied:
+                    group[cur_key] = dict(group[cur_key])
+                    copied.add(cur_path[:cur_depth])
+                group = group[cur_key]
+            group[cur_path[-1]] = cur_value
+        return retval
+
+    def canFetchMore(self, parent):  # pylint: disable=invalid-name
+        """Checks whether some of the children of a settings group have not been added to the model yet
+
+        Args:
+            parent (QModelIndex): index of the settings group to check
+
+        Returns:
+            bool: True if there are more children to add
+        """
+        if parent.column() > 0:
+            return False
+        item = parent.internalPointer() if parent.isValid() else self._root_item
+        return item.can_fetch_more()
+
+    def fetchMore(self, parent):  # pylint: disable=invalid-name
+        """Adds the next batch of children of a settings group to the model
+
+        Args:
+            parent (QModelIndex): index of the settings group to populate
+        """
+        item = parent.internalPointer() if parent.isValid() else self._root_item
+        first = item.childCount()
+        count = min(FETCH_BATCH_SIZE, item.total_children - first)
+        if count <= 0:
+            return
+        self.beginInsertRows(parent, first, first + count - 1)
+        item.fetch_more(count, self._edits)
+        self.endInsertRows()
+
+    def hasChildren(self, parent):  # pylint: disable=invalid-name
+        """Checks whether a given item has children, without creating them
+
+        Args:
+            parent (QModelIndex): index of the item to check
+
+        Returns:
+            bool: True if the item is a settings group with at least one child shown
+        """
+        if parent.column() > 0:
+            return False
+        item = parent.internalPointer() if parent.isValid() else self._root_item
+        return item.total_children > 0
 
     def columnCount(self, parent):  # pylint: disable=invalid-name
         """retrieves the number of fields associated with a given item
@@ -195,7 +379,10 @@ class AppSettingsModel(QAbstractItemModel):
             return False
 
         item = index.internalPointer()
+        if item.is_group:
+            return False
         item.set_data(value)
+        self._edits[item.path] = value
 
         # resync the data in the view
         self.dataChanged.emit(index, index)
@@ -215,6 +402,8 @@ class AppSettingsModel(QAbstractItemModel):
         if not index.isValid():
             return Qt.NoItemFlags
 
+        if index.internalPointer().is_group:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
 
     def headerData(self, section, orientation, role):  # pylint: disable=invalid-name
@@ -234,7 +423,7 @@ class AppSettingsModel(QAbstractItemModel):
             str: header text for the given section / column
         """
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self._root_item.data(section)
+            return COLUMN_HEADERS[section]
 
         return None
 
@@ -333,6 +522,7 @@ class SettingsDialog(QDialog):
 
         self.cancel_button.clicked.connect(self.close)
         self.save_button.clicked.connect(self._save_clicked)
+        self.filter_edit.textChanged.connect(self._filter_changed)
 
         model = AppSettingsModel(self._settings)
         self.settings_view.setModel(model)
@@ -341,30 +531,21 @@ class SettingsDialog(QDialog):
         parent_geom = self.parent().geometry()
         self.move(parent_geom.center() - self.rect().center())
 
-    def _load_data(self, item):
-        """helper method that dumps the raw data from the settings data model to a dictionary
+    @Slot(str)
+    def _filter_changed(self, text):
+        """Callback for when the text in the filter box changes. Shows only the matching settings
 
         Args:
-            item(SettingsItem):
-                reference to the item to retrieve settings data from. Data will be generated
-                recursively for all children owned by the settings item.
-
-        Returns:
-            dict: updated settings data loaded from the data model
+            text (str): text the names or values of the settings must contain
         """
-        retval = dict()
-        for cur_child in item.child_items:
-            if cur_child.child_items:
-                temp_data = self._load_data(cur_child)
-            else:
-                temp_data = cur_child.data(1)
-            retval[cur_child.data(0)] = temp_data
-        return retval
+        model = self.settings_view.model()
+        model.set_filter(text)
+        if model.filter_text and count_matches(self._settings.data, model.filter_text) <= AUTO_EXPAND_LIMIT:
+            self.settings_view.expandAll()
 
     @Slot()
     def _save_clicked(self):
         """Callback for when the user clicks the save button"""
-        new_data = self._load_data(self.settings_view.model().root_item)
-        self._settings.data = new_data
+        self._settings.data = self.settings_view.model().settings_data()
         self._settings.save()
         self.close()
@@ -0,0 +1 @@
+"""this sub package contains Python versions of the Qt Designer forms found in data/ui"""
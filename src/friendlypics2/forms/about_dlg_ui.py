@@ -0,0 +1,147 @@
+# pylint: skip-file
+# flake8: noqa
+"""Compiled version of data/ui/about_dlg.ui. Generated by friendlypics2.misc.ui_compiler, do not edit."""
+from qtpy.QtCore import *
+from qtpy.QtGui import *
+from qtpy.QtWidgets import *
+
+#: hash of the form this module was compiled from, used to detect when it is out of date
+UI_SOURCE_HASH = "81b9f0caf679c7100c08d032a5089b897892a5d6"
+
+################################################################################
+## Form generated from reading UI file 'about_dlg.ui'
+##
+## Created by: Qt User Interface Compiler version 5.15.0
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        if not Dialog.objectName():
+            Dialog.setObjectName(u"Dialog")
+        Dialog.setWindowModality(Qt.ApplicationModal)
+        Dialog.resize(441, 300)
+        Dialog.setModal(True)
+        self.verticalLayoutWidget = QWidget(Dialog)
+        self.verticalLayoutWidget.setObjectName(u"verticalLayoutWidget")
+        self.verticalLayoutWidget.setGeometry(QRect(0, 0, 441, 301))
+        self.verticalLayout = QVBoxLayout(self.verticalLayoutWidget)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.verticalLayout.setSizeConstraint(QLayout.SetMaximumSize)
+        self.verticalLayout.setContentsMargins(0, 0, 0, 0)
+        self.title_label = QLabel(self.verticalLayoutWidget)
+        self.title_label.setObjectName(u"title_label")
+        self.title_label.setAlignment(Qt.AlignCenter)
+
+        self.verticalLayout.addWidget(self.title_label)
+
+        self.runtime_env_label = QLabel(self.verticalLayoutWidget)
+        self.runtime_env_label.setObjectName(u"runtime_env_label")
+        self.runtime_env_label.setWordWrap(True)
+
+        self.verticalLayout.addWidget(self.runtime_env_label)
+
+        self.source_label = QLabel(self.verticalLayoutWidget)
+        self.source_label.setObjectName(u"source_label")
+        self.source_label.setTextFormat(Qt.AutoText)
+        self.source_label.setWordWrap(True)
+        self.source_label.setOpenExternalLinks(True)
+        self.source_label.setTextInteractionFlags(Qt.LinksAccessibleByKeyboard|Qt.LinksAccessibleByMouse|Qt.TextBrowserInteraction|Qt.TextSelectableByKeyboard|Qt.TextSelectableByMouse)
+
+        self.verticalLayout.addWidget(self.source_label)
+
+        self.docs_label = QLabel(self.verticalLayoutWidget)
+        self.docs_label.setObjectName(u"docs_label")
+        self.docs_label.setTextFormat(Qt.AutoText)
+        self.docs_label.setWordWrap(True)
+        self.docs_label.setOpenExternalLinks(True)
+        self.docs_label.setTextInteractionFlags(Qt.LinksAccessibleByKeyboard|Qt.LinksAccessibleByMouse|Qt.TextBrowserInteraction|Qt.TextSelectableByKeyboard|Qt.TextSelectableByMouse)
+
+        self.verticalLayout.addWidget(self.docs_label)
+
+        self.horizontalLayout = QHBoxLayout()
+        self.horizontalLayout.setObjectName(u"horizontalLayout")
+        self.horizontalLayout.setSizeConstraint(QLayout.SetDefaultConstraint)
+        self.gui_settings_label = QLabel(self.verticalLayoutWidget)
+        self.gui_settings_label.setObjectName(u"gui_settings_label")
+        self.gui_settings_label.setWordWrap(True)
+        self.gui_settings_label.setTextInteractionFlags(Qt.LinksAccessibleByMouse|Qt.TextSelectableByKeyboard|Qt.TextSelectableByMouse)
+
+        self.horizontalLayout.addWidget(self.gui_settings_label)
+
+        self.gui_settings_clear_button = QPushButton(self.verticalLayoutWidget)
+        self.gui_settings_clear_button.setObjectName(u"gui_settings_clear_button")
+        sizePolicy = QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.gui_settings_clear_button.sizePolicy().hasHeightForWidth())
+        self.gui_settings_clear_button.setSizePolicy(sizePolicy)
+        self.gui_settings_clear_button.setAutoDefault(False)
+
+        self.horizontalLayout.addWidget(self.gui_settings_clear_button)
+
+
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.app_settings_label = QLabel(self.verticalLayoutWidget)
+        self.app_settings_label.setObjectName(u"app_settings_label")
+        self.app_settings_label.setWordWrap(True)
+        self.app_settings_label.setTextInteractionFlags(Qt.LinksAccessibleByMouse|Qt.TextSelectableByKeyboard|Qt.TextSelectableByMouse)
+
+        self.verticalLayout.addWidget(self.app_settings_label)
+
+        self.horizontalLayout_2 = QHBoxLayout()
+        self.horizontalLayout_2.setObjectName(u"horizontalLayout_2")
+        self.thumbnail_cache_label = QLabel(self.verticalLayoutWidget)
+        self.thumbnail_cache_label.setObjectName(u"thumbnail_cache_label")
+        self.thumbnail_cache_label.setWordWrap(True)
+        self.thumbnail_cache_label.setTextInteractionFlags(Qt.LinksAccessibleByMouse|Qt.TextSelectableByKeyboard|Qt.TextSelectableByMouse)
+
+        self.horizontalLayout_2.addWidget(self.thumbnail_cache_label)
+
+        self.thumbnail_cache_clear_button = QPushButton(self.verticalLayoutWidget)
+        self.thumbnail_cache_clear_button.setObjectName(u"thumbnail_cache_clear_button")
+        sizePolicy.setHeightForWidth(self.thumbnail_cache_clear_button.sizePolicy().hasHeightForWidth())
+        self.thumbnail_cache_clear_button.setSizePolicy(sizePolicy)
+        self.thumbnail_cache_clear_button.setAutoDefault(False)
+
+        self.horizontalLayout_2.addWidget(self.thumbnail_cache_clear_button)
+
+
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+
+        self.buttonBox = QDialogButtonBox(self.verticalLayoutWidget)
+        self.buttonBox.setObjectName(u"buttonBox")
+        self.buttonBox.setOrientation(Qt.Horizontal)
+        self.buttonBox.setStandardButtons(QDialogButtonBox.Close)
+        self.buttonBox.setCenterButtons(True)
+
+        self.verticalLayout.addWidget(self.buttonBox)
+
+
+        self.retranslateUi(Dialog)
+        self.buttonBox.accepted.connect(Dialog.accept)
+        self.buttonBox.rejected.connect(Dialog.reject)
+
+        QMetaObject.connectSlotsByName(Dialog)
+    # setupUi
+
+    def retranslateUi(self, Dialog):
+        Dialog.setWindowTitle(QCoreApplication.translate("Dialog", u"About...", None))
+        self.title_label.setText(QCoreApplication.translate("Dialog", u"Friendly Pics 2", None))
+        self.runtime_env_label.setText(QCoreApplication.translate("Dialog", u"Running under default environment", None))
+        self.source_label.setText(QCoreApplication.translate("Dialog", u"<b>Source Code:</b> <a href=\"https://github.com/TheFriendlyCoder/friendlypics2\">https://github.com/TheFriendlyCoder/friendlypics2</a>", None))
+        self.docs_label.setText(QCoreApplication.translate("Dialog", u"<b>Documentation:</b> <a href=\"https://friendly-pics-2.readthedocs.io/en/latest/\">https://friendly-pics-2.readthedocs.io/en/latest/</a>", None))
+        self.gui_settings_label.setText(QCoreApplication.translate("Dialog", u"<b>GUI Settings:</b> FriendlyPics2.plist", None))
+        self.gui_settings_clear_button.setText(QCoreApplication.translate("Dialog", u"Clear", None))
+        self.app_settings_label.setText(QCoreApplication.translate("Dialog", u"<b>App Settings:</b>  appsettings.yml", None))
+        self.thumbnail_cache_label.setText(QCoreApplication.translate("Dialog", u"<b>Thumbnail Cache:</b> thumbnails", None))
+        self.thumbnail_cache_clear_button.setText(QCoreApplication.translate("Dialog", u"Clear", None))
+    # retranslateUi
+
+
+#: class that builds the form
+FORM_CLASS = Ui_Dialog
@@ -0,0 +1,327 @@
+# pylint: skip-file
+# flake8: noqa
+"""Compiled version of data/ui/main_window.ui. Generated by friendlypics2.misc.ui_compiler, do not edit."""
+from qtpy.QtCore import *
+from qtpy.QtGui import *
+from qtpy.QtWidgets import *
+
+#: hash of the form this module was compiled from, used to detect when it is out of date
+UI_SOURCE_HASH = "04f1d982ef0efd0a4f5d04fe5d66285990984c32"
+
+################################################################################
+## Form generated from reading UI file 'main_window.ui'
+##
+## Created by: Qt User Interface Compiler version 5.15.0
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+
+
+class Ui_main_window(object):
+    def setupUi(self, main_window):
+        if not main_window.objectName():
+            main_window.setObjectName(u"main_window")
+        main_window.resize(896, 665)
+        sizePolicy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(main_window.sizePolicy().hasHeightForWidth())
+        main_window.setSizePolicy(sizePolicy)
+        self.file_open_menu = QAction(main_window)
+        self.file_open_menu.setObjectName(u"file_open_menu")
+        self.help_about_menu = QAction(main_window)
+        self.help_about_menu.setObjectName(u"help_about_menu")
+        self.window_debug_menu = QAction(main_window)
+        self.window_debug_menu.setObjectName(u"window_debug_menu")
+        self.window_debug_menu.setCheckable(True)
+        self.file_library_mode_menu = QAction(main_window)
+        self.file_library_mode_menu.setObjectName(u"file_library_mode_menu")
+        self.file_library_mode_menu.setCheckable(True)
+        self.tools_find_duplicates_menu = QAction(main_window)
+        self.tools_find_duplicates_menu.setObjectName(u"tools_find_duplicates_menu")
+        self.thumbnail_open_menu = QAction(main_window)
+        self.thumbnail_open_menu.setObjectName(u"thumbnail_open_menu")
+        self.thumbnail_find_similar_menu = QAction(main_window)
+        self.thumbnail_find_similar_menu.setObjectName(u"thumbnail_find_similar_menu")
+        self.view_sort_name_menu = QAction(main_window)
+        self.view_sort_name_menu.setObjectName(u"view_sort_name_menu")
+        self.view_sort_name_menu.setCheckable(True)
+        self.view_sort_taken_menu = QAction(main_window)
+        self.view_sort_taken_menu.setObjectName(u"view_sort_taken_menu")
+        self.view_sort_taken_menu.setCheckable(True)
+        self.view_sort_modified_menu = QAction(main_window)
+        self.view_sort_modified_menu.setObjectName(u"view_sort_modified_menu")
+        self.view_sort_modified_menu.setCheckable(True)
+        self.view_sort_size_menu = QAction(main_window)
+        self.view_sort_size_menu.setObjectName(u"view_sort_size_menu")
+        self.view_sort_size_menu.setCheckable(True)
+        self.view_sort_dimensions_menu = QAction(main_window)
+        self.view_sort_dimensions_menu.setObjectName(u"view_sort_dimensions_menu")
+        self.view_sort_dimensions_menu.setCheckable(True)
+        self.view_group_none_menu = QAction(main_window)
+        self.view_group_none_menu.setObjectName(u"view_group_none_menu")
+        self.view_group_none_menu.setCheckable(True)
+        self.view_group_day_menu = QAction(main_window)
+        self.view_group_day_menu.setObjectName(u"view_group_day_menu")
+        self.view_group_day_menu.setCheckable(True)
+        self.view_group_month_menu = QAction(main_window)
+        self.view_group_month_menu.setObjectName(u"view_group_month_menu")
+        self.view_group_month_menu.setCheckable(True)
+        self.file_settings_menu = QAction(main_window)
+        self.file_settings_menu.setObjectName(u"file_settings_menu")
+        self.centralwidget = QWidget(main_window)
+        self.centralwidget.setObjectName(u"centralwidget")
+        self.central_layout = QVBoxLayout(self.centralwidget)
+        self.central_layout.setObjectName(u"central_layout")
+        self.central_layout.setContentsMargins(0, 0, 0, 0)
+        self.filter_edit = QLineEdit(self.centralwidget)
+        self.filter_edit.setObjectName(u"filter_edit")
+        self.filter_edit.setClearButtonEnabled(True)
+
+        self.central_layout.addWidget(self.filter_edit)
+
+        self.thumbnail_view = QListView(self.centralwidget)
+        self.thumbnail_view.setObjectName(u"thumbnail_view")
+        self.thumbnail_view.setIconSize(QSize(100, 100))
+        self.thumbnail_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.thumbnail_view.setViewMode(QListView.IconMode)
+
+        self.central_layout.addWidget(self.thumbnail_view)
+
+        main_window.setCentralWidget(self.centralwidget)
+        self.menubar = QMenuBar(main_window)
+        self.menubar.setObjectName(u"menubar")
+        self.menubar.setGeometry(QRect(0, 0, 896, 22))
+        self.menubar.setDefaultUp(False)
+        self.menubar.setNativeMenuBar(True)
+        self.file_menu = QMenu(self.menubar)
+        self.file_menu.setObjectName(u"file_menu")
+        self.menu_Help = QMenu(self.menubar)
+        self.menu_Help.setObjectName(u"menu_Help")
+        self.view_menu = QMenu(self.menubar)
+        self.view_menu.setObjectName(u"view_menu")
+        self.view_sort_menu = QMenu(self.view_menu)
+        self.view_sort_menu.setObjectName(u"view_sort_menu")
+        self.view_group_menu = QMenu(self.view_menu)
+        self.view_group_menu.setObjectName(u"view_group_menu")
+        self.tools_menu = QMenu(self.menubar)
+        self.tools_menu.setObjectName(u"tools_menu")
+        self.menuWindow = QMenu(self.menubar)
+        self.menuWindow.setObjectName(u"menuWindow")
+        main_window.setMenuBar(self.menubar)
+        self.statusbar = QStatusBar(main_window)
+        self.statusbar.setObjectName(u"statusbar")
+        main_window.setStatusBar(self.statusbar)
+        self.debug_dock = QDockWidget(main_window)
+        self.debug_dock.setObjectName(u"debug_dock")
+        self.debug_layout = QWidget()
+        self.debug_layout.setObjectName(u"debug_layout")
+        self.verticalLayout = QVBoxLayout(self.debug_layout)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.verticalLayout.setContentsMargins(0, 0, 0, 0)
+        self.debug_tabs = QTabWidget(self.debug_layout)
+        self.debug_tabs.setObjectName(u"debug_tabs")
+        self.debug_log_tab = QWidget()
+        self.debug_log_tab.setObjectName(u"debug_log_tab")
+        self.debug_log_layout = QVBoxLayout(self.debug_log_tab)
+        self.debug_log_layout.setObjectName(u"debug_log_layout")
+        self.debug_log_layout.setContentsMargins(0, 0, 0, 0)
+        self.debug_log = QPlainTextEdit(self.debug_log_tab)
+        self.debug_log.setObjectName(u"debug_log")
+
+        self.debug_log_layout.addWidget(self.debug_log)
+
+        self.debug_tabs.addTab(self.debug_log_tab, "")
+        self.debug_stats_tab = QWidget()
+        self.debug_stats_tab.setObjectName(u"debug_stats_tab")
+        self.debug_stats_layout = QVBoxLayout(self.debug_stats_tab)
+        self.debug_stats_layout.setObjectName(u"debug_stats_layout")
+        self.debug_stats_layout.setContentsMargins(0, 0, 0, 0)
+        self.debug_stats_buttons = QHBoxLayout()
+        self.debug_stats_buttons.setObjectName(u"debug_stats_buttons")
+        self.stats_record_button = QPushButton(self.debug_stats_tab)
+        self.stats_record_button.setObjectName(u"stats_record_button")
+        self.stats_record_button.setCheckable(True)
+
+        self.debug_stats_buttons.addWidget(self.stats_record_button)
+
+        self.stats_clear_button = QPushButton(self.debug_stats_tab)
+        self.stats_clear_button.setObjectName(u"stats_clear_button")
+
+        self.debug_stats_buttons.addWidget(self.stats_clear_button)
+
+        self.stats_save_trace_button = QPushButton(self.debug_stats_tab)
+        self.stats_save_trace_button.setObjectName(u"stats_save_trace_button")
+
+        self.debug_stats_buttons.addWidget(self.stats_save_trace_button)
+
+        self.debug_stats_spacer = QSpacerItem(0, 0, QSizePolicy.Expanding, QSizePolicy.Minimum)
+
+        self.debug_stats_buttons.addItem(self.debug_stats_spacer)
+
+
+        self.debug_stats_layout.addLayout(self.debug_stats_buttons)
+
+        self.stats_view = QTreeWidget(self.debug_stats_tab)
+        self.stats_view.setObjectName(u"stats_view")
+        self.stats_view.setRootIsDecorated(False)
+        self.stats_view.setUniformRowHeights(True)
+
+        self.debug_stats_layout.addWidget(self.stats_view)
+
+        self.debug_tabs.addTab(self.debug_stats_tab, "")
+
+        self.verticalLayout.addWidget(self.debug_tabs)
+
+        self.debug_dock.setWidget(self.debug_layout)
+        main_window.addDockWidget(Qt.BottomDockWidgetArea, self.debug_dock)
+        self.duplicates_dock = QDockWidget(main_window)
+        self.duplicates_dock.setObjectName(u"duplicates_dock")
+        self.duplicates_layout = QWidget()
+        self.duplicates_layout.setObjectName(u"duplicates_layout")
+        self.verticalLayout_2 = QVBoxLayout(self.duplicates_layout)
+        self.verticalLayout_2.setObjectName(u"verticalLayout_2")
+        self.verticalLayout_2.setContentsMargins(0, 0, 0, 0)
+        self.duplicates_view = QTreeWidget(self.duplicates_layout)
+        __qtreewidgetitem = QTreeWidgetItem()
+        __qtreewidgetitem.setText(0, u"1");
+        self.duplicates_view.setHeaderItem(__qtreewidgetitem)
+        self.duplicates_view.setObjectName(u"duplicates_view")
+        self.duplicates_view.setHeaderHidden(True)
+        self.duplicates_view.setIconSize(QSize(48, 48))
+
+        self.verticalLayout_2.addWidget(self.duplicates_view)
+
+        self.duplicates_dock.setWidget(self.duplicates_layout)
+        main_window.addDockWidget(Qt.RightDockWidgetArea, self.duplicates_dock)
+        self.similar_dock = QDockWidget(main_window)
+        self.similar_dock.setObjectName(u"similar_dock")
+        self.similar_layout = QWidget()
+        self.similar_layout.setObjectName(u"similar_layout")
+        self.verticalLayout_3 = QVBoxLayout(self.similar_layout)
+        self.verticalLayout_3.setObjectName(u"verticalLayout_3")
+        self.verticalLayout_3.setContentsMargins(0, 0, 0, 0)
+        self.similar_view = QTreeWidget(self.similar_layout)
+        __qtreewidgetitem1 = QTreeWidgetItem()
+        __qtreewidgetitem1.setText(0, u"1");
+        self.similar_view.setHeaderItem(__qtreewidgetitem1)
+        self.similar_view.setObjectName(u"similar_view")
+        self.similar_view.setHeaderHidden(True)
+        self.similar_view.setRootIsDecorated(False)
+        self.similar_view.setIconSize(QSize(48, 48))
+
+        self.verticalLayout_3.addWidget(self.similar_view)
+
+        self.similar_dock.setWidget(self.similar_layout)
+        main_window.addDockWidget(Qt.RightDockWidgetArea, self.similar_dock)
+
+        self.menubar.addAction(self.file_menu.menuAction())
+        self.menubar.addAction(self.view_menu.menuAction())
+        self.menubar.addAction(self.tools_menu.menuAction())
+        self.menubar.addAction(self.menuWindow.menuAction())
+        self.menubar.addAction(self.menu_Help.menuAction())
+        self.file_menu.addAction(self.file_open_menu)
+        self.file_menu.addAction(self.file_library_mode_menu)
+        self.file_menu.addSeparator()
+        self.file_menu.addAction(self.file_settings_menu)
+        self.menu_Help.addAction(self.help_about_menu)
+        self.view_menu.addAction(self.thumbnail_open_menu)
+        self.view_menu.addSeparator()
+        self.view_menu.addAction(self.view_sort_menu.menuAction())
+        self.view_menu.addAction(self.view_group_menu.menuAction())
+        self.view_sort_menu.addAction(self.view_sort_name_menu)
+        self.view_sort_menu.addAction(self.view_sort_taken_menu)
+        self.view_sort_menu.addAction(self.view_sort_modified_menu)
+        self.view_sort_menu.addAction(self.view_sort_size_menu)
+        self.view_sort_menu.addAction(self.view_sort_dimensions_menu)
+        self.view_group_menu.addAction(self.view_group_none_menu)
+        self.view_group_menu.addAction(self.view_group_day_menu)
+        self.view_group_menu.addAction(self.view_group_month_menu)
+        self.tools_menu.addAction(self.tools_find_duplicates_menu)
+        self.tools_menu.addAction(self.thumbnail_find_similar_menu)
+        self.menuWindow.addAction(self.window_debug_menu)
+
+        self.retranslateUi(main_window)
+
+        QMetaObject.connectSlotsByName(main_window)
+    # setupUi
+
+    def retranslateUi(self, main_window):
+        main_window.setWindowTitle(QCoreApplication.translate("main_window", u"MyWindow", None))
+        self.file_open_menu.setText(QCoreApplication.translate("main_window", u"&Open...", None))
+        self.help_about_menu.setText(QCoreApplication.translate("main_window", u"&About...", None))
+        self.window_debug_menu.setText(QCoreApplication.translate("main_window", u"&Debug Window", None))
+        self.file_library_mode_menu.setText(QCoreApplication.translate("main_window", u"Include &Subfolders", None))
+#if QT_CONFIG(statustip)
+        self.file_library_mode_menu.setStatusTip(QCoreApplication.translate("main_window", u"Show images from all sub folders of the selected folder", None))
+#endif // QT_CONFIG(statustip)
+        self.tools_find_duplicates_menu.setText(QCoreApplication.translate("main_window", u"Find &Duplicates", None))
+#if QT_CONFIG(statustip)
+        self.tools_find_duplicates_menu.setStatusTip(QCoreApplication.translate("main_window", u"Find groups of similar images in the current folder", None))
+#endif // QT_CONFIG(statustip)
+        self.thumbnail_open_menu.setText(QCoreApplication.translate("main_window", u"&Open Image", None))
+#if QT_CONFIG(statustip)
+        self.thumbnail_open_menu.setStatusTip(QCoreApplication.translate("main_window", u"Show the selected image at full resolution", None))
+#endif // QT_CONFIG(statustip)
+        self.thumbnail_find_similar_menu.setText(QCoreApplication.translate("main_window", u"Find &Similar Images", None))
+#if QT_CONFIG(statustip)
+        self.thumbnail_find_similar_menu.setStatusTip(QCoreApplication.translate("main_window", u"Find images in the library that look like the selected image", None))
+#endif // QT_CONFIG(statustip)
+        self.view_sort_name_menu.setText(QCoreApplication.translate("main_window", u"&Name", None))
+        self.view_sort_taken_menu.setText(QCoreApplication.translate("main_window", u"Date &Taken", None))
+#if QT_CONFIG(statustip)
+        self.view_sort_taken_menu.setStatusTip(QCoreApplication.translate("main_window", u"Sort by the date each image was taken, or its modification date if not known", None))
+#endif // QT_CONFIG(statustip)
+        self.view_sort_modified_menu.setText(QCoreApplication.translate("main_window", u"Date &Modified", None))
+        self.view_sort_size_menu.setText(QCoreApplication.translate("main_window", u"File &Size", None))
+        self.view_sort_dimensions_menu.setText(QCoreApplication.translate("main_window", u"&Dimensions", None))
+#if QT_CONFIG(statustip)
+        self.view_sort_dimensions_menu.setStatusTip(QCoreApplication.translate("main_window", u"Sort by the number of pixels in each image", None))
+#endif // QT_CONFIG(statustip)
+        self.view_group_none_menu.setText(QCoreApplication.translate("main_window", u"&None", None))
+        self.view_group_day_menu.setText(QCoreApplication.translate("main_window", u"&Day", None))
+#if QT_CONFIG(statustip)
+        self.view_group_day_menu.setStatusTip(QCoreApplication.translate("main_window", u"Show a header for each day, when sorted by date", None))
+#endif // QT_CONFIG(statustip)
+        self.view_group_month_menu.setText(QCoreApplication.translate("main_window", u"&Month", None))
+#if QT_CONFIG(statustip)
+        self.view_group_month_menu.setStatusTip(QCoreApplication.translate("main_window", u"Show a header for each month, when sorted by date", None))
+#endif // QT_CONFIG(statustip)
+        self.file_settings_menu.setText(QCoreApplication.translate("main_window", u"&Settings...", None))
+        self.filter_edit.setPlaceholderText(QCoreApplication.translate("main_window", u"Filter by name", None))
+#if QT_CONFIG(statustip)
+        self.file_menu.setStatusTip(QCoreApplication.translate("main_window", u"File related operations", None))
+#endif // QT_CONFIG(statustip)
+        self.file_menu.setTitle(QCoreApplication.translate("main_window", u"&File", None))
+        self.menu_Help.setTitle(QCoreApplication.translate("main_window", u"&Help", None))
+        self.view_menu.setTitle(QCoreApplication.translate("main_window", u"&View", None))
+        self.view_sort_menu.setTitle(QCoreApplication.translate("main_window", u"&Sort By", None))
+        self.view_group_menu.setTitle(QCoreApplication.translate("main_window", u"&Group By", None))
+        self.tools_menu.setTitle(QCoreApplication.translate("main_window", u"&Tools", None))
+        self.menuWindow.setTitle(QCoreApplication.translate("main_window", u"Window", None))
+        self.debug_tabs.setTabText(self.debug_tabs.indexOf(self.debug_log_tab), QCoreApplication.translate("main_window", u"Log", None))
+        self.stats_record_button.setText(QCoreApplication.translate("main_window", u"&Record", None))
+#if QT_CONFIG(tooltip)
+        self.stats_record_button.setToolTip(QCoreApplication.translate("main_window", u"Collect timings for the hot paths of the application", None))
+#endif // QT_CONFIG(tooltip)
+        self.stats_clear_button.setText(QCoreApplication.translate("main_window", u"&Clear", None))
+        self.stats_save_trace_button.setText(QCoreApplication.translate("main_window", u"&Save Trace...", None))
+#if QT_CONFIG(tooltip)
+        self.stats_save_trace_button.setToolTip(QCoreApplication.translate("main_window", u"Save the collected timings in the Chrome trace format", None))
+#endif // QT_CONFIG(tooltip)
+        ___qtreewidgetitem = self.stats_view.headerItem()
+        ___qtreewidgetitem.setText(5, QCoreApplication.translate("main_window", u"Rate (/s)", None));
+        ___qtreewidgetitem.setText(4, QCoreApplication.translate("main_window", u"Max (ms)", None));
+        ___qtreewidgetitem.setText(3, QCoreApplication.translate("main_window", u"p95 (ms)", None));
+        ___qtreewidgetitem.setText(2, QCoreApplication.translate("main_window", u"p50 (ms)", None));
+        ___qtreewidgetitem.setText(1, QCoreApplication.translate("main_window", u"Count", None));
+        ___qtreewidgetitem.setText(0, QCoreApplication.translate("main_window", u"Name", None));
+        self.debug_tabs.setTabText(self.debug_tabs.indexOf(self.debug_stats_tab), QCoreApplication.translate("main_window", u"Performance", None))
+        self.duplicates_dock.setWindowTitle(QCoreApplication.translate("main_window", u"Duplicates", None))
+        self.similar_dock.setWindowTitle(QCoreApplication.translate("main_window", u"Similar Images", None))
+    # retranslateUi
+
+
+#: class that builds the form
+FORM_CLASS = Ui_main_window
@@ -0,0 +1,83 @@
+# pylint: skip-file
+# flake8: noqa
+"""Compiled version of data/ui/settings_dlg.ui. Generated by friendlypics2.misc.ui_compiler, do not edit."""
+from qtpy.QtCore import *
+from qtpy.QtGui import *
+from qtpy.QtWidgets import *
+
+#: hash of the form this module was compiled from, used to detect when it is out of date
+UI_SOURCE_HASH = "57cd596f5a19d4e64396b5cf6168e93b992fceb7"
+
+################################################################################
+## Form generated from reading UI file 'settings_dlg.ui'
+##
+## Created by: Qt User Interface Compiler version 5.15.0
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+
+
+class Ui_settings_dialog(object):
+    def setupUi(self, settings_dialog):
+        if not settings_dialog.objectName():
+            settings_dialog.setObjectName(u"settings_dialog")
+        settings_dialog.setWindowModality(Qt.ApplicationModal)
+        settings_dialog.resize(507, 451)
+        settings_dialog.setModal(True)
+        self.verticalLayout = QVBoxLayout(settings_dialog)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.filter_edit = QLineEdit(settings_dialog)
+        self.filter_edit.setObjectName(u"filter_edit")
+        self.filter_edit.setClearButtonEnabled(True)
+
+        self.verticalLayout.addWidget(self.filter_edit)
+
+        self.settings_view = QTreeView(settings_dialog)
+        self.settings_view.setObjectName(u"settings_view")
+        self.settings_view.setUniformRowHeights(True)
+
+        self.verticalLayout.addWidget(self.settings_view)
+
+        self.horizontalLayout = QHBoxLayout()
+        self.horizontalLayout.setObjectName(u"horizontalLayout")
+        self.cancel_button = QPushButton(settings_dialog)
+        self.cancel_button.setObjectName(u"cancel_button")
+        sizePolicy = QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.cancel_button.sizePolicy().hasHeightForWidth())
+        self.cancel_button.setSizePolicy(sizePolicy)
+        self.cancel_button.setAutoDefault(False)
+
+        self.horizontalLayout.addWidget(self.cancel_button)
+
+        self.save_button = QPushButton(settings_dialog)
+        self.save_button.setObjectName(u"save_button")
+        sizePolicy.setHeightForWidth(self.save_button.sizePolicy().hasHeightForWidth())
+        self.save_button.setSizePolicy(sizePolicy)
+
+        self.horizontalLayout.addWidget(self.save_button)
+
+
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+
+        self.retranslateUi(settings_dialog)
+
+        self.cancel_button.setDefault(True)
+
+
+        QMetaObject.connectSlotsByName(settings_dialog)
+    # setupUi
+
+    def retranslateUi(self, settings_dialog):
+        settings_dialog.setWindowTitle(QCoreApplication.translate("settings_dialog", u"Settings", None))
+        self.filter_edit.setPlaceholderText(QCoreApplication.translate("settings_dialog", u"Filter settings", None))
+        self.cancel_button.setText(QCoreApplication.translate("settings_dialog", u"&Cancel", None))
+        self.save_button.setText(QCoreApplication.translate("settings_dialog", u"&Save", None))
+    # retranslateUi
+
+
+#: class that builds the form
+FORM_CLASS = Ui_settings_dialog
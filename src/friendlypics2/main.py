@@ -1,11 +1,60 @@
 """Main entry point module for the application"""
-import sys
-import logging
-from qtpy.QtWidgets import QApplication, QPlainTextEdit
-from qtpy.QtCore import Qt
-from friendlypics2.dialogs.main_window import MainWindow
-from friendlypics2.misc.gui_helpers import GuiLogger
-from friendlypics2.version import __version__
+import time
+_IMPORT_START = time.perf_counter_ns()
+# pylint: disable=wrong-import-position
+import sys  # noqa: E402
+import logging  # noqa: E402
+from qtpy.QtWidgets import QApplication, QPlainTextEdit  # noqa: E402
+from qtpy.QtCore import Qt, QObject, Slot  # noqa: E402
+from friendlypics2.dialogs.main_window import MainWindow  # noqa: E402
+from friendlypics2.misc.gui_helpers import GuiLogger, FirstPaintWatcher  # noqa: E402
+from friendlypics2.misc import instrumentation  # noqa: E402
+from friendlypics2.version import __version__  # noqa: E402
+
+
+class StartupReport(QObject):
+    """Measures the time taken by each stage of application startup, up to the first paint of the main window
+
+    The report is logged, and recorded as instrumentation spans when instrumentation is enabled
+    """
+    def __init__(self, import_start):
+        """
+        Args:
+            import_start (int): time at which the application started importing its modules,
+                as reported by time.perf_counter_ns
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._stages = [("imports", import_start)]
+        self._watcher = None
+
+    def start_stage(self, name):
+        """Records the start of the next stage of startup, which also ends the previous stage
+
+        Args:
+            name (str): name of the stage
+        """
+        self._stages.append((name, time.perf_counter_ns()))
+
+    def watch(self, widget):
+        """Ends the report when a widget is first painted
+
+        Args:
+            widget (QWidget): widget to watch
+        """
+        self._watcher = FirstPaintWatcher(widget, self)
+        self._watcher.painted.connect(self._report)
+
+    @Slot()
+    def _report(self):
+        """Logs the time taken by each stage of startup"""
+        end = time.perf_counter_ns()
+        times = list()
+        for (cur_name, cur_start), (_, cur_end) in zip(self._stages, self._stages[1:] + [(None, end)]):
+            instrumentation.record(f"startup/{cur_name}", cur_start, cur_end)
+            times.append(f"{cur_name} {(cur_end - cur_start) / 1e6:.0f}")
+        instrumentation.record("startup/first_paint", self._stages[0][1], end)
+        self._log.info(f"Time to first paint {(end - self._stages[0][1]) / 1e6:.0f} ms ({', '.join(times)} ms)")
 
 
 def configure_logging():
@@ -24,6 +73,8 @@ def run(args):
     Returns:
         int: return code to report back to the shell with
     """
+    startup = StartupReport(_IMPORT_START)
+    startup.start_stage("application")
     configure_logging()
 
     # HACK: this next line was needed to silence an odd warning message generated by Qt
@@ -37,7 +88,10 @@ def run(args):
     app.setApplicationVersion(__version__)
 
     # Configure our main window
+    startup.start_stage("main window")
     window = MainWindow()
+    startup.start_stage("show")
+    startup.watch(window.thumbnail_view.viewport())
     window.show()
 
     # Attach the Python logging system to the GUI
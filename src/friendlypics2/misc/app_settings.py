@@ -1,13 +1,53 @@
 """Interface for persisting application settings"""
 import logging
+import os
+import tempfile
 from pathlib import Path
 import json
 from copy import deepcopy
 
 import yaml
 from appdirs import user_config_dir
+from qtpy.QtCore import QTimer
+from friendlypics2.misc.file_types import IMAGE_FORMATS
+from friendlypics2.misc import instrumentation
+from friendlypics2.misc.image_sort import SORT_NAME, SORT_ORDERS, GROUP_NONE, GROUPINGS
 from friendlypics2.version import __version__
 
+# Default number of worker threads used to generate thumbnails
+DEFAULT_THUMBNAIL_WORKERS = min(4, os.cpu_count() or 1)
+# Default maximum number of thumbnail requests to queue up before discarding old ones
+DEFAULT_THUMBNAIL_QUEUE_SIZE = 256
+# Default number of images above and below the visible ones to generate thumbnails for
+DEFAULT_THUMBNAIL_PREFETCH = 100
+# Default maximum size of the on-disk thumbnail cache, in megabytes
+DEFAULT_THUMBNAIL_CACHE_MB = 512
+# Default maximum amount of memory used to hold decoded thumbnails, in megabytes
+DEFAULT_THUMBNAIL_MEMORY_MB = 128
+# Default maximum number of levels of sub folders to scan in library mode
+DEFAULT_LIBRARY_MAX_DEPTH = 16
+# Default glob patterns for files and folders to skip in library mode
+DEFAULT_LIBRARY_EXCLUDE = [".*", "@eaDir", "#recycle", "$RECYCLE.BIN"]
+# Default number of folders to scan in parallel in library mode
+DEFAULT_LIBRARY_WORKERS = 8
+# Default maximum number of bits the perceptual hashes of two images may differ by
+# for the images to be considered duplicates
+DEFAULT_DUPLICATE_DISTANCE = 8
+# Default number of results to show when searching for images that look like a given image
+DEFAULT_SIMILARITY_RESULTS = 50
+# Default image formats to show when scanning folders
+DEFAULT_IMAGE_FORMATS = list(IMAGE_FORMATS)
+# Default maximum amount of memory used to hold decoded tiles in the image viewer, in megabytes
+DEFAULT_VIEWER_CACHE_MB = 256
+# Default number of worker threads used to decode tiles in the image viewer
+DEFAULT_VIEWER_WORKERS = min(4, os.cpu_count() or 1)
+# Default delay, in milliseconds, between the last change to the settings and saving them automatically
+DEFAULT_AUTO_SAVE_DELAY = 2000
+
+# Use the much faster libyaml parser and emitter when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 class AppSettings:
     """Interface for accessing and persisting application settings"""
@@ -17,11 +57,15 @@ class AppSettings:
         self._filename = Path(temp).joinpath("appsettings.yml")
         self._log.debug(self._filename)
 
-        if self._filename.exists():
-            self._data = yaml.safe_load(self._filename.read_text())
-        else:
-            self._data = dict()
+        with instrumentation.span("settings/load"):
+            if self._filename.exists():
+                self._data = yaml.load(self._filename.read_text(), Loader=_YAML_LOADER) or dict()
+            else:
+                self._data = dict()
+        # a new file, or one from an older version, needs to be written out even if nothing else changes
+        self._modified = self._data.get("file_version") != "1.0"
         self._data["file_version"] = "1.0"
+        self._auto_save_timer = None
 
     def __str__(self):
         return json.dumps(self._data, indent=4)
@@ -29,12 +73,21 @@ class AppSettings:
     @property
     def data(self):
         """dict: reference to the raw settings data managed by this object.
-        Used exclusively for the settings dialog"""
+        Used exclusively for the settings dialog. Changes made through this reference
+        are not tracked, so assign the updated data back to this property to have them saved."""
         return self._data
 
     @data.setter
     def data(self, value):
+        if value == self._data:
+            return
         self._data = deepcopy(value)
+        self._changed()
+
+    @property
+    def modified(self):
+        """bool: True if the settings have changed since they were last loaded or saved"""
+        return self._modified
 
     @property
     def path(self):
@@ -48,13 +101,198 @@ class AppSettings:
 
     @pinterest_user.setter
     def pinterest_user(self, value):
-        # TODO: consider saving config data every time a setter is accessed
-        if "services" not in self._data:
-            self._data["services"] = dict()
-        if "pinterest" not in self._data["services"]:
-            self._data["services"]["pinterest"] = dict()
+        pinterest = self._get_group("services").setdefault("pinterest", dict())
+        if "username" in pinterest and pinterest["username"] == value:
+            return
+        pinterest["username"] = value
+        self._changed()
+
+    def _changed(self):
+        """Helper method that flags the settings as needing to be saved, and schedules
+        an automatic save if enabled"""
+        self._modified = True
+        if self._auto_save_timer is not None:
+            self._auto_save_timer.start()
+
+    def _set(self, group, key, value):
+        """Helper method that updates a setting, flagging the settings as modified if the value changed
+
+        Args:
+            group (str): name of the settings group containing the setting
+            key (str): name of the setting within the group
+            value: new value for the setting
+        """
+        settings = self._get_group(group)
+        if key in settings and settings[key] == value:
+            return
+        settings[key] = value
+        self._changed()
+
+    def _get_group(self, name):
+        """Helper method that retrieves a settings group, creating it if it doesn't exist
 
-        self._data["services"]["pinterest"]["username"] = value
+        Args:
+            name (str): name of the settings group to retrieve
+
+        Returns:
+            dict: reference to the settings data for the group
+        """
+        if name not in self._data:
+            self._data[name] = dict()
+        return self._data[name]
+
+    @property
+    def thumbnail_workers(self):
+        """int: number of worker threads used to generate thumbnails in the background"""
+        return int(self._data.get("thumbnails", dict()).get("workers", DEFAULT_THUMBNAIL_WORKERS))
+
+    @thumbnail_workers.setter
+    def thumbnail_workers(self, value):
+        self._set("thumbnails", "workers", int(value))
+
+    @property
+    def thumbnail_queue_size(self):
+        """int: maximum number of pending thumbnail requests before old requests are discarded"""
+        return int(self._data.get("thumbnails", dict()).get("queue_size", DEFAULT_THUMBNAIL_QUEUE_SIZE))
+
+    @thumbnail_queue_size.setter
+    def thumbnail_queue_size(self, value):
+        self._set("thumbnails", "queue_size", int(value))
+
+    @property
+    def thumbnail_prefetch(self):
+        """int: number of images above and below the visible ones to generate thumbnails for"""
+        return int(self._data.get("thumbnails", dict()).get("prefetch", DEFAULT_THUMBNAIL_PREFETCH))
+
+    @thumbnail_prefetch.setter
+    def thumbnail_prefetch(self, value):
+        self._set("thumbnails", "prefetch", int(value))
+
+    @property
+    def thumbnail_cache_mb(self):
+        """int: maximum amount of disk space, in megabytes, used to store generated thumbnails"""
+        return int(self._data.get("thumbnails", dict()).get("disk_cache_mb", DEFAULT_THUMBNAIL_CACHE_MB))
+
+    @thumbnail_cache_mb.setter
+    def thumbnail_cache_mb(self, value):
+        self._set("thumbnails", "disk_cache_mb", int(value))
+
+    @property
+    def thumbnail_memory_mb(self):
+        """int: maximum amount of memory, in megabytes, used to hold decoded thumbnails"""
+        return int(self._data.get("thumbnails", dict()).get("memory_cache_mb", DEFAULT_THUMBNAIL_MEMORY_MB))
+
+    @thumbnail_memory_mb.setter
+    def thumbnail_memory_mb(self, value):
+        self._set("thumbnails", "memory_cache_mb", int(value))
+
+    @property
+    def library_mode(self):
+        """bool: True if folders should be scanned recursively, including all sub folders"""
+        return bool(self._data.get("library", dict()).get("recursive", False))
+
+    @library_mode.setter
+    def library_mode(self, value):
+        self._set("library", "recursive", bool(value))
+
+    @property
+    def library_max_depth(self):
+        """int: maximum number of levels of sub folders to scan in library mode"""
+        return int(self._data.get("library", dict()).get("max_depth", DEFAULT_LIBRARY_MAX_DEPTH))
+
+    @library_max_depth.setter
+    def library_max_depth(self, value):
+        self._set("library", "max_depth", int(value))
+
+    @property
+    def library_exclude(self):
+        """list (str): glob patterns for file and folder names to skip in library mode"""
+        retval = self._data.get("library", dict()).get("exclude", DEFAULT_LIBRARY_EXCLUDE)
+        if isinstance(retval, str):
+            retval = [cur_pattern.strip() for cur_pattern in retval.split(",") if cur_pattern.strip()]
+        return list(retval)
+
+    @library_exclude.setter
+    def library_exclude(self, value):
+        self._set("library", "exclude", list(value))
+
+    @property
+    def library_workers(self):
+        """int: number of folders to scan in parallel in library mode"""
+        return int(self._data.get("library", dict()).get("workers", DEFAULT_LIBRARY_WORKERS))
+
+    @library_workers.setter
+    def library_workers(self, value):
+        self._set("library", "workers", int(value))
+
+    @property
+    def image_formats(self):
+        """list (str): names of the image formats to show when scanning folders"""
+        retval = self._data.get("scan", dict()).get("formats", DEFAULT_IMAGE_FORMATS)
+        if isinstance(retval, str):
+            retval = [cur_format.strip() for cur_format in retval.split(",") if cur_format.strip()]
+        return [cur_format.lower() for cur_format in retval]
+
+    @image_formats.setter
+    def image_formats(self, value):
+        self._set("scan", "formats", list(value))
+
+    @property
+    def duplicate_distance(self):
+        """int: maximum number of bits the perceptual hashes of two images may differ by
+        for the images to be considered duplicates"""
+        return int(self._data.get("duplicates", dict()).get("max_distance", DEFAULT_DUPLICATE_DISTANCE))
+
+    @duplicate_distance.setter
+    def duplicate_distance(self, value):
+        self._set("duplicates", "max_distance", int(value))
+
+    @property
+    def similarity_results(self):
+        """int: number of results to show when searching for images that look like a given image"""
+        return int(self._data.get("similarity", dict()).get("results", DEFAULT_SIMILARITY_RESULTS))
+
+    @similarity_results.setter
+    def similarity_results(self, value):
+        self._set("similarity", "results", int(value))
+
+    @property
+    def viewer_cache_mb(self):
+        """int: maximum amount of memory, in megabytes, used to hold decoded tiles in the image viewer"""
+        return int(self._data.get("viewer", dict()).get("memory_cache_mb", DEFAULT_VIEWER_CACHE_MB))
+
+    @viewer_cache_mb.setter
+    def viewer_cache_mb(self, value):
+        self._set("viewer", "memory_cache_mb", int(value))
+
+    @property
+    def viewer_workers(self):
+        """int: number of worker threads used to decode tiles in the image viewer"""
+        return int(self._data.get("viewer", dict()).get("workers", DEFAULT_VIEWER_WORKERS))
+
+    @viewer_workers.setter
+    def viewer_workers(self, value):
+        self._set("viewer", "workers", int(value))
+
+    @property
+    def sort_order(self):
+        """str: order to show images in. One of the orders defined in :mod:`friendlypics2.misc.image_sort`"""
+        retval = self._data.get("view", dict()).get("sort_order", SORT_NAME)
+        return retval if retval in SORT_ORDERS else SORT_NAME
+
+    @sort_order.setter
+    def sort_order(self, value):
+        self._set("view", "sort_order", str(value))
+
+    @property
+    def group_by(self):
+        """str: how to group images. One of the groupings defined in :mod:`friendlypics2.misc.image_sort`"""
+        retval = self._data.get("view", dict()).get("group_by", GROUP_NONE)
+        return retval if retval in GROUPINGS else GROUP_NONE
+
+    @group_by.setter
+    def group_by(self, value):
+        self._set("view", "group_by", str(value))
 
     @property
     def file_version(self):
@@ -62,8 +300,44 @@ class AppSettings:
         assert "file_version" in self._data
         return self._data.get("file_version")
 
-    def save(self):
-        """Saves the current contents of the app settings for later reference"""
-        self._filename.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
-        with self._filename.open("w") as config_file:
-            yaml.safe_dump(self._data, config_file)
+    def enable_auto_save(self, delay=DEFAULT_AUTO_SAVE_DELAY):
+        """Saves the settings automatically shortly after they are changed through one of
+        the properties of this class. Several changes made in quick succession are saved together.
+        Requires a running Qt event loop.
+
+        Args:
+            delay (int): time, in milliseconds, to wait after the last change before saving
+        """
+        if self._auto_save_timer is None:
+            self._auto_save_timer = QTimer()
+            self._auto_save_timer.setSingleShot(True)
+            self._auto_save_timer.timeout.connect(self.save)
+        self._auto_save_timer.setInterval(delay)
+
+    def save(self, force=False):
+        """Saves the current contents of the app settings for later reference
+
+        The file is only written when the settings have changed since they were loaded or last
+        saved. The new contents are written to a temporary file which then replaces the original,
+        so the existing settings are never left partially written.
+
+        Args:
+            force (bool): True to write the file even if the settings haven't changed
+        """
+        if self._auto_save_timer is not None:
+            self._auto_save_timer.stop()
+        if not self._modified and not force:
+            return
+        with instrumentation.span("settings/save"):
+            self._filename.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            handle, temp_name = tempfile.mkstemp(dir=self._filename.parent, prefix=".appsettings.", suffix=".tmp")
+            try:
+                with os.fdopen(handle, "w") as config_file:
+                    yaml.dump(self._data, config_file, Dumper=_YAML_DUMPER)
+                    config_file.flush()
+                    os.fsync(config_file.fileno())
+                os.replace(temp_name, self._filename)
+            except BaseException:
+                os.remove(temp_name)
+                raise
+        self._modified = False
@@ -0,0 +1,537 @@
+"""Persistent index of the images the application has seen, along with their metadata"""
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+from appdirs import user_data_dir
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from qtpy.QtGui import QImageReader
+from friendlypics2.misc.exif import read_exif_tags, TAG_DATE_TIME_ORIGINAL, TAG_MAKE, TAG_MODEL, TAG_ORIENTATION
+from friendlypics2.version import __version__
+
+# Number of records to write to the catalog in each transaction when updating it
+UPDATE_BATCH_SIZE = 500
+
+#: Metadata describing a single image in the catalog
+CatalogRecord = namedtuple(
+    "CatalogRecord",
+    ["path", "size", "mtime_ns", "width", "height", "format", "taken", "camera", "orientation"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    taken TEXT,
+    camera TEXT,
+    orientation INTEGER
+);
+CREATE INDEX IF NOT EXISTS images_folder ON images (folder);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dhash INTEGER NOT NULL,
+    phash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_hashes_folder ON image_hashes (folder);
+CREATE TABLE IF NOT EXISTS image_embeddings (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    row INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_embeddings_folder ON image_embeddings (folder);
+"""
+
+
+#: Perceptual hashes calculated for a single image in the catalog
+HashRecord = namedtuple("HashRecord", ["path", "size", "mtime_ns", "dhash", "phash"])
+
+#: Location of the visual similarity embedding for a single image in the catalog. The
+#: embedding itself is stored in a separate matrix, at the given row
+EmbeddingRecord = namedtuple("EmbeddingRecord", ["path", "size", "mtime_ns", "row"])
+
+
+def _to_signed(value):
+    """int: converts an unsigned 64 bit hash to the signed integers supported by SQLite"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    """int: converts a signed 64 bit integer loaded from SQLite back to an unsigned hash"""
+    return value + (1 << 64) if value < 0 else value
+
+
+def default_catalog_path():
+    """pathlib.Path: default location of the catalog database"""
+    temp = user_data_dir("Friendly Pics 2", "The Friendly Coder", __version__)
+    return Path(temp).joinpath("catalog.db")
+
+
+def read_metadata(file_path, stats):
+    """Extracts the metadata stored in the catalog from an image
+
+    Only the image header and EXIF data are read, the image itself is not decoded
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image to analyse
+        stats (os.stat_result):
+            file system statistics for the image
+
+    Returns:
+        CatalogRecord: metadata describing the image
+    """
+    reader = QImageReader(str(file_path))
+    size = reader.size()
+    image_format = bytes(reader.format()).decode("ascii", errors="replace") or None
+    tags = read_exif_tags(file_path)
+
+    # EXIF dates are formatted as YYYY:MM:DD HH:MM:SS. Convert to ISO format so they sort properly
+    taken = tags.get(TAG_DATE_TIME_ORIGINAL)
+    if taken and len(taken) >= 10:
+        taken = taken[:10].replace(":", "-") + taken[10:]
+    else:
+        taken = None
+    camera = " ".join(filter(None, [tags.get(TAG_MAKE), tags.get(TAG_MODEL)])) or None
+
+    return CatalogRecord(
+        str(file_path),
+        stats.st_size,
+        stats.st_mtime_ns,
+        size.width() if size.isValid() else None,
+        size.height() if size.isValid() else None,
+        image_format,
+        taken,
+        camera,
+        tags.get(TAG_ORIENTATION))
+
+
+class Catalog:
+    """Thread safe interface to the SQLite database containing the image catalog
+
+    Each thread gets its own database connection. The database runs in write-ahead-log
+    mode so readers never block behind the background tasks that keep it up to date.
+    """
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (pathlib.Path):
+                location of the database file. Will be created if it doesn't exist.
+        """
+        self._log = logging.getLogger(__name__)
+        self._db_path = db_path
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        """pathlib.Path: location of the database file"""
+        return self._db_path
+
+    def _connection(self):
+        """sqlite3.Connection: gets the database connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._db_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._db_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the database connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _folder_clause(folder, recursive):
+        """Generates the SQL needed to select the images in a folder
+
+        Args:
+            folder (pathlib.Path): folder to select
+            recursive (bool): True to include images in all sub folders as well
+
+        Returns:
+            tuple (str, tuple): the SQL condition and its parameters
+        """
+        if not recursive:
+            return "folder = ?", (str(folder),)
+        # select sub folders using a range over the index rather than a LIKE clause
+        prefix = os.path.join(str(folder), "")
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return "(folder = ? OR (folder >= ? AND folder < ?))", (str(folder), prefix, upper)
+
+    def list_folder(self, folder, recursive=False):
+        """Loads the catalog records for the images in a folder
+
+        Args:
+            folder (pathlib.Path): folder to load
+            recursive (bool): True to include images in all sub folders as well
+
+        Returns:
+            list (CatalogRecord): metadata for all images in the folder
+        """
+        clause, params = self._folder_clause(folder, recursive)
+        cursor = self._connection().execute(
+            "SELECT path, size, mtime_ns, width, height, format, taken, camera, orientation "
+            f"FROM images WHERE {clause}", params)
+        return [CatalogRecord(*cur_row) for cur_row in cursor]
+
+    def update(self, records):
+        """Adds or replaces records in the catalog
+
+        Args:
+            records (list (CatalogRecord)): metadata for the images to store
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO images "
+                "(path, folder, size, mtime_ns, width, height, format, taken, camera, orientation) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(cur.path, os.path.dirname(cur.path)) + tuple(cur[1:]) for cur in records])
+
+    def remove(self, paths):
+        """Removes records from the catalog
+
+        Args:
+            paths (list (str)): paths of the images to remove
+        """
+        params = [(str(cur),) for cur in paths]
+        conn = self._connection()
+        with conn:
+            conn.executemany("DELETE FROM images WHERE path = ?", params)
+            conn.executemany("DELETE FROM image_hashes WHERE path = ?", params)
+            conn.executemany("DELETE FROM image_embeddings WHERE path = ?", params)
+
+    def list_hashes(self, folder, recursive=False):
+        """Loads the perceptual hashes for the images in a folder
+
+        Args:
+            folder (pathlib.Path): folder to load
+            recursive (bool): True to include images in all sub folders as well
+
+        Returns:
+            list (HashRecord): hashes for all images in the folder that have been hashed
+        """
+        clause, params = self._folder_clause(folder, recursive)
+        cursor = self._connection().execute(
+            f"SELECT path, size, mtime_ns, dhash, phash FROM image_hashes WHERE {clause}", params)
+        return [
+            HashRecord(cur_path, cur_size, cur_mtime, _to_unsigned(cur_dhash), _to_unsigned(cur_phash))
+            for cur_path, cur_size, cur_mtime, cur_dhash, cur_phash in cursor]
+
+    def update_hashes(self, records):
+        """Adds or replaces the perceptual hashes for a set of images
+
+        Args:
+            records (list (HashRecord)): hashes to store
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO image_hashes (path, folder, size, mtime_ns, dhash, phash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(cur.path, os.path.dirname(cur.path), cur.size, cur.mtime_ns,
+                  _to_signed(cur.dhash), _to_signed(cur.phash)) for cur in records])
+
+    def list_embeddings(self, folder=None, recursive=False):
+        """Loads the locations of the visual similarity embeddings for a set of images
+
+        Args:
+            folder (pathlib.Path): folder to load. Loads the embeddings for all images if not provided.
+            recursive (bool): True to include images in all sub folders as well
+
+        Returns:
+            list (EmbeddingRecord): embedding locations for all images that have been analysed
+        """
+        query = "SELECT path, size, mtime_ns, row FROM image_embeddings"
+        params = tuple()
+        if folder is not None:
+            clause, params = self._folder_clause(folder, recursive)
+            query += f" WHERE {clause}"
+        return [EmbeddingRecord(*cur_row) for cur_row in self._connection().execute(query, params)]
+
+    def update_embeddings(self, records):
+        """Adds or replaces the locations of the visual similarity embeddings for a set of images
+
+        Args:
+            records (list (EmbeddingRecord)): embedding locations to store
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO image_embeddings (path, folder, size, mtime_ns, row) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(cur.path, os.path.dirname(cur.path)) + tuple(cur[1:]) for cur in records])
+
+    def clear_embeddings(self):
+        """Forgets the locations of all visual similarity embeddings, for when the matrix holding them is lost"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM image_embeddings")
+
+
+class _LoadSignals(QObject):
+    """Signals raised by load tasks. QRunnable is not a QObject so it can't own signals itself"""
+    # provides the cancellation event of the task, identifying the load it belongs to, and the result
+    loaded = Signal(object, object)
+
+
+class CatalogLoadTask(QRunnable):
+    """Unit of work that loads the catalog records for a folder on a worker thread"""
+    def __init__(self, catalog, folder, recursive, prepare, signals, cancelled):
+        """
+        Args:
+            catalog (Catalog):
+                catalog to load from
+            folder (pathlib.Path):
+                folder to load
+            recursive (bool):
+                True to include the records for all sub folders as well
+            prepare (callable):
+                optional function run on the worker thread to transform the records
+                before they are reported. Receives the list of records.
+            signals (_LoadSignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the load should be aborted
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._catalog = catalog
+        self._folder = folder
+        self._recursive = recursive
+        self._prepare = prepare
+        self._signals = signals
+        self._cancelled = cancelled
+
+    def run(self):
+        """Loads the records. Executed on a worker thread from the pool"""
+        records = list()
+        try:
+            records = self._catalog.list_folder(self._folder, self._recursive)
+        except (sqlite3.Error, OSError) as err:
+            self._log.error(f"Unable to load catalog {self._catalog.path}: {err}")
+        finally:
+            self._catalog.close()
+        if self._cancelled.is_set():
+            return
+        result = self._prepare(records) if self._prepare else records
+        if not self._cancelled.is_set():
+            self._signals.loaded.emit(self._cancelled, result)
+
+
+class CatalogLoader(QObject):
+    """Loads the catalog records for a folder in the background"""
+    #: Signal emitted on the GUI thread once the records have been loaded. Provides the
+    #: list of records, or whatever the prepare function passed to :meth:`start` returned
+    loaded = Signal(object)
+
+    def __init__(self, catalog, parent=None):
+        """
+        Args:
+            catalog (Catalog):
+                catalog to load from
+            parent (QObject):
+                optional Qt object that owns this loader
+        """
+        super().__init__(parent)
+        self._catalog = catalog
+        self._cancelled = threading.Event()
+        self._running = False
+        self._signals = _LoadSignals()
+        self._signals.loaded.connect(self._loaded)
+
+    @property
+    def is_running(self):
+        """bool: True if records are being loaded"""
+        return self._running
+
+    def start(self, folder, recursive, prepare=None):
+        """Starts loading records on a worker thread
+
+        Args:
+            folder (pathlib.Path):
+                folder to load
+            recursive (bool):
+                True to include the records for all sub folders as well
+            prepare (callable):
+                optional function run on the worker thread to transform the records
+                before they are reported. Receives the list of records.
+        """
+        # each load gets its own event, so cancelling never affects a later load
+        self._cancelled = threading.Event()
+        self._running = True
+        QThreadPool.globalInstance().start(
+            CatalogLoadTask(self._catalog, folder, recursive, prepare, self._signals, self._cancelled))
+
+    def cancel(self):
+        """Aborts the load. The loaded signal will not be emitted."""
+        self._cancelled.set()
+        self._running = False
+
+    @Slot(object, object)
+    def _loaded(self, cancelled, result):
+        """Callback for when a worker thread has loaded the records"""
+        # ignore results from loads that have since been cancelled or replaced
+        if cancelled is not self._cancelled or cancelled.is_set():
+            return
+        self._running = False
+        self.loaded.emit(result)
+
+
+class _UpdateSignals(QObject):
+    """Signals raised by update tasks. QRunnable is not a QObject so it can't own signals itself"""
+    records_updated = Signal(list)
+    finished = Signal(int)
+
+
+class CatalogUpdateTask(QRunnable):
+    """Unit of work that reconciles the catalog with the contents of a folder on a worker thread"""
+    def __init__(self, catalog, folder, recursive, paths, visited, signals, cancelled):
+        """
+        Args:
+            catalog (Catalog):
+                catalog to update
+            folder (pathlib.Path):
+                folder that was scanned
+            recursive (bool):
+                True if the scan included all sub folders
+            paths (list (pathlib.Path)):
+                paths of all images found in the folder
+            visited (list (pathlib.Path)):
+                folders whose contents were listed in full by the scan. Records for images
+                that weren't found are only removed from these folders.
+            signals (_UpdateSignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the update should be aborted
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._catalog = catalog
+        self._folder = folder
+        self._recursive = recursive
+        self._paths = paths
+        self._visited = visited
+        self._signals = signals
+        self._cancelled = cancelled
+
+    def run(self):
+        """Updates the catalog. Executed on a worker thread from the pool"""
+        total = 0
+        try:
+            known = {cur.path: cur for cur in self._catalog.list_folder(self._folder, self._recursive)}
+            batch = list()
+            for cur_path in self._paths:
+                if self._cancelled.is_set():
+                    return
+                key = str(cur_path)
+                record = known.pop(key, None)
+                try:
+                    stats = os.stat(cur_path)
+                except OSError:
+                    continue
+                if record and record.size == stats.st_size and record.mtime_ns == stats.st_mtime_ns:
+                    continue
+                batch.append(read_metadata(cur_path, stats))
+                if len(batch) >= UPDATE_BATCH_SIZE:
+                    self._flush(batch)
+                    total += len(batch)
+                    batch = list()
+            self._flush(batch)
+            total += len(batch)
+            # anything left over in the folders we visited no longer exists. Folders that were
+            # skipped, such as those beyond the depth limit or excluded by name, are left alone
+            visited = {str(cur_folder) for cur_folder in self._visited}
+            stale = [cur_path for cur_path in known if os.path.dirname(cur_path) in visited]
+            if stale:
+                self._catalog.remove(stale)
+        except (sqlite3.Error, OSError) as err:
+            self._log.error(f"Unable to update catalog {self._catalog.path}: {err}")
+        finally:
+            self._catalog.close()
+            self._signals.finished.emit(total)
+
+    def _flush(self, records):
+        """Writes a batch of records to the catalog and reports them to the GUI thread"""
+        if not records:
+            return
+        self._catalog.update(records)
+        self._signals.records_updated.emit(records)
+
+
+class CatalogUpdater(QObject):
+    """Brings the catalog records for a folder up to date in the background"""
+    #: Signal emitted on the GUI thread each time a batch of records is written to the catalog.
+    #: Provides a list of CatalogRecord objects
+    records_updated = Signal(list)
+    #: Signal emitted on the GUI thread when the update ends. Provides the number of records updated
+    finished = Signal(int)
+
+    def __init__(self, catalog, parent=None):
+        """
+        Args:
+            catalog (Catalog):
+                catalog to update
+            parent (QObject):
+                optional Qt object that owns this updater
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._catalog = catalog
+        self._cancelled = threading.Event()
+        self._signals = _UpdateSignals()
+        self._signals.records_updated.connect(self._records_updated)
+        self._signals.finished.connect(self._finished)
+
+    def start(self, folder, recursive, paths, visited):
+        """Starts updating the catalog on a worker thread
+
+        Args:
+            folder (pathlib.Path):
+                folder that was scanned
+            recursive (bool):
+                True if the scan included all sub folders
+            paths (list (pathlib.Path)):
+                paths of all images found in the folder
+            visited (list (pathlib.Path)):
+                folders whose contents were listed in full by the scan
+        """
+        self._cancelled.clear()
+        QThreadPool.globalInstance().start(
+            CatalogUpdateTask(self._catalog, folder, recursive, paths, visited, self._signals, self._cancelled))
+
+    def cancel(self):
+        """Aborts the update. Records written before the update is aborted are kept"""
+        self._cancelled.set()
+
+    @Slot(list)
+    def _records_updated(self, records):
+        """Callback for when the worker thread writes a batch of records"""
+        if not self._cancelled.is_set():
+            self.records_updated.emit(records)
+
+    @Slot(int)
+    def _finished(self, total):
+        """Callback for when the worker thread finishes updating the catalog"""
+        self._log.debug(f"Updated {total} catalog records")
+        self.finished.emit(total)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
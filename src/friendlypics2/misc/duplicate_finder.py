@@ -0,0 +1,221 @@
+"""Background service for finding groups of near duplicate images"""
+import logging
+import os
+import sqlite3
+import threading
+import numpy as np
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QSize, Signal, Slot
+from friendlypics2.misc.catalog import HashRecord
+from friendlypics2.misc.image_decoder import load_small_image
+from friendlypics2.misc.perceptual_hash import grey_pixels, dhash_batch, phash_batch, find_duplicate_groups, \
+    DHASH_WIDTH, DHASH_HEIGHT, PHASH_SIZE
+
+# Number of images to hash at a time
+HASH_BATCH_SIZE = 256
+# Size of the image decoded for hashing, when no thumbnail is available from the cache
+HASH_DECODE_SIZE = QSize(64, 64)
+
+
+class _DuplicateSignals(QObject):
+    """Signals raised by duplicate search tasks. QRunnable is not a QObject so it can't own signals itself"""
+    progress = Signal(int, int)
+    finished = Signal(object)
+
+
+class DuplicateSearchTask(QRunnable):
+    """Unit of work that hashes a set of images and groups those that are similar on a worker thread"""
+    def __init__(self, catalog, folder, recursive, paths, max_distance, signals, cancelled,
+                 thumbnail_cache=None, thumbnail_size=None):
+        """
+        Args:
+            catalog (Catalog):
+                catalog used to store the hashes of the images
+            folder (pathlib.Path):
+                folder containing the images
+            recursive (bool):
+                True if the images include those from all sub folders
+            paths (list (pathlib.Path)):
+                paths of the images to compare
+            max_distance (int):
+                maximum number of bits the hashes of two images may differ by for the
+                images to be considered duplicates
+            signals (_DuplicateSignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the search should be aborted
+            thumbnail_cache (DiskThumbnailCache):
+                optional cache of previously generated thumbnails to hash, to avoid
+                decoding the images
+            thumbnail_size (QSize):
+                size, in device pixels, of the thumbnails held in the cache
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._catalog = catalog
+        self._folder = folder
+        self._recursive = recursive
+        self._paths = paths
+        self._max_distance = max_distance
+        self._signals = signals
+        self._cancelled = cancelled
+        self._thumbnail_cache = thumbnail_cache
+        self._thumbnail_size = thumbnail_size
+
+    def run(self):
+        """Performs the search. Executed on a worker thread from the pool"""
+        groups = None
+        try:
+            hashes = self._hash_images()
+            if hashes is not None:
+                groups = find_duplicate_groups(hashes, self._max_distance)
+        except sqlite3.Error as err:
+            self._log.error(f"Unable to access catalog {self._catalog.path}: {err}")
+        finally:
+            self._catalog.close()
+            self._signals.finished.emit(groups)
+
+    def _hash_images(self):
+        """Helper method that loads or calculates the hashes for all of our images
+
+        Returns:
+            list (tuple):
+                path, DCT hash and difference hash for each image. None if the search was cancelled.
+        """
+        known = {cur.path: cur for cur in self._catalog.list_hashes(self._folder, self._recursive)}
+        retval = list()
+        batch = list()
+        total = len(self._paths)
+        for cur_index, cur_path in enumerate(self._paths):
+            if self._cancelled.is_set():
+                return None
+            try:
+                stats = os.stat(cur_path)
+            except OSError:
+                continue
+            record = known.get(str(cur_path))
+            if record and record.size == stats.st_size and record.mtime_ns == stats.st_mtime_ns:
+                retval.append((cur_path, record.phash, record.dhash))
+                continue
+
+            image = load_small_image(
+                cur_path, stats, HASH_DECODE_SIZE, self._thumbnail_cache, self._thumbnail_size)
+            if image.isNull():
+                continue
+            batch.append((cur_path, stats, grey_pixels(image, DHASH_WIDTH, DHASH_HEIGHT),
+                          grey_pixels(image, PHASH_SIZE, PHASH_SIZE)))
+            if len(batch) >= HASH_BATCH_SIZE:
+                retval.extend(self._hash_batch(batch))
+                batch = list()
+                self._signals.progress.emit(cur_index + 1, total)
+        retval.extend(self._hash_batch(batch))
+        self._signals.progress.emit(total, total)
+        return retval
+
+    def _hash_batch(self, batch):
+        """Calculates the hashes for a batch of images and saves them in the catalog
+
+        Args:
+            batch (list (tuple)):
+                path, file system statistics, and the pixels used to calculate the
+                difference and DCT hashes for each image
+
+        Returns:
+            list (tuple): path, DCT hash and difference hash for each image
+        """
+        if not batch:
+            return list()
+        dhashes = dhash_batch(np.stack([cur[2] for cur in batch]))
+        phashes = phash_batch(np.stack([cur[3] for cur in batch]))
+        self._catalog.update_hashes([
+            HashRecord(str(cur[0]), cur[1].st_size, cur[1].st_mtime_ns, cur_dhash, cur_phash)
+            for cur, cur_dhash, cur_phash in zip(batch, dhashes, phashes)])
+        return [(cur[0], cur_phash, cur_dhash) for cur, cur_dhash, cur_phash in zip(batch, dhashes, phashes)]
+
+
+class DuplicateFinder(QObject):
+    """Finds groups of near duplicate images, like bursts, re-exports and resized copies, in the background
+
+    The perceptual hashes calculated for each image are saved in the catalog, so only
+    images that are new or have changed need to be hashed when searching again
+    """
+    #: Signal emitted on the GUI thread as images are hashed. Provides the number of
+    #: images processed so far and the total number of images
+    progress = Signal(int, int)
+    #: Signal emitted on the GUI thread when the search ends. Provides a list of groups of
+    #: similar images, each of which is a list of pathlib.Path objects. Will be None if the
+    #: search was cancelled or failed.
+    finished = Signal(object)
+
+    def __init__(self, catalog, max_distance, thumbnail_cache=None, parent=None):
+        """
+        Args:
+            catalog (Catalog):
+                catalog used to store the hashes of the images
+            max_distance (int):
+                maximum number of bits the hashes of two images may differ by for the
+                images to be considered duplicates
+            thumbnail_cache (DiskThumbnailCache):
+                optional cache of previously generated thumbnails to hash, to avoid
+                decoding the images
+            parent (QObject):
+                optional Qt object that owns this finder
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._catalog = catalog
+        self._max_distance = max_distance
+        self._thumbnail_cache = thumbnail_cache
+        self._cancelled = threading.Event()
+        self._running = False
+        self._signals = _DuplicateSignals()
+        self._signals.progress.connect(self._progress)
+        self._signals.finished.connect(self._finished)
+
+    @property
+    def is_running(self):
+        """bool: True if a search is currently in progress"""
+        return self._running
+
+    def start(self, folder, recursive, paths, thumbnail_size=None):
+        """Starts searching for duplicates on a worker thread
+
+        Args:
+            folder (pathlib.Path):
+                folder containing the images
+            recursive (bool):
+                True if the images include those from all sub folders
+            paths (list (pathlib.Path)):
+                paths of the images to compare
+            thumbnail_size (QSize):
+                optional size, in device pixels, of the thumbnails held in the thumbnail
+                cache. Cached thumbnails are only used if this is provided.
+        """
+        self._cancelled = threading.Event()
+        self._running = True
+        QThreadPool.globalInstance().start(DuplicateSearchTask(
+            self._catalog, folder, recursive, paths, self._max_distance, self._signals, self._cancelled,
+            self._thumbnail_cache, thumbnail_size))
+
+    def cancel(self):
+        """Aborts the search"""
+        self._cancelled.set()
+
+    @Slot(int, int)
+    def _progress(self, done, total):
+        """Callback for when the worker thread has hashed another batch of images"""
+        if not self._cancelled.is_set():
+            self.progress.emit(done, total)
+
+    @Slot(object)
+    def _finished(self, groups):
+        """Callback for when the worker thread finishes searching"""
+        self._running = False
+        if self._cancelled.is_set():
+            groups = None
+        if groups is not None:
+            self._log.debug(f"Found {len(groups)} groups of similar images")
+        self.finished.emit(groups)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
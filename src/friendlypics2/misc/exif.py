@@ -0,0 +1,171 @@
+"""Minimal, dependency free parser for the EXIF metadata stored in JPEG and TIFF based images
+
+Only the small subset of EXIF needed by the application is supported: numeric and text
+tags from the primary image directory, the Exif sub directory, and the location of the
+embedded thumbnail. Typically only the first few KB of a file need to be read.
+"""
+import logging
+import struct
+
+# Number of bytes read from the start of a file when looking for EXIF data
+# JPEG files store their EXIF data in an APP1 segment which is limited to 64KB
+EXIF_HEADER_BYTES = 64 * 1024
+
+# TIFF / EXIF tags used by the application
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_EXIF_IFD = 0x8769
+TAG_THUMBNAIL_OFFSET = 0x0201
+TAG_THUMBNAIL_LENGTH = 0x0202
+TAG_DATE_TIME_ORIGINAL = 0x9003
+TAG_PIXEL_WIDTH = 0xA002
+TAG_PIXEL_HEIGHT = 0xA003
+
+# TIFF field types supported by the parser
+_TYPE_ASCII = 2
+_TYPE_SHORT = 3
+_TYPE_LONG = 4
+
+
+class TiffReader:
+    """Parser for the TIFF structures used to store EXIF metadata"""
+    def __init__(self, file_handle, data, base):
+        """
+        Args:
+            file_handle (io.BufferedReader):
+                open file containing the TIFF data
+            data (bytes):
+                TIFF data that has already been read from the file
+            base (int):
+                offset within the file where the TIFF header is located
+        """
+        self._file = file_handle
+        self._data = data
+        self._base = base
+        self._endian = "<" if data[:2] == b"II" else ">"
+
+    def read(self, offset, length):
+        """Reads bytes relative to the start of the TIFF header, only touching the disk
+        when the data lies outside of the portion of the file that has already been read
+
+        Args:
+            offset (int): position of the data relative to the TIFF header
+            length (int): number of bytes to read
+
+        Returns:
+            bytes: data read from the file. May be truncated if the file is too short.
+        """
+        if offset + length <= len(self._data):
+            return self._data[offset:offset + length]
+        self._file.seek(self._base + offset)
+        return self._file.read(length)
+
+    def first_ifd(self):
+        """int: offset of the first image file directory"""
+        return struct.unpack(self._endian + "I", self._data[4:8])[0]
+
+    def parse_ifd(self, offset):
+        """Loads the tags from an image file directory
+
+        Only text tags and tags containing a single SHORT or LONG value are loaded, which
+        covers all of the tags used by the application
+
+        Args:
+            offset (int): position of the directory relative to the TIFF header
+
+        Returns:
+            tuple (dict, int):
+                mapping of tag IDs to their values, and the offset of the next
+                directory in the chain, or 0 if there are no more directories
+        """
+        header = self.read(offset, 2)
+        if len(header) < 2:
+            return dict(), 0
+        count = struct.unpack(self._endian + "H", header)[0]
+        entries = self.read(offset + 2, count * 12 + 4)
+        if len(entries) < count * 12 + 4:
+            return dict(), 0
+
+        retval = dict()
+        for cur_entry in range(count):
+            position = cur_entry * 12
+            tag, field_type, value_count = struct.unpack_from(self._endian + "HHI", entries, position)
+            if field_type == _TYPE_ASCII:
+                if value_count <= 4:
+                    raw = entries[position + 8:position + 8 + value_count]
+                else:
+                    raw = self.read(struct.unpack_from(self._endian + "I", entries, position + 8)[0], value_count)
+                retval[tag] = raw.split(b"\x00", 1)[0].decode("ascii", errors="replace").strip()
+            elif value_count != 1:
+                continue
+            elif field_type == _TYPE_SHORT:
+                retval[tag] = struct.unpack_from(self._endian + "H", entries, position + 8)[0]
+            elif field_type == _TYPE_LONG:
+                retval[tag] = struct.unpack_from(self._endian + "I", entries, position + 8)[0]
+        next_ifd = struct.unpack_from(self._endian + "I", entries, count * 12)[0]
+        return retval, next_ifd
+
+
+def open_tiff(file_handle):
+    """Locates the EXIF data at the start of a JPEG or TIFF based (ie: most RAW formats) image
+
+    Args:
+        file_handle (io.BufferedReader): open file to parse
+
+    Returns:
+        TiffReader: parser for the EXIF data, or None if the file has no EXIF data
+    """
+    head = file_handle.read(EXIF_HEADER_BYTES)
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return TiffReader(file_handle, head, 0)
+    if head[:2] != b"\xff\xd8":
+        return None
+
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        # stop once we hit the end of the file or the start of the compressed image data
+        if marker in (0xD9, 0xDA):
+            return None
+        segment_length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and head[pos + 4:pos + 10] == b"Exif\x00\x00":
+            start = pos + 10
+            data = head[start:pos + 2 + segment_length]
+            if len(data) < segment_length - 8:
+                file_handle.seek(start)
+                data = file_handle.read(segment_length - 8)
+            if len(data) < 8:
+                return None
+            return TiffReader(file_handle, data, start)
+        pos += 2 + segment_length
+    return None
+
+
+def read_exif_tags(file_path):
+    """Loads the tags from the primary image directory and the Exif sub directory of an image
+
+    Args:
+        file_path (pathlib.Path): path to the image to parse
+
+    Returns:
+        dict: mapping of tag IDs to their values. Empty if the image has no EXIF data.
+    """
+    try:
+        with open(file_path, "rb") as file_handle:
+            tiff = open_tiff(file_handle)
+            if tiff is None:
+                return dict()
+            retval, _ = tiff.parse_ifd(tiff.first_ifd())
+            if TAG_EXIF_IFD in retval:
+                retval.update(tiff.parse_ifd(retval[TAG_EXIF_IFD])[0])
+            return retval
+    except (OSError, struct.error) as err:
+        logging.getLogger(__name__).debug(f"Unable to read EXIF data from {file_path}: {err}")
+        return dict()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,155 @@
+"""Helpers for quickly identifying which files contain images"""
+import logging
+
+#: Maps the file extensions of supported image files to the name of their format
+IMAGE_EXTENSIONS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".jpe": "jpeg",
+    ".jfif": "jpeg",
+    ".png": "png",
+    ".gif": "gif",
+    ".bmp": "bmp",
+    ".dib": "bmp",
+    ".tif": "tiff",
+    ".tiff": "tiff",
+    ".webp": "webp",
+    ".heic": "heif",
+    ".heif": "heif",
+    ".avif": "heif",
+    ".ico": "ico",
+    ".ppm": "pnm",
+    ".pgm": "pnm",
+    ".pbm": "pnm",
+    ".cr2": "raw",
+    ".cr3": "raw",
+    ".crw": "raw",
+    ".nef": "raw",
+    ".nrw": "raw",
+    ".arw": "raw",
+    ".srf": "raw",
+    ".sr2": "raw",
+    ".dng": "raw",
+    ".orf": "raw",
+    ".rw2": "raw",
+    ".raf": "raw",
+    ".pef": "raw",
+    ".srw": "raw",
+    ".x3f": "raw",
+}
+
+#: List of all supported image formats
+IMAGE_FORMATS = sorted(set(IMAGE_EXTENSIONS.values()))
+
+#: File extensions commonly found alongside images that are known not to be images. Files
+#: with these extensions are rejected without reading them.
+NON_IMAGE_EXTENSIONS = {
+    ".xmp", ".txt", ".json", ".xml", ".pdf", ".doc", ".docx", ".html", ".htm", ".md", ".log",
+    ".mov", ".mp4", ".m4v", ".avi", ".mts", ".m2ts", ".mkv", ".wmv", ".3gp", ".mpg", ".mpeg",
+    ".wav", ".mp3", ".m4a", ".aac", ".flac", ".thm", ".lrv", ".aae", ".db", ".ini", ".lnk",
+    ".zip", ".7z", ".rar", ".gz", ".tmp", ".bak", ".pp3", ".dop", ".on1", ".psd", ".xcf",
+    ".exe", ".dll", ".py", ".sh",
+}
+
+# Number of bytes read from files with unrecognized extensions to identify their contents
+SNIFF_BYTES = 32
+
+# Leading "magic" bytes identifying image formats. Each entry gives the offset of the
+# signature within the file, the signature itself, and the associated image format
+_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (0, b"BM", "bmp"),
+    (0, b"II*\x00", "tiff"),
+    (0, b"MM\x00*", "tiff"),
+    (0, b"\x00\x00\x01\x00", "ico"),
+    (4, b"ftypheic", "heif"),
+    (4, b"ftypheix", "heif"),
+    (4, b"ftypmif1", "heif"),
+    (4, b"ftypavif", "heif"),
+    (4, b"ftypcrx ", "raw"),
+    (0, b"FUJIFILMCCD-RAW", "raw"),
+]
+
+
+def sniff_format(path):
+    """Identifies the format of an image from the first few bytes of its contents
+
+    Args:
+        path (str): path to the file to analyse
+
+    Returns:
+        str: name of the image format, or None if the file is not a recognized image
+    """
+    try:
+        with open(path, "rb") as file_handle:
+            header = file_handle.read(SNIFF_BYTES)
+    except OSError as err:
+        logging.getLogger(__name__).debug(f"Unable to read {path}: {err}")
+        return None
+
+    for offset, signature, image_format in _SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return image_format
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[:1] == b"P" and header[1:2] in (b"1", b"2", b"3", b"4", b"5", b"6"):
+        return "pnm"
+    return None
+
+
+class FileClassifier:
+    """Identifies image files, optionally restricted to a subset of the supported formats
+
+    Files are classified by extension whenever possible. Only files with extensions that
+    aren't recognized are read, and then only their first few bytes.
+
+    Safe to use from multiple threads at once.
+    """
+    def __init__(self, formats=None):
+        """
+        Args:
+            formats (list (str)):
+                optional list of image formats to accept. Defaults to all
+                formats listed in IMAGE_FORMATS.
+        """
+        self._formats = frozenset(formats if formats is not None else IMAGE_FORMATS)
+
+    @property
+    def formats(self):
+        """frozenset (str): names of the image formats accepted by this classifier"""
+        return self._formats
+
+    def classify(self, name, path):
+        """Identifies the format of a file
+
+        Args:
+            name (str): name of the file, excluding the path
+            path (str): full path to the file. Only used if the file needs to be read.
+
+        Returns:
+            str:
+                name of the image format, or None if the file is not an image or
+                is in a format that was not requested
+        """
+        # hidden files are typically junk left behind by other tools, like .DS_Store
+        if name.startswith("."):
+            return None
+
+        dot = name.rfind(".")
+        extension = name[dot:].lower() if dot > 0 else ""
+        if extension in NON_IMAGE_EXTENSIONS:
+            return None
+        image_format = IMAGE_EXTENSIONS.get(extension)
+        if image_format is None:
+            image_format = sniff_format(path)
+
+        if image_format not in self._formats:
+            return None
+        return image_format
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
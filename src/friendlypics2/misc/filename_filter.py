@@ -0,0 +1,588 @@
+"""Filtering of the images shown to the user by file name, as they type
+
+Matching is backed by an index of the three character sequences (trigrams) found in the
+relative path of each image, so a query only needs to check the few images that contain
+every trigram in the query rather than every image in the folder.
+"""
+import bisect
+import logging
+import os
+import numpy as np
+from qtpy.QtCore import QAbstractProxyModel, QModelIndex, QPersistentModelIndex, Slot
+
+# Maximum number of images added since the index was last built that are searched one by one.
+# The index is rebuilt once more images than this have been added.
+MAX_UNINDEXED = 1000
+# Maximum number of separate ranges of rows inserted or removed individually when the query
+# changes. Larger numbers of changes are applied by resetting the model in one pass.
+MAX_INCREMENTAL_CHANGES = 1000
+# Minimum number of matching images exposed each time the view asks for more rows while
+# a filter is applied
+FETCH_BATCH_SIZE = 100
+
+
+def _trigram_codes(data):
+    """Packs each sequence of three bytes in some UTF-8 encoded text into an integer
+
+    Args:
+        data (numpy.ndarray): 8 bit unsigned bytes
+
+    Returns:
+        numpy.ndarray: 32 bit code for each sequence, starting at each byte but the last two
+    """
+    data = data.astype(np.uint32)
+    return (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+
+
+class FilenameIndex:
+    """Trigram index over the lower case relative paths of a set of images
+
+    Trigrams are taken from the UTF-8 encoded paths and stored in sorted NumPy arrays, so
+    the index for hundreds of thousands of images can be built in a fraction of a second
+    and the images containing a trigram found with a binary search.
+    """
+    def __init__(self, folder):
+        """
+        Args:
+            folder (pathlib.Path):
+                folder the indexed paths are relative to
+        """
+        self._prefix = os.path.join(str(folder), "")
+        self._paths = list()
+        self._text = list()
+        self._ids = dict()
+        # sorted trigram codes, and the ID of the image each trigram appears in
+        self._codes = np.empty(0, np.uint32)
+        self._postings = np.empty(0, np.uint32)
+        self._indexed = 0
+
+    def __len__(self):
+        return len(self._paths)
+
+    def add(self, paths):
+        """Adds images to the index. Images already in the index are ignored.
+
+        Args:
+            paths (list (pathlib.Path)): paths to the images to add
+        """
+        for cur_path in paths:
+            if cur_path in self._ids:
+                continue
+            text = str(cur_path)
+            text = text[len(self._prefix):] if text.startswith(self._prefix) else cur_path.name
+            self._ids[cur_path] = len(self._paths)
+            self._paths.append(cur_path)
+            self._text.append(text.lower())
+        if len(self._paths) - self._indexed > MAX_UNINDEXED:
+            self._build()
+
+    def _build(self):
+        """Helper method that rebuilds the trigram arrays from all of the images added so far"""
+        encoded = [cur_text.encode("utf-8") for cur_text in self._text]
+        lengths = np.fromiter((len(cur) for cur in encoded), np.int64, len(encoded))
+        data = np.frombuffer(b"".join(encoded), np.uint8)
+        self._indexed = len(encoded)
+        if len(data) < 3:
+            self._codes = np.empty(0, np.uint32)
+            self._postings = np.empty(0, np.uint32)
+            return
+
+        # discard the trigrams that span two paths
+        ids = np.repeat(np.arange(len(encoded), dtype=np.uint64), lengths)[:-2]
+        ends = np.repeat(np.cumsum(lengths), lengths)[:-2]
+        valid = np.arange(len(data) - 2) + 3 <= ends
+        keys = (_trigram_codes(data)[valid].astype(np.uint64) << np.uint64(32)) | ids[valid]
+        keys.sort()
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        self._codes = (keys >> np.uint64(32)).astype(np.uint32)
+        self._postings = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def ids(self, paths):
+        """Looks up the IDs the index assigned to a set of images
+
+        Args:
+            paths (list (pathlib.Path)): paths to the images to look up
+
+        Returns:
+            numpy.ndarray: ID of each image, or -1 for images that aren't in the index
+        """
+        ids = self._ids
+        return np.fromiter((ids.get(cur_path, -1) for cur_path in paths), np.int64, len(paths))
+
+    def paths(self, ids):
+        """Looks up the images with a set of IDs
+
+        Args:
+            ids (iterable (int)): IDs of the images to look up
+
+        Returns:
+            list (pathlib.Path): path to each image
+        """
+        return [self._paths[cur_id] for cur_id in ids]
+
+    def _candidates(self, query):
+        """Helper method that finds the images containing every trigram in a query
+
+        Args:
+            query (str): lower case text to search for
+
+        Returns:
+            numpy.ndarray: sorted IDs of the candidate images
+        """
+        codes = np.unique(_trigram_codes(np.frombuffer(query.encode("utf-8"), np.uint8)))
+        if not len(codes):  # pylint: disable=len-as-condition
+            return np.arange(len(self._paths))
+        firsts = np.searchsorted(self._codes, codes, "left")
+        lasts = np.searchsorted(self._codes, codes, "right")
+        # start from the rarest trigram, since the results can't be any larger
+        retval = None
+        for cur in np.argsort(lasts - firsts):
+            ids = self._postings[firsts[cur]:lasts[cur]]
+            retval = ids if retval is None else np.intersect1d(retval, ids, assume_unique=True)
+            if not len(retval):  # pylint: disable=len-as-condition
+                break
+        # images added since the index was built are always candidates
+        return np.concatenate([retval.astype(np.int64), np.arange(self._indexed, len(self._paths))])
+
+    def search(self, query, candidates=None):
+        """Finds the images whose relative paths contain some text, ignoring case
+
+        Args:
+            query (str):
+                text to search for
+            candidates (numpy.ndarray):
+                optional sorted IDs of the images to limit the search to, such as the
+                results of a search for a shorter version of the query
+
+        Returns:
+            numpy.ndarray: sorted IDs of the matching images
+        """
+        query = query.lower()
+        ids = self._candidates(query)
+        if candidates is not None:
+            ids = np.intersect1d(ids, candidates, assume_unique=True)
+        # trigrams may appear in a different order than in the query, so confirm each match
+        text = self._text
+        return ids[np.fromiter((query in text[cur_id] for cur_id in ids.tolist()), bool, len(ids))]
+
+
+class FilenameFilterModel(QAbstractProxyModel):
+    """Proxy model that only exposes the images whose relative paths contain some text
+
+    Each time the query changes only the rows that start or stop matching are removed from
+    or inserted into the proxy, so views keep their layout, selection and scroll position.
+    When the query is extended, as happens while the user types, only the images that
+    matched the shorter query are checked again.
+
+    The source model must be an ImageModel, which provides the paths of the images in
+    each row. Every image in the source model is matched, including those in rows it has
+    not exposed yet. Those rows are not shown until the view fetches more rows, at which
+    point the source model is asked to expose rows up to the next few matching images.
+    """
+    def __init__(self, parent=None):
+        """
+        Args:
+            parent (QObject):
+                optional Qt object that owns this model
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._query = ""
+        self._index = None
+        # sorted IDs of the matching images in the index, and a mask that is True for each of
+        # them. The mask has one more entry than the index, which is always False, so images
+        # missing from the index (ID -1) never match. Both are None when no filter is applied.
+        self._matches = None
+        self._mask = None
+        # index ID of the image in each row of the source model, including rows it has not
+        # exposed yet, and the sorted source rows of the matching images. Both are worked
+        # out again when needed after images are added to or removed from the source model.
+        self._source_ids = None
+        self._match_rows = None
+        # source row for each of our rows, sorted by source row. None when no filter is applied.
+        self._rows = None
+        self._removing = False
+        self._layout_indexes = None
+
+    @property
+    def query(self):
+        """str: text the paths of the exposed images must contain"""
+        return self._query
+
+    def setSourceModel(self, model):  # pylint: disable=invalid-name
+        """Sets the model to filter, discarding any previous filter
+
+        Args:
+            model (ImageModel): model to filter
+        """
+        self.beginResetModel()
+        old_model = self.sourceModel()
+        if old_model is not None:
+            for cur_signal, cur_slot in self._connections(old_model):
+                cur_signal.disconnect(cur_slot)
+        super().setSourceModel(model)
+        self._query = ""
+        self._index = None
+        self._set_matches(None)
+        self._rows = None
+        if model is not None:
+            for cur_signal, cur_slot in self._connections(model):
+                cur_signal.connect(cur_slot)
+        self.endResetModel()
+
+    def _connections(self, model):
+        """list (tuple): signals of the source model we respond to, and the slots that handle them"""
+        # PySide2 5.15 fails to disconnect a slot whose signature matches its signal once a slot with a
+        # different signature has been connected after it, so the latter are connected first
+        return [
+            (model.dataChanged, self._source_data_changed),
+            (model.layoutAboutToBeChanged, self._source_layout_about_to_be_changed),
+            (model.layoutChanged, self._source_layout_changed),
+            (model.modelAboutToBeReset, self.beginResetModel),
+            (model.modelReset, self._source_reset),
+            (model.images_added, self._source_images_added),
+            (model.images_removed, self._source_images_removed),
+            (model.rowsAboutToBeInserted, self._source_rows_about_to_be_inserted),
+            (model.rowsInserted, self._source_rows_inserted),
+            (model.rowsAboutToBeRemoved, self._source_rows_about_to_be_removed),
+            (model.rowsRemoved, self._source_rows_removed),
+        ]
+
+    def set_query(self, query):
+        """Changes the text the paths of the exposed images must contain
+
+        Args:
+            query (str): text to search for. An empty string exposes all images.
+        """
+        query = query.strip().lower()
+        model = self.sourceModel()
+        if query == self._query or model is None:
+            self._query = query
+            return
+        old_rows = self._rows if self._rows is not None else np.arange(model.rowCount(QModelIndex()))
+
+        if not query:
+            new_rows = None
+            self._set_matches(None)
+        else:
+            if self._index is None:
+                self._index = FilenameIndex(model.folder)
+                self._index.add(model.file_paths)
+            # only images that matched the shorter query can match the longer one
+            narrowing = self._matches is not None and self._query in query
+            self._set_matches(self._index.search(query, self._matches if narrowing else None))
+            rows = self._matching_rows()
+            new_rows = rows[:np.searchsorted(rows, model.rowCount(QModelIndex()))]
+        self._query = query
+        self._apply(old_rows, new_rows)
+
+    def _set_matches(self, ids):
+        """Helper method that changes the images that match the query
+
+        Args:
+            ids (numpy.ndarray): sorted IDs of the matching images, or None if no filter is applied
+        """
+        self._matches = ids
+        self._mask = None
+        if ids is not None:
+            self._mask = np.zeros(len(self._index) + 1, bool)
+            self._mask[ids] = True
+        self._match_rows = None
+
+    def _matching_rows(self):
+        """Helper method that finds the rows of the source model holding matching images,
+        including rows the source model has not exposed yet
+
+        Returns:
+            numpy.ndarray: sorted source rows of the matching images
+        """
+        if self._match_rows is None:
+            if self._source_ids is None:
+                paths = self.sourceModel().file_paths
+                ids = self._index.ids(paths)
+                missing = np.flatnonzero(ids < 0)
+                if len(missing):  # pylint: disable=len-as-condition
+                    # reordering may move images the source model hasn't told us about into view
+                    self._source_images_added([paths[cur] for cur in missing])
+                    ids = self._index.ids(paths)
+                self._source_ids = ids
+            self._match_rows = np.flatnonzero(self._mask[self._source_ids])
+        return self._match_rows
+
+    def _is_match(self, paths):
+        """Helper method that checks which of a set of images match the query
+
+        Args:
+            paths (list (pathlib.Path)): paths to the images to check
+
+        Returns:
+            numpy.ndarray: True for each image that matches
+        """
+        return self._mask[self._index.ids(paths)]
+
+    def _apply(self, old_rows, new_rows):
+        """Helper method that moves from one set of exposed rows to another, notifying views
+        once for each contiguous range of rows that is removed or inserted
+
+        Args:
+            old_rows (list (int)): sorted source rows currently exposed
+            new_rows (numpy.ndarray): sorted source rows to expose, or None to expose all rows
+        """
+        old_rows = np.asarray(old_rows, np.int64)
+        target = new_rows if new_rows is not None else np.arange(self.sourceModel().rowCount(QModelIndex()))
+        removed = _ranges(np.flatnonzero(~np.isin(old_rows, target, assume_unique=True)))
+        inserted = _ranges(np.flatnonzero(~np.isin(target, old_rows, assume_unique=True)))
+        new_rows = None if new_rows is None else new_rows.tolist()
+        if len(removed) + len(inserted) > MAX_INCREMENTAL_CHANGES:
+            self.beginResetModel()
+            self._rows = new_rows
+            self.endResetModel()
+            return
+
+        # remove from last to first so the positions of the remaining ranges aren't affected
+        target = target.tolist()
+        self._rows = rows = old_rows.tolist()
+        for first, last in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del rows[first:last + 1]
+            self.endRemoveRows()
+
+        # the remaining rows are now a subset of the target, so insert from first to last
+        for first, last in inserted:
+            self.beginInsertRows(QModelIndex(), first, last)
+            rows[first:first] = target[first:last + 1]
+            self.endInsertRows()
+        self._rows = new_rows
+
+    def _hidden_matches(self, limit):
+        """Helper method that finds the matching images in rows the source model has not exposed yet
+
+        Args:
+            limit (int): maximum number of images to find
+
+        Returns:
+            numpy.ndarray: source rows of the first few matching images
+        """
+        rows = self._matching_rows()
+        start = np.searchsorted(rows, self.sourceModel().rowCount(QModelIndex()))
+        return rows[start:start + limit]
+
+    def canFetchMore(self, parent):  # pylint: disable=invalid-name
+        """bool: True if the source model has rows it has not exposed yet that we would show"""
+        model = self.sourceModel()
+        if model is None or parent.isValid():
+            return False
+        if self._rows is None:
+            return model.canFetchMore(QModelIndex())
+        return bool(len(self._hidden_matches(1)))
+
+    def fetchMore(self, parent):  # pylint: disable=invalid-name
+        """Asks the source model to expose more rows. When a filter is applied, rows are
+        exposed up to the next few matching images, however far apart they are
+
+        Args:
+            parent (QModelIndex):
+                reference to the parent item containing the images to load
+        """
+        model = self.sourceModel()
+        if model is None or parent.isValid():
+            return
+        if self._rows is None:
+            model.fetchMore(QModelIndex())
+            return
+        rows = self._hidden_matches(FETCH_BATCH_SIZE)
+        if len(rows):  # pylint: disable=len-as-condition
+            # the rows are matched against the query as the source model exposes them
+            last = int(rows[-1])
+            model.index_for(model.paths_in(last, last)[0])
+
+    def mapToSource(self, proxy_index):  # pylint: disable=invalid-name
+        """QModelIndex: gets the index in the source model for one of our indexes"""
+        model = self.sourceModel()
+        if model is None or not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self._rows is None else self._rows[proxy_index.row()]
+        return model.index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index):  # pylint: disable=invalid-name
+        """QModelIndex: gets our index for an index in the source model, which is invalid if it is filtered out"""
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._rows is None:
+            return self.index(source_index.row(), source_index.column())
+        position = bisect.bisect_left(self._rows, source_index.row())
+        if position < len(self._rows) and self._rows[position] == source_index.row():
+            return self.index(position, source_index.column())
+        return QModelIndex()
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        """QModelIndex: gets the index for one of our rows"""
+        if parent.isValid() or row < 0 or column != 0 or row >= self.rowCount(parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, _index=QModelIndex()):  # pylint: disable=arguments-differ
+        """QModelIndex: images have no parent, since the model is a flat list"""
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """int: number of images exposed by the model"""
+        model = self.sourceModel()
+        if model is None or parent.isValid():
+            return 0
+        if self._rows is None:
+            return model.rowCount(QModelIndex())
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """int: number of columns in the model, which is a flat list"""
+        return 0 if parent.isValid() else 1
+
+    def _source_range(self, first, last):
+        """Helper method that finds our rows that map to a range of rows in the source model
+
+        Returns:
+            tuple (int, int): first and one past the last of our rows in the range
+        """
+        return bisect.bisect_left(self._rows, first), bisect.bisect_right(self._rows, last)
+
+    @Slot(QModelIndex, int, int)
+    def _source_rows_about_to_be_inserted(self, parent, first, last):
+        """Callback for when rows are about to be inserted into the source model"""
+        if self._rows is None and not parent.isValid():
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    @Slot(QModelIndex, int, int)
+    def _source_rows_inserted(self, parent, first, last):
+        """Callback for when rows have been inserted into the source model"""
+        if parent.isValid():
+            return
+        if self._rows is None:
+            self.endInsertRows()
+            return
+        count = last - first + 1
+        position = bisect.bisect_left(self._rows, first)
+        self._rows[position:] = [cur_row + count for cur_row in self._rows[position:]]
+
+        paths = self.sourceModel().paths_in(first, last)
+        new_rows = (np.flatnonzero(self._is_match(paths)) + first).tolist()
+        if new_rows:
+            self.beginInsertRows(QModelIndex(), position, position + len(new_rows) - 1)
+            self._rows[position:position] = new_rows
+            self.endInsertRows()
+
+    @Slot(QModelIndex, int, int)
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        """Callback for when rows are about to be removed from the source model"""
+        if parent.isValid():
+            return
+        self._source_ids = None
+        self._match_rows = None
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._removing = True
+            return
+        start, end = self._source_range(first, last)
+        self._removing = end > start
+        if self._removing:
+            self.beginRemoveRows(QModelIndex(), start, end - 1)
+
+    @Slot(QModelIndex, int, int)
+    def _source_rows_removed(self, parent, first, last):
+        """Callback for when rows have been removed from the source model"""
+        if parent.isValid():
+            return
+        if self._rows is not None:
+            count = last - first + 1
+            start, end = self._source_range(first, last)
+            self._rows[start:] = [cur_row - count for cur_row in self._rows[end:]]
+        if self._removing:
+            self._removing = False
+            self.endRemoveRows()
+
+    @Slot(QModelIndex, QModelIndex, list)
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        """Callback for when the data for some rows of the source model has changed"""
+        if self._rows is None:
+            first, last = top_left.row(), bottom_right.row()
+        else:
+            first, end = self._source_range(top_left.row(), bottom_right.row())
+            last = end - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, 0), roles)
+
+    @Slot()
+    def _source_layout_about_to_be_changed(self):
+        """Callback for when the source model is about to be reordered"""
+        self.layoutAboutToBeChanged.emit()
+        self._layout_indexes = [(cur_index, QPersistentModelIndex(self.mapToSource(cur_index)))
+                                for cur_index in self.persistentIndexList()]
+
+    @Slot()
+    def _source_layout_changed(self):
+        """Callback for when the source model has been reordered"""
+        self._source_ids = None
+        self._match_rows = None
+        if self._rows is not None:
+            rows = self._matching_rows()
+            self._rows = rows[:np.searchsorted(rows, self.sourceModel().rowCount(QModelIndex()))].tolist()
+        old_indexes = [cur[0] for cur in self._layout_indexes]
+        new_indexes = [self.mapFromSource(QModelIndex(cur[1])) for cur in self._layout_indexes]
+        self._layout_indexes = None
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    @Slot(list)
+    def _source_images_added(self, paths):
+        """Callback for when images have been added to the source model, whether or not
+        their rows have been exposed yet
+
+        Args:
+            paths (list (pathlib.Path)): paths to the new images
+        """
+        self._source_ids = None
+        self._match_rows = None
+        if self._index is None:
+            return
+        self._index.add(paths)
+        if self._matches is not None:
+            ids = np.unique(self._index.ids(paths))
+            self._set_matches(np.union1d(self._matches, self._index.search(self._query, ids[ids >= 0])))
+
+    @Slot(list)
+    def _source_images_removed(self, _paths):
+        """Callback for when images have been removed from the source model, whether or not
+        their rows had been exposed yet"""
+        self._source_ids = None
+        self._match_rows = None
+
+    @Slot()
+    def _source_reset(self):
+        """Callback for when the contents of the source model have been replaced"""
+        self._query = ""
+        self._index = None
+        self._set_matches(None)
+        self._source_ids = None
+        self._rows = None
+        self.endResetModel()
+
+
+def _ranges(positions):
+    """Groups increasing positions into contiguous ranges
+
+    Args:
+        positions (numpy.ndarray): positions to group, in increasing order
+
+    Returns:
+        list (tuple (int, int)): first and last position in each range
+    """
+    if not len(positions):  # pylint: disable=len-as-condition
+        return list()
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    firsts = positions[np.concatenate([[0], breaks])]
+    lasts = positions[np.concatenate([breaks - 1, [len(positions) - 1]])]
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
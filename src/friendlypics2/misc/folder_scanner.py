@@ -0,0 +1,220 @@
+"""Background service for enumerating the contents of a folder"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from friendlypics2.misc.file_types import FileClassifier
+from friendlypics2.misc import instrumentation
+
+# Default maximum number of files to report in each batch
+DEFAULT_BATCH_SIZE = 500
+# Maximum amount of time, in seconds, to wait before reporting a partial batch
+BATCH_INTERVAL = 0.1
+
+#: Progress of a scan. Elapsed time is in seconds, and rates are per second
+ScanStats = namedtuple("ScanStats", ["folders", "files", "elapsed", "folder_rate", "file_rate"])
+
+
+def is_candidate(entry, classifier):
+    """Checks whether a directory entry is an image file
+
+    Relies on the file type information cached by os.scandir so no additional
+    file system access is needed on most platforms. Only files whose extension
+    isn't recognized by the classifier need to be read.
+
+    Args:
+        entry (os.DirEntry): directory entry to check
+        classifier (FileClassifier): identifies which files are images
+
+    Returns:
+        bool: True if the entry is an image in one of the requested formats, False if not
+    """
+    try:
+        if not entry.is_file():
+            return False
+    except OSError:
+        return False
+    return classifier.classify(entry.name, entry.path) is not None
+
+
+class _ScanSignals(QObject):
+    """Signals raised by scan tasks. QRunnable is not a QObject so it can't own signals itself"""
+    files_found = Signal(list)
+    progress = Signal(int, int)
+    finished = Signal(bool)
+
+
+class FolderScanTask(QRunnable):
+    """Unit of work that enumerates the files in a folder on a worker thread"""
+    def __init__(self, folder, batch_size, classifier, signals, cancelled, visited):
+        """
+        Args:
+            folder (pathlib.Path):
+                folder to scan
+            batch_size (int):
+                maximum number of files to report at a time
+            classifier (FileClassifier):
+                identifies which files are images
+            signals (_ScanSignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the scan should be aborted
+            visited (list (pathlib.Path)):
+                list the folder is added to once its contents have been listed in full
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._folder = folder
+        self._batch_size = batch_size
+        self._classifier = classifier
+        self._signals = signals
+        self._cancelled = cancelled
+        self._visited = visited
+
+    def run(self):
+        """Scans the folder. Executed on a worker thread from the pool"""
+        batch = list()
+        last_report = time.monotonic()
+        with instrumentation.span("scan/folder"):
+            try:
+                with os.scandir(self._folder) as entries:
+                    for cur_entry in entries:
+                        if self._cancelled.is_set():
+                            break
+                        if not is_candidate(cur_entry, self._classifier):
+                            continue
+                        batch.append(Path(cur_entry.path))
+                        now = time.monotonic()
+                        if len(batch) >= self._batch_size or now - last_report >= BATCH_INTERVAL:
+                            instrumentation.count("scan/files", len(batch))
+                            self._signals.files_found.emit(batch)
+                            batch = list()
+                            last_report = now
+                if not self._cancelled.is_set():
+                    self._visited.append(self._folder)
+            except OSError as err:
+                self._log.error(f"Unable to scan folder {self._folder}: {err}")
+
+        if batch and not self._cancelled.is_set():
+            instrumentation.count("scan/files", len(batch))
+            self._signals.files_found.emit(batch)
+        self._signals.finished.emit(not self._cancelled.is_set())
+
+
+class FolderScanner(QObject):
+    """Enumerates the files in a folder in the background, reporting them in batches"""
+    #: Signal emitted on the GUI thread each time a batch of files is found. Provides a list
+    #: of pathlib.Path objects for the files
+    files_found = Signal(list)
+    #: Signal emitted on the GUI thread when the scan ends. Provides a boolean that is True if
+    #: the scan ran to completion and False if it was cancelled
+    finished = Signal(bool)
+
+    def __init__(self, folder, batch_size=DEFAULT_BATCH_SIZE, classifier=None, parent=None):
+        """
+        Args:
+            folder (pathlib.Path):
+                folder to scan
+            batch_size (int):
+                maximum number of files to report at a time
+            classifier (FileClassifier):
+                optional classifier identifying which files are images. Defaults
+                to accepting images in all supported formats.
+            parent (QObject):
+                optional Qt object that owns this scanner
+        """
+        super().__init__(parent)
+        self._folder = folder
+        self._batch_size = batch_size
+        self._classifier = classifier or FileClassifier()
+        self._cancelled = threading.Event()
+        self._running = False
+        self._visited = list()
+        self._file_count = 0
+        self._start_time = None
+        self._end_time = None
+        self._signals = _ScanSignals()
+        self._signals.files_found.connect(self._files_found)
+        self._signals.finished.connect(self._finished)
+
+    @property
+    def folder(self):
+        """pathlib.Path: folder being scanned"""
+        return self._folder
+
+    @property
+    def is_running(self):
+        """bool: True if the scan is currently in progress"""
+        return self._running
+
+    @property
+    def stats(self):
+        """ScanStats: progress and throughput of the current or most recent scan. None if no scan has started"""
+        if self._start_time is None:
+            return None
+        end_time = self._end_time if self._end_time is not None else time.monotonic()
+        elapsed = max(end_time - self._start_time, 1e-6)
+        folders = len(self._visited)
+        return ScanStats(folders, self._file_count, elapsed, folders / elapsed, self._file_count / elapsed)
+
+    @property
+    def visited_folders(self):
+        """list (pathlib.Path): folders whose contents were listed in full by the most recent scan"""
+        return list(self._visited)
+
+    @property
+    def classifier(self):
+        """FileClassifier: identifies which files are images"""
+        return self._classifier
+
+    @property
+    def exclude(self):
+        """list (str): glob patterns for file names skipped by this scanner"""
+        return list()
+
+    @property
+    def recursive(self):
+        """bool: True if this scanner includes the contents of sub folders"""
+        return False
+
+    def start(self):
+        """Starts scanning the folder on a worker thread"""
+        self._cancelled.clear()
+        self._running = True
+        self._visited = list()
+        self._file_count = 0
+        self._start_time = time.monotonic()
+        self._end_time = None
+        self._start_tasks()
+
+    def _start_tasks(self):
+        """Schedules the work needed to perform the scan. May be overridden by derived classes"""
+        QThreadPool.globalInstance().start(
+            FolderScanTask(self._folder, self._batch_size, self._classifier, self._signals, self._cancelled,
+                           self._visited))
+
+    def cancel(self):
+        """Aborts the scan. Results found after this call returns are discarded"""
+        self._cancelled.set()
+
+    @Slot(list)
+    def _files_found(self, files):
+        """Callback for when the worker thread reports a batch of files"""
+        if self._cancelled.is_set():
+            return
+        self._file_count += len(files)
+        self.files_found.emit(files)
+
+    @Slot(bool)
+    def _finished(self, completed):
+        """Callback for when the worker thread finishes scanning"""
+        self._running = False
+        self._end_time = time.monotonic()
+        self.finished.emit(completed)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,187 @@
+"""Service for monitoring folders for changes to the files they contain"""
+import logging
+import os
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher, Signal, Slot
+from friendlypics2.misc.file_types import FileClassifier
+from friendlypics2.misc.folder_scanner import is_candidate
+
+# Amount of time, in milliseconds, to wait for further changes before processing a change
+DEBOUNCE_INTERVAL = 250
+# Maximum amount of time, in seconds, a change may be delayed while waiting for changes to settle
+MAX_DELAY = 2.0
+# Maximum number of folders to monitor. Most platforms place a limit on the number of
+# file system watches a process may create
+MAX_WATCHED_FOLDERS = 4096
+
+
+class _RescanSignals(QObject):
+    """Signals raised by rescan tasks. QRunnable is not a QObject so it can't own signals itself"""
+    finished = Signal(object)
+
+
+class FolderRescanTask(QRunnable):
+    """Unit of work that lists the current contents of a set of folders on a worker thread"""
+    def __init__(self, folders, exclude, classifier, signals):
+        """
+        Args:
+            folders (list (pathlib.Path)):
+                folders to list
+            exclude (list (str)):
+                glob patterns for file names to skip
+            classifier (FileClassifier):
+                identifies which files are images
+            signals (_RescanSignals):
+                object used to report results back to the GUI thread
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._folders = folders
+        self._exclude = exclude
+        self._classifier = classifier
+        self._signals = signals
+
+    def run(self):
+        """Lists the folders. Executed on a worker thread from the pool"""
+        retval = dict()
+        for cur_folder in self._folders:
+            retval[cur_folder] = self._list_folder(cur_folder)
+        self._signals.finished.emit(retval)
+
+    def _list_folder(self, folder):
+        """Helper method that lists the images in a folder along with their modification times
+
+        Args:
+            folder (pathlib.Path): folder to list
+
+        Returns:
+            dict: maps the path of each image in the folder to its modification time in
+            nanoseconds. Will be empty if the folder no longer exists.
+        """
+        retval = dict()
+        try:
+            with os.scandir(folder) as entries:
+                for cur_entry in entries:
+                    if any(fnmatch(cur_entry.name, cur_pattern) for cur_pattern in self._exclude):
+                        continue
+                    if not is_candidate(cur_entry, self._classifier):
+                        continue
+                    try:
+                        retval[Path(cur_entry.path)] = cur_entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+        except OSError as err:
+            self._log.debug(f"Unable to list folder {folder}: {err}")
+        return retval
+
+
+class FolderWatcher(QObject):
+    """Monitors a set of folders and reports the contents of those that change
+
+    Change notifications are debounced so a burst of changes, like a camera writing
+    hundreds of files, results in a single report. Each report lists the complete
+    contents of every folder that changed, leaving it to the caller to work out what
+    was added, removed or modified.
+    """
+    #: Signal emitted on the GUI thread when the contents of one or more folders change.
+    #: Provides a dictionary mapping the path of each folder that changed to a dictionary
+    #: that maps each image in the folder to its modification time in nanoseconds
+    folders_changed = Signal(object)
+
+    def __init__(self, exclude=None, classifier=None, parent=None):
+        """
+        Args:
+            exclude (list (str)):
+                optional glob patterns for file names to ignore
+            classifier (FileClassifier):
+                optional classifier identifying which files are images. Defaults
+                to accepting images in all supported formats.
+            parent (QObject):
+                optional Qt object that owns this watcher
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._exclude = list(exclude or list())
+        self._classifier = classifier or FileClassifier()
+        self._changed = set()
+        self._first_change = None
+        self._rescan_running = False
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._directory_changed)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_INTERVAL)
+        self._timer.timeout.connect(self._start_rescan)
+
+        self._signals = _RescanSignals()
+        self._signals.finished.connect(self._rescan_finished)
+
+    def watch(self, folders):
+        """Starts monitoring a set of folders for changes
+
+        Args:
+            folders (list (pathlib.Path)): folders to monitor
+        """
+        folders = sorted(set(folders))
+        if len(folders) > MAX_WATCHED_FOLDERS:
+            self._log.warning(f"Only monitoring the first {MAX_WATCHED_FOLDERS} of {len(folders)} folders for changes")
+            folders = folders[:MAX_WATCHED_FOLDERS]
+        failed = self._watcher.addPaths([str(cur_folder) for cur_folder in folders])
+        if failed:
+            self._log.debug(f"Unable to monitor {len(failed)} folders for changes")
+
+    def stop(self):
+        """Stops monitoring all folders and discards any unprocessed changes"""
+        self._timer.stop()
+        self._changed.clear()
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._signals.finished.disconnect(self._rescan_finished)
+
+    @Slot(str)
+    def _directory_changed(self, folder):
+        """Callback for when the file system reports a change to one of our folders
+
+        Args:
+            folder (str): path of the folder that changed
+        """
+        self._changed.add(Path(folder))
+        if self._first_change is None:
+            self._first_change = time.monotonic()
+
+        # keep postponing the rescan while changes keep arriving, up to a limit
+        if time.monotonic() - self._first_change < MAX_DELAY or not self._timer.isActive():
+            self._timer.start()
+
+    @Slot()
+    def _start_rescan(self):
+        """Lists the contents of all folders that have changed on a worker thread"""
+        if self._rescan_running or not self._changed:
+            return
+        folders = sorted(self._changed)
+        self._changed.clear()
+        self._first_change = None
+        self._rescan_running = True
+        QThreadPool.globalInstance().start(FolderRescanTask(folders, self._exclude, self._classifier, self._signals))
+
+    @Slot(object)
+    def _rescan_finished(self, changes):
+        """Callback for when the worker thread has finished listing the changed folders
+
+        Args:
+            changes (dict): contents of each folder that changed
+        """
+        self._rescan_running = False
+        self.folders_changed.emit(changes)
+        # process any changes that arrived while we were busy
+        if self._changed and not self._timer.isActive():
+            self._timer.start()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
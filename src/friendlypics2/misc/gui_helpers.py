@@ -1,14 +1,66 @@
 """helper methods for use by GUI objects and dialogs"""
+import importlib
+import importlib.resources
 import logging
+from collections import deque
 from contextlib import contextmanager
-from qtpy import uic
-from pkg_resources import resource_filename
+from pathlib import Path
+from qtpy.QtCore import QObject, QEvent, QTimer, Signal
+from friendlypics2.misc.ui_compiler import FORMS_FOLDER, MODULE_SUFFIX, source_hash
 
 PACKAGE_NAME = "friendlypics2"
+# Default maximum number of log records held waiting to be shown. Older records are discarded first
+DEFAULT_LOG_CAPACITY = 5000
+# Default maximum number of lines of log output kept in the widget
+DEFAULT_LOG_BLOCKS = 5000
+# Amount of time, in milliseconds, between updates of the widget showing the log output
+LOG_FLUSH_INTERVAL = 100
+
+
+def resource_path(relative_path):
+    """Locates a data file distributed with the application
+
+    Args:
+        relative_path (str):
+            path to the data file, relative to the root of the package
+
+    Returns:
+        pathlib.Path: absolute path to the data file
+    """
+    if hasattr(importlib.resources, "files"):
+        return Path(str(importlib.resources.files(PACKAGE_NAME).joinpath(relative_path)))
+    # Python 3.8 lacks the files API. Our package is always installed as a folder in that case
+    return Path(__file__).parents[1].joinpath(relative_path)
+
+
+def _load_compiled_form(ui_file):
+    """Loads the compiled version of a UI interface file
+
+    Args:
+        ui_file (pathlib.Path):
+            path to the UI file to load
+
+    Returns:
+        object: instance of the class that builds the form, or None if the form has not
+        been compiled or has been modified since it was compiled
+    """
+    log = logging.getLogger(__name__)
+    try:
+        module = importlib.import_module(f"{PACKAGE_NAME}.forms.{ui_file.stem}{MODULE_SUFFIX}")
+    except ImportError as err:
+        log.debug(f"Unable to load compiled form for {ui_file.name}: {err}")
+        return None
+    if ui_file.exists() and module.UI_SOURCE_HASH != source_hash(ui_file):
+        log.warning(f"Compiled form for {ui_file.name} is out of date. Loading the original.")
+        return None
+    return module.FORM_CLASS()
 
 
 def load_ui(file, parent):
-    """Loads a UI interface file from disk
+    """Loads a UI interface file
+
+    Uses the compiled version of the file when one is available since it is much faster
+    to load, falling back to parsing the file at runtime
 
     Args:
         file (str):
@@ -16,8 +68,17 @@ def load_ui(file, parent):
         parent (object):
             reference to the Qt dialog object associated with the UI file
     """
-    ui_file = resource_filename(PACKAGE_NAME, "data/ui/" + file)
-    uic.loadUi(ui_file, parent)
+    ui_file = resource_path(f"{FORMS_FOLDER}/{file}")
+    form = _load_compiled_form(ui_file)
+    if form is None:
+        # importing the runtime loader is slow, so only do so when it is needed
+        from qtpy import uic  # pylint: disable=import-outside-toplevel
+        uic.loadUi(str(ui_file), parent)
+        return
+    form.setupUi(parent)
+    # expose the widgets on the parent, the same way the runtime loader does
+    for cur_name, cur_widget in vars(form).items():
+        setattr(parent, cur_name, cur_widget)
 
 
 def generate_screen_id(screen):
@@ -37,6 +98,65 @@ def generate_screen_id(screen):
     return f"screen-{screen.name()}-{int(screen.physicalDotsPerInch())}dpi"
 
 
+def visible_rows(view):
+    """Finds the range of rows from a list view's model that are currently visible
+
+    Assumes the view lays out its items in row order from top to bottom, as QListView
+    does in both list and icon modes, so the rows can be found with a binary search
+
+    Args:
+        view (QListView):
+            view to analyse
+
+    Returns:
+        tuple (int, int):
+            first and last visible rows, or None if the view is empty
+    """
+    model = view.model()
+    count = model.rowCount(view.rootIndex()) if model is not None else 0
+    if not count:
+        return None
+    height = view.viewport().height()
+
+    def _search(predicate):
+        # finds the first row for which predicate is True, or count if there is none
+        low, high = 0, count
+        while low < high:
+            mid = (low + high) // 2
+            if predicate(view.visualRect(model.index(mid, 0, view.rootIndex()))):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    first = _search(lambda rect: rect.bottom() >= 0)
+    last = _search(lambda rect: rect.top() > height) - 1
+    if first > last:
+        return None
+    return first, last
+
+
+def estimate_capacity(view):
+    """Estimates the number of items that fit in the visible area of a list view in icon mode
+
+    Args:
+        view (QListView):
+            view to analyse
+
+    Returns:
+        int: approximate number of items that fit in the view at its current size
+    """
+    icon_size = view.iconSize()
+    spacing = view.spacing()
+    # leave room for a line of text below each icon
+    cell_width = max(1, icon_size.width() + 2 * spacing)
+    cell_height = max(1, icon_size.height() + view.fontMetrics().height() + 2 * spacing)
+    viewport = view.viewport().size()
+    columns = max(1, -(-viewport.width() // cell_width))
+    rows = max(1, -(-viewport.height() // cell_height))
+    return columns * rows
+
+
 @contextmanager
 def settings_group_context(settings, group_name):
     """Context manager that starts loading settings from a specific sub-group and restores
@@ -56,24 +176,101 @@ def settings_group_context(settings, group_name):
         settings.endGroup()
 
 
-class GuiLogger(logging.Handler):
-    """Custom Python log handler that redirects output to a Qt widget"""
-    def __init__(self, widget):
+class FirstPaintWatcher(QObject):
+    """Reports when a widget is painted for the first time"""
+    #: Signal emitted after the widget has been painted for the first time
+    painted = Signal()
+
+    def __init__(self, widget, parent=None):
         """
         Args:
             widget (QWidget):
-                text widget to redirect log output to
+                widget to watch
+            parent (QObject):
+                optional Qt object that owns this watcher
+        """
+        super().__init__(parent)
+        self._widget = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):  # pylint: disable=invalid-name
+        """Detects the first paint of the widget being watched"""
+        if watched is self._widget and event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            # let the paint complete before reporting it
+            QTimer.singleShot(0, self.painted.emit)
+        return False
+
+
+class GuiLogger(logging.Handler):
+    """Custom Python log handler that redirects output to a Qt widget
+
+    Records may be logged from any thread. They are held in a bounded buffer and shown
+    in batches by a timer on the GUI thread, so logging never touches the widget directly
+    and a burst of messages costs a single update of the widget. Records are only
+    formatted once they are about to be shown, so nothing is formatted while the widget
+    is hidden, and only the most recent records are kept until it is shown again.
+    """
+    def __init__(self, widget, capacity=DEFAULT_LOG_CAPACITY, max_blocks=DEFAULT_LOG_BLOCKS):
+        """
+        Args:
+            widget (QPlainTextEdit):
+                text widget to redirect log output to. Must be called on the thread that owns the widget.
+            capacity (int):
+                maximum number of records to hold waiting to be shown
+            max_blocks (int):
+                maximum number of lines of output to keep in the widget
         """
         super().__init__()
 
         self.widget = widget
         self.widget.setReadOnly(True)
+        self.widget.setMaximumBlockCount(max_blocks)
+        self._pending = deque(maxlen=capacity)
+        self._discarded = 0
+
+        self._timer = QTimer(widget)
+        self._timer.setInterval(LOG_FLUSH_INTERVAL)
+        self._timer.timeout.connect(self._show_pending)
+        self._timer.start()
 
     def emit(self, record):
-        """Displays a log message to the GUI"""
-        # TODO: consider disabling log output when the UI isn't being shown
-        msg = self.format(record)
-        self.widget.appendPlainText(msg)
+        """Queues a log message to be shown in the GUI. Called with our lock held."""
+        if len(self._pending) == self._pending.maxlen:
+            self._discarded += 1
+        self._pending.append(record)
+
+    def _show_pending(self):
+        """Shows the queued log messages in the widget. Called periodically on the GUI thread."""
+        if not self._pending or not self.widget.isVisible():
+            return
+        self.acquire()
+        try:
+            records = list(self._pending)
+            self._pending.clear()
+            discarded = self._discarded
+            self._discarded = 0
+        finally:
+            self.release()
+
+        messages = list()
+        if discarded:
+            messages.append(f"... {discarded} earlier messages discarded ...")
+        for cur_record in records:
+            try:
+                messages.append(self.format(cur_record))
+            except Exception:  # pylint: disable=broad-except
+                self.handleError(cur_record)
+        self.widget.appendPlainText("\n".join(messages))
+
+    def close(self):
+        """Stops updating the widget. Queued messages that have yet to be shown are discarded."""
+        try:
+            self._timer.stop()
+        except RuntimeError:
+            # the widget, and the timer with it, have already been destroyed
+            pass
+        super().close()
 
     def write(self, _):
         """Disable disk-based file access"""
@@ -0,0 +1,257 @@
+"""Helpers for decoding images at reduced resolution
+
+All functions in this module only make use of QImage, which unlike QPixmap and QIcon
+may be safely used from worker threads.
+"""
+import logging
+import struct
+from qtpy.QtCore import QSize, Qt
+from qtpy.QtGui import QImage, QImageIOHandler, QImageReader, QTransform
+from friendlypics2.misc.exif import open_tiff, TAG_ORIENTATION, TAG_EXIF_IFD, TAG_THUMBNAIL_OFFSET, \
+    TAG_THUMBNAIL_LENGTH, TAG_PIXEL_WIDTH, TAG_PIXEL_HEIGHT
+
+# Maps EXIF orientation values to the horizontal mirror, vertical mirror and clockwise
+# rotation needed to display the image upright, in the order Qt applies them
+_ORIENTATIONS = {
+    2: (True, False, 0),
+    3: (False, False, 180),
+    4: (False, True, 0),
+    5: (False, True, 90),
+    6: (False, False, 90),
+    7: (True, False, 90),
+    8: (False, False, 270),
+}
+
+# Maximum relative difference between the aspect ratio of an embedded thumbnail and the
+# main image before the thumbnail is assumed to be letterboxed
+_ASPECT_TOLERANCE = 0.02
+
+
+def fit_size(source, bounds):
+    """Calculates the largest size with the same aspect ratio as an image that fits in a bounding box
+
+    Images smaller than the bounding box are never enlarged
+
+    Args:
+        source (QSize): dimensions of the source image
+        bounds (QSize): bounding box the image must fit within
+
+    Returns:
+        QSize: dimensions of the scaled image
+    """
+    if source.width() <= bounds.width() and source.height() <= bounds.height():
+        return QSize(source)
+    return source.scaled(bounds, Qt.KeepAspectRatio).expandedTo(QSize(1, 1))
+
+
+def decode_scaled(file_path, size):
+    """Decodes an image from disk directly at thumbnail resolution
+
+    The target size is handed to the image reader before decoding, which allows formats
+    that support it to avoid decoding the full resolution image. JPEG files in particular
+    are decoded at 1/2, 1/4 or 1/8 scale using DCT scaling, which is many times faster
+    and uses a fraction of the memory of a full decode.
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image file to decode
+        size (QSize):
+            bounding box, in device pixels, the decoded image should fit within
+
+    Returns:
+        QImage:
+            the decoded image, or a null image if the file could not be decoded
+    """
+    reader = QImageReader(str(file_path))
+    reader.setAutoTransform(True)
+    source_size = reader.size()
+    if source_size.isValid():
+        # The scaled size is applied before the EXIF orientation, so rotated images
+        # need the bounding box rotated as well
+        bounds = QSize(size)
+        if reader.transformation() & QImageIOHandler.TransformationRotate90:
+            bounds.transpose()
+        reader.setScaledSize(fit_size(source_size, bounds))
+    image = reader.read()
+    if image.isNull():
+        return image
+
+    # Not all formats honor the scaled size, so make sure the result fits within our bounds
+    if image.width() > size.width() or image.height() > size.height():
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+def decode_region(file_path, scaled_size, clip=None):
+    """Decodes part of an image, scaled down to a given size
+
+    Formats that support it, such as JPEG, only decode the part of the image that is
+    needed, so the full resolution image is never held in memory. The EXIF orientation
+    of the image is not applied, so the clip rectangle refers to the image as it is
+    stored in the file.
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image file to decode
+        scaled_size (QSize):
+            size to scale the entire image to before clipping
+        clip (QRect):
+            area of the scaled image to decode. None to decode the entire image
+
+    Returns:
+        QImage:
+            the decoded region, or a null image if the file could not be decoded
+    """
+    reader = QImageReader(str(file_path))
+    reader.setAutoTransform(False)
+    if scaled_size != reader.size():
+        reader.setScaledSize(scaled_size)
+    if clip is not None:
+        reader.setScaledClipRect(clip)
+    return reader.read()
+
+
+def apply_orientation(image, orientation):
+    """Transforms an image so it appears upright
+
+    Args:
+        image (QImage): image to transform
+        orientation (int): EXIF orientation value associated with the image
+
+    Returns:
+        QImage: the transformed image
+    """
+    if orientation not in _ORIENTATIONS:
+        return image
+    horizontal, vertical, rotation = _ORIENTATIONS[orientation]
+    if horizontal or vertical:
+        image = image.mirrored(horizontal, vertical)
+    if rotation:
+        image = image.transformed(QTransform().rotate(rotation))
+    return image
+
+
+def read_embedded_thumbnail(file_path, size):
+    """Extracts the preview image embedded in the EXIF data of an image
+
+    Typically only the first few KB of the file need to be read, making this much faster
+    than decoding the image, especially on slow storage
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image to load the thumbnail from
+        size (QSize):
+            bounding box, in device pixels, the thumbnail should fit within
+
+    Returns:
+        QImage:
+            the embedded thumbnail scaled to fit within the given size and rotated
+            according to the EXIF orientation of the image, or None if the image
+            has no suitable embedded thumbnail. Thumbnails that are smaller than
+            the requested size or have a different aspect ratio than the image
+            itself are considered unsuitable.
+    """
+    try:
+        with open(file_path, "rb") as file_handle:
+            tiff = open_tiff(file_handle)
+            if tiff is None:
+                return None
+            ifd0, ifd1_offset = tiff.parse_ifd(tiff.first_ifd())
+            if not ifd1_offset:
+                return None
+            ifd1, _ = tiff.parse_ifd(ifd1_offset)
+            if TAG_THUMBNAIL_OFFSET not in ifd1 or TAG_THUMBNAIL_LENGTH not in ifd1:
+                return None
+            data = tiff.read(ifd1[TAG_THUMBNAIL_OFFSET], ifd1[TAG_THUMBNAIL_LENGTH])
+            exif_ifd = tiff.parse_ifd(ifd0[TAG_EXIF_IFD])[0] if TAG_EXIF_IFD in ifd0 else dict()
+    except (OSError, struct.error) as err:
+        logging.getLogger(__name__).debug(f"Unable to read EXIF data from {file_path}: {err}")
+        return None
+
+    image = QImage.fromData(data)
+    if image.isNull():
+        return None
+
+    # Reject thumbnails that have been letterboxed to fit a different aspect ratio
+    width = exif_ifd.get(TAG_PIXEL_WIDTH)
+    height = exif_ifd.get(TAG_PIXEL_HEIGHT)
+    if width and height:
+        expected = width / height
+        actual = image.width() / image.height()
+        if abs(actual - expected) / expected > _ASPECT_TOLERANCE:
+            return None
+
+    image = apply_orientation(image, ifd0.get(TAG_ORIENTATION, 1))
+    target = image.size().scaled(size, Qt.KeepAspectRatio)
+    if image.width() < target.width():
+        return None
+    if image.size() != target:
+        image = image.scaled(target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+def decode_thumbnail(file_path, size):
+    """Generates a thumbnail for an image using the fastest method available
+
+    Embedded EXIF thumbnails are used when they are large enough, otherwise the image
+    is decoded at reduced resolution
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image to generate a thumbnail for
+        size (QSize):
+            bounding box, in device pixels, the thumbnail should fit within
+
+    Returns:
+        QImage:
+            the generated thumbnail, or a null image if the file could not be decoded
+    """
+    image = read_embedded_thumbnail(file_path, size)
+    if image is not None:
+        return image
+    return decode_scaled(file_path, size)
+
+
+def load_small_image(file_path, stats, size, thumbnail_cache=None, thumbnail_size=None):
+    """Loads a reduced size copy of an image for analysis, preferring a previously
+    generated thumbnail over decoding the image
+
+    Args:
+        file_path (pathlib.Path):
+            path to the image to load
+        stats (os.stat_result):
+            file system statistics for the image
+        size (QSize):
+            bounding box, in device pixels, to decode the image at when no thumbnail is cached
+        thumbnail_cache (DiskThumbnailCache):
+            optional cache of previously generated thumbnails
+        thumbnail_size (QSize):
+            size, in device pixels, of the thumbnails held in the cache
+
+    Returns:
+        QImage: the loaded image, which will be null if the image could not be decoded
+    """
+    if thumbnail_cache is not None and thumbnail_size is not None:
+        key = thumbnail_cache.make_key(file_path, stats.st_size, stats.st_mtime_ns, thumbnail_size)
+        image = thumbnail_cache.get(key)
+        if image is not None:
+            return image
+    return decode_thumbnail(file_path, size)
+
+
+def thumbnail_pixel_size(icon_size, device_pixel_ratio):
+    """Calculates the resolution thumbnails need to be decoded at to look sharp on screen
+
+    Args:
+        icon_size (QSize): size of the thumbnails in the view, in logical pixels
+        device_pixel_ratio (float): ratio between device pixels and logical pixels for the screen
+
+    Returns:
+        QSize: size of the thumbnails, in device pixels
+    """
+    return QSize(int(round(icon_size.width() * device_pixel_ratio)),
+                 int(round(icon_size.height() * device_pixel_ratio)))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
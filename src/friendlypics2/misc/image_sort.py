@@ -0,0 +1,113 @@
+"""Sort keys and group labels used to order the images shown to the user
+
+All keys are derived from the path of each image and the metadata already recorded for it
+in the catalog, so images can be reordered without touching the file system.
+"""
+import re
+from datetime import date, datetime
+
+#: Sort images by file name, treating runs of digits as numbers so IMG_9 comes before IMG_10
+SORT_NAME = "name"
+#: Sort images by the date they were taken, or by modification date when that isn't recorded
+SORT_TAKEN = "taken"
+#: Sort images by the date their files were last modified
+SORT_MODIFIED = "modified"
+#: Sort images by file size
+SORT_SIZE = "size"
+#: Sort images by the number of pixels they contain
+SORT_DIMENSIONS = "dimensions"
+#: All supported sort orders
+SORT_ORDERS = [SORT_NAME, SORT_TAKEN, SORT_MODIFIED, SORT_SIZE, SORT_DIMENSIONS]
+# Sort orders based on dates, which are the only ones that support grouping
+DATE_SORT_ORDERS = [SORT_TAKEN, SORT_MODIFIED]
+
+#: Show images without group headers
+GROUP_NONE = "none"
+#: Group images by day, when sorted by date
+GROUP_DAY = "day"
+#: Group images by month, when sorted by date
+GROUP_MONTH = "month"
+#: All supported groupings
+GROUPINGS = [GROUP_NONE, GROUP_DAY, GROUP_MONTH]
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def natural_key(file_path):
+    """Generates a key that sorts paths the way people expect, comparing numbers by value
+
+    Args:
+        file_path (pathlib.Path): path to generate the key for
+
+    Returns:
+        tuple: the sort key. Text and numbers always alternate so keys are always comparable.
+    """
+    parts = _DIGITS.split(str(file_path))
+    return tuple(int(cur_part) if cur_index % 2 else cur_part.casefold() for cur_index, cur_part in enumerate(parts))
+
+
+def _date(order, metadata):
+    """Helper function that finds the date used to sort an image
+
+    Args:
+        order (str): one of the date based sort orders
+        metadata (CatalogRecord): catalog metadata describing the image
+
+    Returns:
+        str: ISO formatted date and time
+    """
+    if order == SORT_TAKEN and metadata.taken:
+        return metadata.taken
+    return datetime.fromtimestamp(metadata.mtime_ns / 1e9).isoformat(sep=" ")
+
+
+def sort_key(order, name, metadata):
+    """Generates the key used to sort an image
+
+    Images that have not been cataloged yet sort after those that have, in name order
+
+    Args:
+        order (str): one of the supported sort orders
+        name (tuple): natural sort key for the path to the image, as generated by :func:`natural_key`
+        metadata (CatalogRecord): catalog metadata describing the image, or None if it isn't known
+
+    Returns:
+        tuple: the sort key
+    """
+    if order == SORT_NAME:
+        return 0, 0, name
+    if metadata is None:
+        return 1, 0, name
+    if order in DATE_SORT_ORDERS:
+        return 0, _date(order, metadata), name
+    if order == SORT_SIZE:
+        return 0, metadata.size, name
+    if metadata.width is None or metadata.height is None:
+        return 1, 0, name
+    return 0, metadata.width * metadata.height, name
+
+
+def group_label(order, grouping, metadata):
+    """Generates the header shown above the group of images an image belongs to
+
+    Args:
+        order (str): one of the supported sort orders
+        grouping (str): one of the supported groupings
+        metadata (CatalogRecord): catalog metadata describing the image, or None if it isn't known
+
+    Returns:
+        str: the header, or None if the image isn't grouped
+    """
+    if grouping == GROUP_NONE or order not in DATE_SORT_ORDERS or metadata is None:
+        return None
+    try:
+        value = date(*[int(cur) for cur in _date(order, metadata)[:10].split("-")])
+    except ValueError:
+        return None
+    if grouping == GROUP_MONTH:
+        return value.strftime("%B %Y")
+    return value.strftime("%A %d %B %Y")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
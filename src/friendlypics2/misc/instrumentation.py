@@ -0,0 +1,277 @@
+"""Lightweight timing and counting instrumentation for the hot paths of the application
+
+Code is instrumented with named spans, which time a block of code, and counters, which
+tally events such as cache hits. Collection is disabled by default, in which case spans
+and counters do nothing beyond checking a flag. It may be enabled from the debug window,
+or at startup by setting the FPICS2_INSTRUMENT environment variable to 1.
+
+Recent measurements are summarized for display, and the raw events may be saved in the
+Chrome trace event format for offline analysis in chrome://tracing or Perfetto.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import nullcontext
+from functools import wraps
+
+# Maximum number of durations kept for each span to calculate percentiles from
+SAMPLE_LIMIT = 1000
+# Maximum number of events kept for the trace. Older events are discarded first
+TRACE_LIMIT = 200000
+# Period of time, in seconds, over which the rate of events is measured
+RATE_WINDOW = 5.0
+
+#: Summary of the recent measurements for a span. Durations are in seconds
+SpanStats = namedtuple("SpanStats", ["name", "count", "p50", "p95", "max", "rate"])
+#: Summary of a counter
+CounterStats = namedtuple("CounterStats", ["name", "total", "rate"])
+
+# Span returned while collection is disabled. Shared since it has no state
+_NULL_SPAN = nullcontext()
+
+
+class _Series:
+    """Measurements collected for a single span or counter"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.samples = deque(maxlen=SAMPLE_LIMIT)
+        # end time and value of each recent event, used to calculate the rate
+        self.recent = deque()
+
+    def add(self, now, value):
+        """Records an event
+
+        Args:
+            now (float): time the event occurred, in seconds
+            value (float): duration of a span, or amount to add to a counter
+        """
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+        self.recent.append((now, value))
+        self.expire(now)
+
+    def expire(self, now):
+        """Discards events older than the rate window"""
+        while self.recent and now - self.recent[0][0] > RATE_WINDOW:
+            self.recent.popleft()
+
+
+class Recorder:
+    """Thread safe store for the measurements made by spans and counters"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = dict()
+        self._counters = dict()
+        self._trace = deque(maxlen=TRACE_LIMIT)
+        self._threads = dict()
+
+    def add_span(self, name, start_ns, end_ns):
+        """Records a completed span
+
+        Args:
+            name (str): name of the span
+            start_ns (int): time the span started, as reported by time.perf_counter_ns
+            end_ns (int): time the span ended, as reported by time.perf_counter_ns
+        """
+        tid = threading.get_ident()
+        with self._lock:
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            self._spans.setdefault(name, _Series()).add(end_ns / 1e9, (end_ns - start_ns) / 1e9)
+            self._trace.append((name, "X", start_ns, end_ns - start_ns, tid, None))
+
+    def add_count(self, name, value):
+        """Adds to a counter
+
+        Args:
+            name (str): name of the counter
+            value (int): amount to add
+        """
+        now_ns = time.perf_counter_ns()
+        with self._lock:
+            series = self._counters.setdefault(name, _Series())
+            series.add(now_ns / 1e9, value)
+            self._trace.append((name, "C", now_ns, 0, 0, series.total))
+
+    def stats(self):
+        """Summarizes the measurements collected so far
+
+        Returns:
+            tuple (list (SpanStats), list (CounterStats)): summaries for all spans and counters,
+            ordered by name
+        """
+        now = time.perf_counter()
+        spans = list()
+        counters = list()
+        with self._lock:
+            for cur_name, cur_series in sorted(self._spans.items()):
+                cur_series.expire(now)
+                samples = sorted(cur_series.samples)
+                spans.append(SpanStats(
+                    cur_name,
+                    cur_series.count,
+                    samples[len(samples) // 2],
+                    samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                    samples[-1],
+                    len(cur_series.recent) / RATE_WINDOW))
+            for cur_name, cur_series in sorted(self._counters.items()):
+                cur_series.expire(now)
+                counters.append(CounterStats(
+                    cur_name,
+                    cur_series.total,
+                    sum(cur_value for _, cur_value in cur_series.recent) / RATE_WINDOW))
+        return spans, counters
+
+    def clear(self):
+        """Discards all measurements"""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._trace.clear()
+
+    def write_chrome_trace(self, file_path):
+        """Saves the recorded events in the Chrome trace event format
+
+        Args:
+            file_path (pathlib.Path): file to write the trace to
+        """
+        pid = os.getpid()
+        with self._lock:
+            trace = list(self._trace)
+            threads = dict(self._threads)
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": cur_tid, "args": {"name": cur_name}}
+                  for cur_tid, cur_name in threads.items()]
+        for name, phase, start_ns, duration_ns, tid, total in trace:
+            event = {"name": name, "ph": phase, "ts": start_ns / 1000, "pid": pid, "tid": tid}
+            if phase == "X":
+                event["dur"] = duration_ns / 1000
+            else:
+                event["args"] = {"total": total}
+            events.append(event)
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+class _Span:
+    """Context manager that times the code it wraps"""
+    __slots__ = ["_name", "_start"]
+
+    def __init__(self, name):
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        _RECORDER.add_span(self._name, self._start, time.perf_counter_ns())
+        return False
+
+
+_RECORDER = Recorder()
+_ENABLED = os.environ.get("FPICS2_INSTRUMENT") == "1"
+
+
+def is_enabled():
+    """bool: True if measurements are being collected"""
+    return _ENABLED
+
+
+def set_enabled(value):
+    """Starts or stops collecting measurements. Existing measurements are kept.
+
+    Args:
+        value (bool): True to start collecting measurements
+    """
+    global _ENABLED  # pylint: disable=global-statement
+    _ENABLED = bool(value)
+
+
+def span(name):
+    """Times the code in a with block
+
+    Args:
+        name (str): name to record the duration under
+
+    Returns:
+        context manager: times the block when collection is enabled
+    """
+    if not _ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    """Decorator that times each call to a function
+
+    Args:
+        name (str): name to record the duration under
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _RECORDER.add_span(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Adds to a counter
+
+    Args:
+        name (str): name of the counter
+        value (int): amount to add
+    """
+    if _ENABLED:
+        _RECORDER.add_count(name, value)
+
+
+def record(name, start_ns, end_ns=None):
+    """Records a span that was timed by the caller, such as one that started before
+    collection could be enabled
+
+    Args:
+        name (str): name to record the duration under
+        start_ns (int): time the span started, as reported by time.perf_counter_ns
+        end_ns (int): time the span ended. Defaults to now.
+    """
+    if _ENABLED:
+        _RECORDER.add_span(name, start_ns, end_ns if end_ns is not None else time.perf_counter_ns())
+
+
+def stats():
+    """Summarizes the measurements collected so far
+
+    Returns:
+        tuple (list (SpanStats), list (CounterStats)): summaries for all spans and counters
+    """
+    return _RECORDER.stats()
+
+
+def clear():
+    """Discards all measurements"""
+    _RECORDER.clear()
+
+
+def write_chrome_trace(file_path):
+    """Saves the recorded events in the Chrome trace event format
+
+    Args:
+        file_path (pathlib.Path): file to write the trace to
+    """
+    _RECORDER.write_chrome_trace(file_path)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
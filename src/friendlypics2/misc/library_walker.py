@@ -0,0 +1,299 @@
+"""Background service for enumerating the contents of a tree of folders"""
+import logging
+import os
+import threading
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+from qtpy.QtCore import QRunnable, QThreadPool, Signal, Slot
+from friendlypics2.misc import instrumentation
+from friendlypics2.misc.folder_scanner import FolderScanner, is_candidate, DEFAULT_BATCH_SIZE, BATCH_INTERVAL
+
+# Minimum amount of time, in seconds, between throughput reports written to the log
+REPORT_INTERVAL = 1.0
+
+
+def walk_library(folder, max_depth, exclude, classifier):
+    """Enumerates all images in a tree of folders on the calling thread
+
+    Applies the same rules as :class:`LibraryWalker`, for use outside of the GUI where
+    there is no event loop to report results to
+
+    Args:
+        folder (pathlib.Path):
+            root of the folder tree to scan
+        max_depth (int):
+            maximum number of levels below the root folder to descend into
+        exclude (list (str)):
+            glob patterns for file and folder names to skip
+        classifier (FileClassifier):
+            identifies which files are images
+
+    Yields:
+        pathlib.Path: path to each image found
+    """
+    log = logging.getLogger(__name__)
+    pending = [(str(folder), 0)]
+    while pending:
+        cur_folder, depth = pending.pop()
+        try:
+            with os.scandir(cur_folder) as entries:
+                children = list(entries)
+        except OSError as err:
+            log.warning(f"Unable to scan folder {cur_folder}: {err}")
+            continue
+        sub_folders = list()
+        for cur_entry in sorted(children, key=lambda entry: entry.name):
+            if any(fnmatch(cur_entry.name, cur_pattern) for cur_pattern in exclude):
+                continue
+            try:
+                # never follow links to folders, to avoid cycles
+                is_dir = cur_entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if depth < max_depth:
+                    sub_folders.append((cur_entry.path, depth + 1))
+            elif is_candidate(cur_entry, classifier):
+                yield Path(cur_entry.path)
+        # visit sub folders in name order
+        pending.extend(reversed(sub_folders))
+
+
+class _WalkState:
+    """State shared by all of the tasks participating in a walk of a folder tree"""
+    def __init__(self, pool, signals, cancelled, max_depth, exclude, classifier, batch_size, visited):
+        """
+        Args:
+            pool (QThreadPool):
+                thread pool to schedule directory scans on
+            signals (_ScanSignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the walk should be aborted
+            max_depth (int):
+                maximum number of levels below the root folder to descend into
+            exclude (list (str)):
+                glob patterns for file and folder names to skip
+            classifier (FileClassifier):
+                identifies which files are images
+            batch_size (int):
+                maximum number of files to report at a time
+            visited (list (pathlib.Path)):
+                list each folder is added to once its contents have been listed in full
+        """
+        self.pool = pool
+        self.signals = signals
+        self.cancelled = cancelled
+        self.max_depth = max_depth
+        self.exclude = exclude
+        self.classifier = classifier
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._dirs = 0
+        self._files = 0
+        self._batch = list()
+        self._visited = visited
+        self._last_report = time.monotonic()
+
+    def is_excluded(self, name):
+        """bool: checks whether a file or folder name matches any of our exclude patterns"""
+        return any(fnmatch(name, cur_pattern) for cur_pattern in self.exclude)
+
+    def submit(self, folder, depth):
+        """Schedules a folder to be scanned
+
+        Args:
+            folder (str): path of the folder to scan
+            depth (int): number of levels the folder is below the root of the walk
+        """
+        with self._lock:
+            self._outstanding += 1
+        self.pool.start(DirectoryScanTask(self, folder, depth))
+
+    def add_files(self, files, folder=None):
+        """Records the files found by a task, reporting them if our current batch is full
+
+        Args:
+            files (list (pathlib.Path)): files found by the task
+            folder (pathlib.Path): folder the task listed in full, or None if it was only partially listed
+        """
+        with self._lock:
+            if folder is not None:
+                self._visited.append(folder)
+            self._dirs += 1
+            self._files += len(files)
+            self._batch.extend(files)
+            now = time.monotonic()
+            if len(self._batch) < self._batch_size and now - self._last_report < BATCH_INTERVAL:
+                return
+            batch = self._batch
+            self._batch = list()
+            self._last_report = now
+            dirs, total = self._dirs, self._files
+
+        if batch and not self.cancelled.is_set():
+            self.signals.files_found.emit(batch)
+        self.signals.progress.emit(dirs, total)
+
+    def task_done(self):
+        """Records the completion of a task, reporting the end of the walk if it was the last one"""
+        with self._lock:
+            self._outstanding -= 1
+            if self._outstanding:
+                return
+            batch = self._batch
+            self._batch = list()
+            dirs, total = self._dirs, self._files
+
+        if batch and not self.cancelled.is_set():
+            self.signals.files_found.emit(batch)
+        self.signals.progress.emit(dirs, total)
+        self.signals.finished.emit(not self.cancelled.is_set())
+
+
+class DirectoryScanTask(QRunnable):
+    """Unit of work that scans a single folder as part of a walk of a folder tree
+
+    Any sub folders found are scheduled as separate tasks so the tree is scanned in parallel
+    """
+    def __init__(self, state, folder, depth):
+        """
+        Args:
+            state (_WalkState): state shared by all tasks in the walk
+            folder (str): path of the folder to scan
+            depth (int): number of levels the folder is below the root of the walk
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._state = state
+        self._folder = folder
+        self._depth = depth
+
+    def run(self):
+        """Scans the folder. Executed on a worker thread from the pool"""
+        files = list()
+        visited = None
+        try:
+            if not self._state.cancelled.is_set():
+                with instrumentation.span("scan/folder"):
+                    self._scan(files)
+                instrumentation.count("scan/files", len(files))
+                if not self._state.cancelled.is_set():
+                    visited = Path(self._folder)
+        except OSError as err:
+            self._log.warning(f"Unable to scan folder {self._folder}: {err}")
+        finally:
+            self._state.add_files(files, visited)
+            self._state.task_done()
+
+    def _scan(self, files):
+        """Helper method that enumerates the contents of our folder
+
+        Args:
+            files (list (pathlib.Path)): list to populate with the files that were found
+        """
+        with os.scandir(self._folder) as entries:
+            for cur_entry in entries:
+                if self._state.cancelled.is_set():
+                    return
+                if self._state.is_excluded(cur_entry.name):
+                    continue
+                try:
+                    # never follow links to folders, to avoid cycles
+                    is_dir = cur_entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if self._depth < self._state.max_depth:
+                        self._state.submit(cur_entry.path, self._depth + 1)
+                elif is_candidate(cur_entry, self._state.classifier):
+                    files.append(Path(cur_entry.path))
+
+
+class LibraryWalker(FolderScanner):
+    """Enumerates all files in a tree of folders in the background, reporting them in batches
+
+    Each folder in the tree is scanned by a separate task on a dedicated thread pool, so
+    several folders are scanned in parallel. This helps hide latency on network shares and
+    other slow storage.
+    """
+    #: Signal emitted on the GUI thread as the walk progresses. Provides the number of folders
+    #: scanned and the number of files found so far
+    progress = Signal(int, int)
+
+    def __init__(self, folder, max_depth, exclude, worker_count, batch_size=DEFAULT_BATCH_SIZE, classifier=None,
+                 parent=None):
+        """
+        Args:
+            folder (pathlib.Path):
+                root of the folder tree to scan
+            max_depth (int):
+                maximum number of levels below the root folder to descend into
+            exclude (list (str)):
+                glob patterns for file and folder names to skip
+            worker_count (int):
+                maximum number of folders to scan in parallel
+            batch_size (int):
+                maximum number of files to report at a time
+            classifier (FileClassifier):
+                optional classifier identifying which files are images. Defaults
+                to accepting images in all supported formats.
+            parent (QObject):
+                optional Qt object that owns this walker
+        """
+        super().__init__(folder, batch_size, classifier, parent)
+        self._log = logging.getLogger(__name__)
+        self._max_depth = max_depth
+        self._exclude = list(exclude)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, worker_count))
+        self._last_report = None
+        self._signals.progress.connect(self._progress)
+
+    @property
+    def exclude(self):
+        """list (str): glob patterns for file and folder names skipped by this walker"""
+        return list(self._exclude)
+
+    @property
+    def recursive(self):
+        """bool: True if this scanner includes the contents of sub folders"""
+        return True
+
+    def _start_tasks(self):
+        """Schedules a scan of the root folder, which schedules scans of its children in turn"""
+        self._last_report = time.monotonic()
+        state = _WalkState(self._pool, self._signals, self._cancelled, self._max_depth, self._exclude,
+                           self._classifier, self._batch_size, self._visited)
+        state.submit(str(self._folder), 0)
+
+    @Slot(int, int)
+    def _progress(self, dirs, files):
+        """Callback for when the worker threads report their progress
+
+        Args:
+            dirs (int): number of folders scanned so far
+            files (int): number of files found so far
+        """
+        self.progress.emit(dirs, files)
+        if time.monotonic() - self._last_report >= REPORT_INTERVAL:
+            self._report_throughput()
+
+    @Slot(bool)
+    def _finished(self, completed):
+        """Callback for when the last worker thread finishes scanning"""
+        super()._finished(completed)
+        self._report_throughput()
+
+    def _report_throughput(self):
+        """Writes the progress and throughput of the walk to the log"""
+        self._last_report = time.monotonic()
+        stats = self.stats
+        self._log.info(f"Scanned {stats.folders} folders, {stats.files} files in {stats.elapsed:.1f}s "
+                       f"({stats.folder_rate:.0f} folders/s, {stats.file_rate:.0f} files/s)")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
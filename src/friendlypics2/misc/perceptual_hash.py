@@ -0,0 +1,228 @@
+"""Perceptual hashing of images, and fast lookup of similar hashes, for finding duplicate images
+
+Perceptual hashes are 64 bit fingerprints that change very little when an image is resized,
+recompressed or slightly edited, so near duplicate images have hashes that differ in only
+a few bits. Hashes are calculated for batches of images at a time using NumPy.
+"""
+import math
+import numpy as np
+from qtpy.QtCore import Qt
+from qtpy.QtGui import QImage
+
+# Size of the grey scale image used to calculate a difference hash
+DHASH_WIDTH = 9
+DHASH_HEIGHT = 8
+# Size of the grey scale image used to calculate a DCT based hash
+PHASH_SIZE = 32
+# Number of low frequency DCT coefficients, in each direction, used in a DCT based hash
+PHASH_FREQUENCIES = 8
+
+
+def _dct_matrix(size):
+    """Generates the matrix used to calculate a type II discrete cosine transform
+
+    Args:
+        size (int): number of samples to transform
+
+    Returns:
+        numpy.ndarray: orthonormal DCT matrix of shape (size, size)
+    """
+    samples = np.arange(size)
+    retval = np.cos(np.pi * np.outer(samples, 2 * samples + 1) / (2 * size))
+    retval[0] *= 1 / math.sqrt(2)
+    return retval * math.sqrt(2 / size)
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def grey_pixels(image, width, height):
+    """Shrinks an image to a tiny grey scale version of itself
+
+    Args:
+        image (QImage): image to shrink
+        width (int): width of the generated image
+        height (int): height of the generated image
+
+    Returns:
+        numpy.ndarray: 8 bit grey scale pixel values, of shape (height, width)
+    """
+    grey = image.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    grey = grey.convertToFormat(QImage.Format_Grayscale8)
+    data = np.frombuffer(grey.constBits(), np.uint8, count=grey.bytesPerLine() * height)
+    # rows are padded to a multiple of 4 bytes, so strip the padding and take a copy
+    # of the pixels since the image owns the underlying buffer
+    return data.reshape(height, grey.bytesPerLine())[:, :width].copy()
+
+
+def _pack(bits):
+    """Converts rows of 64 boolean values into integers
+
+    Args:
+        bits (numpy.ndarray): boolean array of shape (count, 64)
+
+    Returns:
+        list (int): one unsigned 64 bit integer for each row
+    """
+    return [int(cur_hash) for cur_hash in np.packbits(bits, axis=1).view(">u8").ravel()]
+
+
+def dhash_batch(pixels):
+    """Calculates difference hashes, which record whether each pixel is brighter than
+    its left hand neighbour
+
+    Args:
+        pixels (numpy.ndarray):
+            grey scale pixels for each image, of shape (count, DHASH_HEIGHT, DHASH_WIDTH)
+
+    Returns:
+        list (int): 64 bit hash for each image
+    """
+    pixels = np.asarray(pixels, dtype=np.int16)
+    bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    return _pack(bits.reshape(len(pixels), -1))
+
+
+def phash_batch(pixels):
+    """Calculates DCT based hashes, which record whether each of the lowest frequency
+    components of each image is above the median
+
+    Args:
+        pixels (numpy.ndarray):
+            grey scale pixels for each image, of shape (count, PHASH_SIZE, PHASH_SIZE)
+
+    Returns:
+        list (int): 64 bit hash for each image
+    """
+    pixels = np.asarray(pixels, dtype=np.float32)
+    coefficients = np.matmul(np.matmul(_DCT, pixels), _DCT.T)
+    low = coefficients[:, :PHASH_FREQUENCIES, :PHASH_FREQUENCIES].reshape(len(pixels), -1)
+    # the first coefficient holds the average brightness, which would skew the median
+    medians = np.median(low[:, 1:], axis=1)
+    return _pack(low > medians[:, np.newaxis])
+
+
+def hamming_distance(first, second):
+    """int: number of bits that differ between two hashes"""
+    return bin(first ^ second).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree indexing hashes by Hamming distance
+
+    Finding all hashes within a small distance of a given hash only needs to visit a
+    small fraction of the tree, rather than comparing against every hash in turn
+    """
+    def __init__(self):
+        # each node is a list containing a hash, the items with that hash, and a
+        # dictionary mapping distances to child nodes
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        """Adds an item to the tree
+
+        Args:
+            value (int): hash of the item
+            item (object): item to store
+        """
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], dict()]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], dict()]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Finds all items whose hash is close to a given hash
+
+        Args:
+            value (int): hash to search for
+            max_distance (int): maximum number of bits the hashes may differ by
+
+        Returns:
+            list (tuple (int, object)): distance to and identity of each matching item
+        """
+        retval = list()
+        if self._root is None:
+            return retval
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                retval.extend((distance, cur_item) for cur_item in node[1])
+            # by the triangle inequality, matches can only exist under children whose
+            # distance from this node is within max_distance of our own
+            for cur_distance, cur_child in node[2].items():
+                if abs(cur_distance - distance) <= max_distance:
+                    nodes.append(cur_child)
+        return retval
+
+
+def find_duplicate_groups(hashes, max_distance):
+    """Groups together images with similar perceptual hashes
+
+    Candidate matches are found by looking up each image's DCT hash in a BK-tree, and are
+    then confirmed by comparing the difference hashes as well, which weeds out most false
+    matches. Matches are transitive, so if A matches B and B matches C all three are grouped.
+
+    Args:
+        hashes (list (tuple)):
+            path, DCT hash and difference hash for each image
+        max_distance (int):
+            maximum number of bits each hash may differ by for images to be considered duplicates
+
+    Returns:
+        list (list):
+            paths of the images in each group of two or more similar images, with the
+            largest groups first
+    """
+    # images with identical hashes are always grouped, so only index each distinct pair of hashes once
+    distinct = dict()
+    for cur_path, cur_phash, cur_dhash in hashes:
+        distinct.setdefault((cur_phash, cur_dhash), list()).append(cur_path)
+    keys = list(distinct)
+
+    tree = BKTree()
+    for cur_index, (cur_phash, _) in enumerate(keys):
+        tree.add(cur_phash, cur_index)
+
+    parents = list(range(len(keys)))
+
+    def _root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for cur_index, (cur_phash, cur_dhash) in enumerate(keys):
+        for _, cur_match in tree.search(cur_phash, max_distance):
+            if cur_match <= cur_index:
+                continue
+            if hamming_distance(cur_dhash, keys[cur_match][1]) > max_distance:
+                continue
+            parents[_root(cur_match)] = _root(cur_index)
+
+    groups = dict()
+    for cur_index, cur_key in enumerate(keys):
+        groups.setdefault(_root(cur_index), list()).extend(distinct[cur_key])
+    retval = [sorted(cur_group) for cur_group in groups.values() if len(cur_group) > 1]
+    retval.sort(key=lambda group: (-len(group), group[0]))
+    return retval
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,114 @@
+"""Logic for deciding how many rows a lazy loading model should reveal at a time"""
+import time
+from collections import deque
+
+# Number of items assumed to fit in the view before it has been measured
+DEFAULT_CAPACITY = 25
+# Number of screens worth of rows to reveal when a model is first shown
+INITIAL_SCREENS = 2
+# Minimum number of rows to reveal at a time
+MIN_BATCH = 10
+# Maximum factor the batch size may grow by while the user is scrolling quickly
+MAX_GROWTH = 16
+# Requests for more rows arriving closer together than this, in seconds, indicate fast scrolling
+FAST_FETCH_INTERVAL = 0.25
+# Target amount of time, in seconds, the view may spend laying out each batch of rows
+LAYOUT_BUDGET = 0.05
+# Weight given to each new measurement of the layout time per row
+SMOOTHING = 0.2
+# Period of time, in seconds, over which the row reveal rate is measured
+RATE_WINDOW = 2.0
+
+
+class RowRevealPolicy:
+    """Sizes the batches of rows revealed by a lazy loading model
+
+    Each batch holds at least a screens worth of rows, so the view doesn't need to ask
+    for more rows several times to fill a single screen. The batch size doubles each time
+    the view asks for more rows in quick succession, as it does when the user scrolls
+    quickly, and is capped so the time spent laying out a batch stays within budget.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Args:
+            capacity (int):
+                number of items that fit in the view at once
+        """
+        self._capacity = max(1, capacity)
+        self._growth = 1
+        self._last_fetch = None
+        self._row_cost = None
+        self._history = deque()
+
+    @property
+    def capacity(self):
+        """int: number of items that fit in the view at once"""
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value):
+        self._capacity = max(1, value)
+
+    @property
+    def initial_rows(self):
+        """int: number of rows to reveal when the model is first shown"""
+        return max(MIN_BATCH, self._capacity * INITIAL_SCREENS)
+
+    @property
+    def row_cost(self):
+        """float: average time, in seconds, taken to lay out a single row. None if not yet measured"""
+        return self._row_cost
+
+    @property
+    def reveal_rate(self):
+        """float: average number of rows revealed per second over the last few seconds"""
+        self._expire(time.monotonic())
+        return sum(cur_rows for _, cur_rows in self._history) / RATE_WINDOW
+
+    def next_batch(self, remaining):
+        """Calculates the number of rows to reveal in response to a request for more rows
+
+        Args:
+            remaining (int): number of rows that have yet to be revealed
+
+        Returns:
+            int: number of rows to reveal
+        """
+        now = time.monotonic()
+        if self._last_fetch is not None and now - self._last_fetch < FAST_FETCH_INTERVAL:
+            self._growth = min(self._growth * 2, MAX_GROWTH)
+        else:
+            self._growth = 1
+        self._last_fetch = now
+
+        batch = self._capacity * self._growth
+        if self._row_cost:
+            batch = min(batch, max(self._capacity, int(LAYOUT_BUDGET / self._row_cost)))
+        return max(0, min(max(batch, MIN_BATCH), remaining))
+
+    def record(self, rows, elapsed):
+        """Records the time taken to reveal a batch of rows
+
+        Args:
+            rows (int): number of rows revealed
+            elapsed (float): time, in seconds, taken to lay out the rows
+        """
+        if rows <= 0:
+            return
+        now = time.monotonic()
+        self._history.append((now, rows))
+        self._expire(now)
+        cost = elapsed / rows
+        if self._row_cost is None:
+            self._row_cost = cost
+        else:
+            self._row_cost += SMOOTHING * (cost - self._row_cost)
+
+    def _expire(self, now):
+        """Discards reveal history older than the measurement window"""
+        while self._history and now - self._history[0][0] > RATE_WINDOW:
+            self._history.popleft()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
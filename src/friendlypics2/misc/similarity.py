@@ -0,0 +1,554 @@
+"""Visual similarity search based on compact colour and texture embeddings
+
+Each image is summarized by a small vector of floats combining a coarse HSV colour histogram
+with a histogram of edge strengths. Vectors are normalized so the dot product of two vectors
+measures how similar the images look. All vectors are kept in one contiguous matrix backed by
+a memory mapped file, so a query is a single matrix-vector product over the whole library.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+from appdirs import user_data_dir
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QSize, Qt, Signal, Slot
+from qtpy.QtGui import QImage
+from friendlypics2.misc.catalog import EmbeddingRecord
+from friendlypics2.misc.image_decoder import load_small_image
+from friendlypics2.version import __version__
+
+# Size of the image used to calculate an embedding
+EMBEDDING_PIXELS = 32
+# Number of hue, saturation and value levels in the colour histogram
+HUE_BINS = 8
+SATURATION_BINS = 3
+VALUE_BINS = 3
+# Boundaries between the levels of edge strength in the texture histogram
+TEXTURE_EDGES = [0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5]
+# Relative importance of texture compared to colour when comparing images
+TEXTURE_WEIGHT = 0.5
+#: Number of floats in each embedding
+EMBEDDING_SIZE = HUE_BINS * SATURATION_BINS * VALUE_BINS + len(TEXTURE_EDGES) + 1
+# Number of images to analyse at a time
+EMBED_BATCH_SIZE = 256
+# Size of the image decoded for analysis, when no thumbnail is available from the cache
+EMBED_DECODE_SIZE = QSize(64, 64)
+# Number of embeddings the matrix file has room for when first created
+INITIAL_CAPACITY = 4096
+
+
+def default_embeddings_path():
+    """pathlib.Path: default location of the file holding the embedding matrix"""
+    temp = user_data_dir("Friendly Pics 2", "The Friendly Coder", __version__)
+    return Path(temp).joinpath("embeddings.npy")
+
+
+def rgb_pixels(image, size):
+    """Shrinks an image to a tiny colour version of itself
+
+    Args:
+        image (QImage): image to shrink
+        size (int): width and height of the generated image
+
+    Returns:
+        numpy.ndarray: 8 bit RGB pixel values, of shape (size, size, 3)
+    """
+    small = image.scaled(size, size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    small = small.convertToFormat(QImage.Format_RGB888)
+    data = np.frombuffer(small.constBits(), np.uint8, count=small.bytesPerLine() * size)
+    return data.reshape(size, small.bytesPerLine())[:, :size * 3].reshape(size, size, 3).copy()
+
+
+def _histograms(bins, bin_count):
+    """Counts the occurrences of each bin for a batch of images
+
+    Args:
+        bins (numpy.ndarray): integer bin numbers of shape (count, ...)
+        bin_count (int): total number of bins
+
+    Returns:
+        numpy.ndarray: normalized histograms of shape (count, bin_count)
+    """
+    count = len(bins)
+    flat = bins.reshape(count, -1)
+    offsets = np.arange(count)[:, np.newaxis] * bin_count
+    retval = np.bincount((flat + offsets).ravel(), minlength=count * bin_count).reshape(count, bin_count)
+    return retval / flat.shape[1]
+
+
+def embed_batch(pixels):
+    """Calculates the embeddings for a batch of images
+
+    Args:
+        pixels (numpy.ndarray):
+            8 bit RGB pixels for each image, of shape (count, EMBEDDING_PIXELS, EMBEDDING_PIXELS, 3)
+
+    Returns:
+        numpy.ndarray: unit length embeddings of shape (count, EMBEDDING_SIZE)
+    """
+    rgb = np.asarray(pixels, dtype=np.float32) / 255
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    value = rgb.max(axis=-1)
+    delta = value - rgb.min(axis=-1)
+    safe_delta = np.where(delta > 0, delta, 1)
+    saturation = np.where(value > 0, delta / np.where(value > 0, value, 1), 0)
+    hue = np.select(
+        [delta == 0, value == red, value == green],
+        [0, ((green - blue) / safe_delta) % 6, (blue - red) / safe_delta + 2],
+        (red - green) / safe_delta + 4) / 6
+
+    hue_bin = np.minimum((hue * HUE_BINS).astype(np.int64), HUE_BINS - 1)
+    saturation_bin = np.minimum((saturation * SATURATION_BINS).astype(np.int64), SATURATION_BINS - 1)
+    value_bin = np.minimum((value * VALUE_BINS).astype(np.int64), VALUE_BINS - 1)
+    colour_bins = (hue_bin * SATURATION_BINS + saturation_bin) * VALUE_BINS + value_bin
+    colour = _histograms(colour_bins, HUE_BINS * SATURATION_BINS * VALUE_BINS)
+
+    grey = 0.299 * red + 0.587 * green + 0.114 * blue
+    gradient = np.hypot(grey[:, 1:, :-1] - grey[:, :-1, :-1], grey[:, :-1, 1:] - grey[:, :-1, :-1])
+    texture = _histograms(np.digitize(gradient, TEXTURE_EDGES), len(TEXTURE_EDGES) + 1)
+
+    # square roots of the histograms turn the dot product into the Bhattacharyya coefficient,
+    # which compares histograms far better than the raw counts would
+    retval = np.concatenate([np.sqrt(colour), np.sqrt(texture) * TEXTURE_WEIGHT], axis=1)
+    retval /= np.linalg.norm(retval, axis=1, keepdims=True)
+    return retval.astype(np.float32)
+
+
+class EmbeddingStore:
+    """Thread safe store for the embeddings of every image in the library
+
+    Embeddings are held in the rows of a matrix backed by a memory mapped file, and the
+    catalog records which row belongs to which image
+    """
+    def __init__(self, file_path, catalog):
+        """
+        Args:
+            file_path (pathlib.Path):
+                location of the matrix file. Will be created if it doesn't exist.
+            catalog (Catalog):
+                catalog recording which row of the matrix belongs to which image
+        """
+        self._log = logging.getLogger(__name__)
+        self._file_path = file_path
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows = None
+        self._paths = None
+        self._stamps = None
+        self._count = 0
+        # rows belonging to the candidates of the most recent search, kept up to date as rows are added
+        self._candidates = None
+        self._candidate_mask = None
+
+    @property
+    def catalog(self):
+        """Catalog: catalog recording which row of the matrix belongs to which image"""
+        return self._catalog
+
+    @property
+    def count(self):
+        """int: number of rows used in the matrix"""
+        with self._lock:
+            self._load()
+            return self._count
+
+    def _load(self):
+        """Opens the matrix and loads the row assignments from the catalog, if not done already.
+        Must be called with the lock held."""
+        if self._matrix is not None:
+            return
+        records = self._catalog.list_embeddings()
+        matrix = None
+        if self._file_path.exists():
+            try:
+                matrix = np.load(str(self._file_path), mmap_mode="r+")
+                if matrix.ndim != 2 or matrix.shape[1] != EMBEDDING_SIZE or matrix.dtype != np.float32:
+                    self._log.warning(f"Discarding incompatible embedding matrix {self._file_path}")
+                    matrix = None
+            except (OSError, ValueError) as err:
+                self._log.warning(f"Unable to load embedding matrix {self._file_path}: {err}")
+        if matrix is None:
+            if records:
+                self._catalog.clear_embeddings()
+            records = list()
+            matrix = self._create(INITIAL_CAPACITY)
+        records = [cur for cur in records if cur.row < len(matrix)]
+
+        self._matrix = matrix
+        self._count = max([cur.row + 1 for cur in records], default=0)
+        self._rows = {cur.path: cur.row for cur in records}
+        self._paths = [None] * len(matrix)
+        self._stamps = np.zeros((len(matrix), 2), np.int64)
+        for cur in records:
+            self._paths[cur.row] = cur.path
+            self._stamps[cur.row] = (cur.size, cur.mtime_ns)
+
+    def _create(self, capacity):
+        """Creates an empty matrix file
+
+        Args:
+            capacity (int): number of rows in the matrix
+
+        Returns:
+            numpy.memmap: the new matrix
+        """
+        self._file_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return np.lib.format.open_memmap(
+            str(self._file_path), mode="w+", dtype=np.float32, shape=(capacity, EMBEDDING_SIZE))
+
+    def _grow(self, capacity):
+        """Enlarges the matrix file so it has room for more rows. Must be called with the lock held.
+
+        Args:
+            capacity (int): minimum number of rows needed
+        """
+        new_capacity = len(self._matrix)
+        while new_capacity < capacity:
+            new_capacity *= 2
+        temp_path = self._file_path.with_suffix(".tmp")
+        larger = np.lib.format.open_memmap(
+            str(temp_path), mode="w+", dtype=np.float32, shape=(new_capacity, EMBEDDING_SIZE))
+        larger[:self._count] = self._matrix[:self._count]
+        larger.flush()
+        # release our mappings before replacing the file, as required on some platforms
+        del larger
+        self._matrix = None
+        os.replace(str(temp_path), str(self._file_path))
+        self._matrix = np.load(str(self._file_path), mmap_mode="r+")
+        self._paths.extend([None] * (new_capacity - len(self._paths)))
+        self._stamps = np.concatenate([self._stamps, np.zeros((new_capacity - len(self._stamps), 2), np.int64)])
+        if self._candidate_mask is not None:
+            self._candidate_mask = np.concatenate(
+                [self._candidate_mask, np.zeros(new_capacity - len(self._candidate_mask), bool)])
+
+    def is_current(self, file_path, stats):
+        """Checks whether the embedding for an image is up to date
+
+        Args:
+            file_path (pathlib.Path): path to the image
+            stats (os.stat_result): current file system statistics for the image
+
+        Returns:
+            bool: True if the image has an embedding that was calculated from its current contents
+        """
+        with self._lock:
+            self._load()
+            row = self._rows.get(str(file_path))
+            return row is not None and tuple(self._stamps[row]) == (stats.st_size, stats.st_mtime_ns)
+
+    def get(self, file_path):
+        """Loads the embedding for an image
+
+        Args:
+            file_path (pathlib.Path): path to the image
+
+        Returns:
+            numpy.ndarray: the embedding, or None if the image has not been analysed
+        """
+        with self._lock:
+            self._load()
+            row = self._rows.get(str(file_path))
+            return None if row is None else np.array(self._matrix[row])
+
+    def add(self, items):
+        """Stores the embeddings for a set of images, replacing any previous embeddings
+
+        Args:
+            items (list (tuple)):
+                path, file system statistics and embedding for each image
+        """
+        if not items:
+            return
+        records = list()
+        with self._lock:
+            self._load()
+            for cur_path, cur_stats, cur_vector in items:
+                key = str(cur_path)
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._count
+                    if row >= len(self._matrix):
+                        self._grow(row + 1)
+                    self._count += 1
+                    self._rows[key] = row
+                    self._paths[row] = key
+                    if self._candidates is not None and key in self._candidates:
+                        self._candidate_mask[row] = True
+                self._matrix[row] = cur_vector
+                self._stamps[row] = (cur_stats.st_size, cur_stats.st_mtime_ns)
+                records.append(EmbeddingRecord(key, cur_stats.st_size, cur_stats.st_mtime_ns, row))
+            self._matrix.flush()
+        self._catalog.update_embeddings(records)
+
+    def nearest(self, vector, count, exclude=None, candidates=None):
+        """Finds the images that look the most like a given embedding
+
+        Args:
+            vector (numpy.ndarray): embedding to compare against
+            count (int): maximum number of images to find
+            exclude (pathlib.Path): optional image to leave out of the results
+            candidates (frozenset (str)):
+                optional paths of the images to limit the search to. Defaults to every image
+                in the store. The rows belonging to the most recent set of candidates are
+                remembered, so later searches passing the same object don't look them up again.
+
+        Returns:
+            list (tuple (pathlib.Path, float)):
+                path of each matching image and its similarity, from 0 to 1, with the
+                most similar images first
+        """
+        with self._lock:
+            self._load()
+            if candidates is None:
+                rows = np.arange(self._count)
+                matrix = self._matrix[:self._count]
+            else:
+                rows = np.flatnonzero(self._mask_for(candidates)[:self._count])
+                # copying the rows of a few candidates is cheaper than scoring the whole
+                # library, but copying most of the library is not
+                matrix = self._matrix[rows] if len(rows) < self._count // 2 else self._matrix[:self._count]
+            if not len(rows) or count <= 0:  # pylint: disable=len-as-condition
+                return list()
+            scores = matrix @ np.asarray(vector, dtype=np.float32)
+            if len(scores) != len(rows):
+                scores = scores[rows]
+            paths = self._paths
+            if exclude is not None and str(exclude) in self._rows:
+                scores[rows == self._rows[str(exclude)]] = -np.inf
+
+        count = min(count, len(rows))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [(Path(paths[rows[cur]]), float(scores[cur])) for cur in top
+                if paths[rows[cur]] is not None and np.isfinite(scores[cur])]
+
+    def _mask_for(self, candidates):
+        """Finds the rows belonging to a set of images. Must be called with the lock held.
+
+        Args:
+            candidates (frozenset (str)): paths of the images to find
+
+        Returns:
+            numpy.ndarray: boolean mask that is True for each row belonging to one of the images
+        """
+        if candidates is not self._candidates:
+            mask = np.zeros(len(self._matrix), bool)
+            if len(candidates) < self._count // 4:
+                mask[[self._rows[cur] for cur in candidates if cur in self._rows]] = True
+            else:
+                # walking the rows in order is much faster than looking up most of the library at random
+                mask[:self._count] = np.fromiter(
+                    (cur in candidates for cur in self._paths[:self._count]), bool, self._count)
+            self._candidates = candidates
+            self._candidate_mask = mask
+        return self._candidate_mask
+
+
+class _SimilaritySignals(QObject):
+    """Signals raised by similarity search tasks. QRunnable is not a QObject so it can't own signals itself"""
+    progress = Signal(int, int)
+    finished = Signal(object)
+
+
+class SimilaritySearchTask(QRunnable):
+    """Unit of work that analyses a set of images and finds those most like a given image on a worker thread"""
+    def __init__(self, store, query_path, paths, count, signals, cancelled, thumbnail_cache=None,
+                 thumbnail_size=None, candidates=None):
+        """
+        Args:
+            store (EmbeddingStore):
+                store holding the embeddings for the library
+            query_path (pathlib.Path):
+                path to the image to find similar images for
+            paths (list (pathlib.Path)):
+                images to analyse before searching, if they haven't been analysed already
+            count (int):
+                maximum number of similar images to find
+            signals (_SimilaritySignals):
+                object used to report results back to the GUI thread
+            cancelled (threading.Event):
+                event used to indicate the search should be aborted
+            thumbnail_cache (DiskThumbnailCache):
+                optional cache of previously generated thumbnails to analyse, to avoid
+                decoding the images
+            thumbnail_size (QSize):
+                size, in device pixels, of the thumbnails held in the cache
+            candidates (frozenset (str)):
+                optional paths of the images to limit the results to. Defaults to every
+                image that has been analysed.
+        """
+        super().__init__()
+        self._log = logging.getLogger(__name__)
+        self._store = store
+        self._query_path = query_path
+        self._paths = paths
+        self._count = count
+        self._signals = signals
+        self._cancelled = cancelled
+        self._thumbnail_cache = thumbnail_cache
+        self._thumbnail_size = thumbnail_size
+        self._candidates = candidates
+
+    def run(self):
+        """Performs the search. Executed on a worker thread from the pool"""
+        results = None
+        try:
+            if self._analyse():
+                vector = self._store.get(self._query_path)
+                if vector is not None:
+                    results = self._search(vector)
+                else:
+                    self._log.warning(f"Unable to analyse {self._query_path}")
+        except sqlite3.Error as err:
+            self._log.error(f"Unable to access catalog {self._store.catalog.path}: {err}")
+        finally:
+            self._store.catalog.close()
+            self._signals.finished.emit(results)
+
+    def _search(self, vector):
+        """Helper method that finds the images most like an embedding, leaving out any that have
+        been deleted since they were analysed
+
+        Args:
+            vector (numpy.ndarray): embedding to compare against
+
+        Returns:
+            list (tuple (pathlib.Path, float)): path and similarity of each matching image
+        """
+        wanted = self._count
+        while True:
+            results = self._store.nearest(vector, wanted, self._query_path, self._candidates)
+            retval = [cur for cur in results if cur[0].exists()]
+            if len(retval) >= self._count or len(results) < wanted:
+                return retval[:self._count]
+            wanted *= 2
+
+    def _analyse(self):
+        """Helper method that calculates the embeddings for any of our images that need them
+
+        Returns:
+            bool: True if all images were analysed, False if the search was cancelled
+        """
+        batch = list()
+        total = len(self._paths)
+        for cur_index, cur_path in enumerate(self._paths):
+            if self._cancelled.is_set():
+                return False
+            try:
+                stats = os.stat(cur_path)
+            except OSError:
+                continue
+            if self._store.is_current(cur_path, stats):
+                continue
+            image = load_small_image(cur_path, stats, EMBED_DECODE_SIZE, self._thumbnail_cache, self._thumbnail_size)
+            if image.isNull():
+                continue
+            batch.append((cur_path, stats, rgb_pixels(image, EMBEDDING_PIXELS)))
+            if len(batch) >= EMBED_BATCH_SIZE:
+                self._embed(batch)
+                batch = list()
+                self._signals.progress.emit(cur_index + 1, total)
+        self._embed(batch)
+        return True
+
+    def _embed(self, batch):
+        """Calculates and stores the embeddings for a batch of images
+
+        Args:
+            batch (list (tuple)): path, file system statistics and pixels for each image
+        """
+        if not batch:
+            return
+        vectors = embed_batch(np.stack([cur[2] for cur in batch]))
+        self._store.add([(cur[0], cur[1], cur_vector) for cur, cur_vector in zip(batch, vectors)])
+
+
+class SimilarityFinder(QObject):
+    """Finds the images in the library that look the most like a given image, in the background
+
+    The embeddings calculated for each image are saved along with the catalog, so only
+    images that are new or have changed need to be analysed again
+    """
+    #: Signal emitted on the GUI thread as images are analysed. Provides the number of
+    #: images processed so far and the total number of images
+    progress = Signal(int, int)
+    #: Signal emitted on the GUI thread when the search ends. Provides a list of tuples
+    #: containing the path of each similar image and its similarity from 0 to 1, with the
+    #: most similar images first. Will be None if the search was cancelled or failed.
+    finished = Signal(object)
+
+    def __init__(self, store, result_count, thumbnail_cache=None, parent=None):
+        """
+        Args:
+            store (EmbeddingStore):
+                store holding the embeddings for the library
+            result_count (int):
+                maximum number of similar images to find
+            thumbnail_cache (DiskThumbnailCache):
+                optional cache of previously generated thumbnails to analyse, to avoid
+                decoding the images
+            parent (QObject):
+                optional Qt object that owns this finder
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._store = store
+        self._result_count = result_count
+        self._thumbnail_cache = thumbnail_cache
+        self._cancelled = threading.Event()
+        self._running = False
+        self._signals = _SimilaritySignals()
+        self._signals.progress.connect(self._progress)
+        self._signals.finished.connect(self._finished)
+
+    @property
+    def is_running(self):
+        """bool: True if a search is currently in progress"""
+        return self._running
+
+    def start(self, query_path, paths, thumbnail_size=None, candidates=None):
+        """Starts searching for similar images on a worker thread
+
+        Args:
+            query_path (pathlib.Path):
+                path to the image to find similar images for
+            paths (list (pathlib.Path)):
+                images to analyse before searching, if they haven't been analysed already.
+                The image being searched for is always analysed.
+            thumbnail_size (QSize):
+                optional size, in device pixels, of the thumbnails held in the thumbnail
+                cache. Cached thumbnails are only used if this is provided.
+            candidates (frozenset (str)):
+                optional paths of the images to limit the results to, such as those in the
+                folder being shown. Defaults to every image that has been analysed. Passing
+                the same object to later searches avoids working out which rows it refers to again.
+        """
+        self._cancelled = threading.Event()
+        self._running = True
+        QThreadPool.globalInstance().start(SimilaritySearchTask(
+            self._store, query_path, [query_path] + list(paths), self._result_count, self._signals,
+            self._cancelled, self._thumbnail_cache, thumbnail_size, candidates))
+
+    def cancel(self):
+        """Aborts the search"""
+        self._cancelled.set()
+
+    @Slot(int, int)
+    def _progress(self, done, total):
+        """Callback for when the worker thread has analysed another batch of images"""
+        if not self._cancelled.is_set():
+            self.progress.emit(done, total)
+
+    @Slot(object)
+    def _finished(self, results):
+        """Callback for when the worker thread finishes searching"""
+        self._running = False
+        if self._cancelled.is_set():
+            results = None
+        self.finished.emit(results)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,330 @@
+"""In-memory and persistent caches for generated image thumbnails"""
+import logging
+import os
+import hashlib
+import threading
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from appdirs import user_cache_dir
+from qtpy.QtGui import QImage
+from friendlypics2.version import __version__
+
+
+def default_cache_folder():
+    """pathlib.Path: default location for the on-disk thumbnail cache"""
+    temp = user_cache_dir("Friendly Pics 2", "The Friendly Coder", __version__)
+    return Path(temp).joinpath("thumbnails")
+
+
+class MemoryThumbnailCache:
+    """In-memory cache of decoded thumbnails bounded by the amount of memory they use
+
+    Each entry is stored along with an estimate of the memory it consumes, and the least
+    recently used entries are discarded whenever the total exceeds the memory budget.
+    Not thread safe, intended to be used exclusively from the GUI thread.
+    """
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int):
+                maximum amount of memory the cached thumbnails may use
+        """
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __str__(self):
+        return (f"{len(self._entries)} thumbnails using {self._total_bytes} of {self._max_bytes} bytes, "
+                f"{self._hits} hits, {self._misses} misses")
+
+    @property
+    def max_bytes(self):
+        """int: maximum amount of memory the cached thumbnails may use"""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        self._max_bytes = value
+        self._evict()
+
+    @property
+    def total_bytes(self):
+        """int: estimated amount of memory used by the cached thumbnails"""
+        return self._total_bytes
+
+    @property
+    def hits(self):
+        """int: number of lookups that found a cached thumbnail"""
+        return self._hits
+
+    @property
+    def misses(self):
+        """int: number of lookups that did not find a cached thumbnail"""
+        return self._misses
+
+    def get(self, key):
+        """Retrieves a thumbnail from the cache, marking it as recently used
+
+        Args:
+            key (object): unique identifier for the thumbnail
+
+        Returns:
+            object: the cached thumbnail, or None if it is not in the cache
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, cost):
+        """Adds a thumbnail to the cache, evicting old thumbnails as needed
+
+        Args:
+            key (object): unique identifier for the thumbnail
+            value (object): thumbnail to store
+            cost (int): estimated number of bytes used by the thumbnail
+        """
+        self.remove(key)
+        self._entries[key] = (value, cost)
+        self._total_bytes += cost
+        self._evict()
+
+    def remove(self, key):
+        """Removes a thumbnail from the cache, if it exists
+
+        Args:
+            key (object): unique identifier for the thumbnail
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def clear(self):
+        """Removes all thumbnails from the cache. Hit and miss counts are preserved"""
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _evict(self):
+        """Discards least recently used entries until we are within our memory budget"""
+        while self._total_bytes > self._max_bytes and self._entries:
+            _, (_, cost) = self._entries.popitem(last=False)
+            self._total_bytes -= cost
+
+
+class DiskThumbnailCache:
+    """Thread safe, size limited, on-disk cache of image thumbnails
+
+    Each thumbnail is keyed by a hash of the absolute path of the source image, its size
+    and its modification time, so a cached thumbnail is automatically ignored once its
+    source changes without having to read the source file itself. When the total size
+    of the cache exceeds its limit, the least recently used thumbnails are removed. The
+    modification time of each cache entry tracks when it was last used so the usage
+    history survives between runs.
+    """
+    def __init__(self, folder, max_bytes):
+        """
+        Args:
+            folder (pathlib.Path):
+                path where the cached thumbnails are to be stored
+            max_bytes (int):
+                maximum amount of disk space the cache may use
+        """
+        self._log = logging.getLogger(__name__)
+        self._folder = folder
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Lazy loaded index of cache entries, ordered from least to most recently used
+        self._entries = None
+        self._total_bytes = 0
+
+    @property
+    def path(self):
+        """pathlib.Path: location where cached thumbnails are stored"""
+        return self._folder
+
+    @property
+    def max_bytes(self):
+        """int: maximum amount of disk space the cache may use"""
+        return self._max_bytes
+
+    @property
+    def total_bytes(self):
+        """int: amount of disk space currently used by the cache"""
+        with self._lock:
+            self._load_index()
+            return self._total_bytes
+
+    def __contains__(self, key):
+        with self._lock:
+            self._load_index()
+            return key in self._entries
+
+    @staticmethod
+    def make_key(file_path, file_size, mtime_ns, size):
+        """Generates the cache key for a thumbnail
+
+        Args:
+            file_path (pathlib.Path):
+                path to the source image
+            file_size (int):
+                size of the source image, in bytes
+            mtime_ns (int):
+                modification time of the source image, in nanoseconds
+            size (QSize):
+                bounding box of the thumbnail
+
+        Returns:
+            str: unique identifier for the thumbnail
+        """
+        temp = f"{Path(file_path).absolute()}|{file_size}|{mtime_ns}|{size.width()}x{size.height()}"
+        return hashlib.sha1(temp.encode("utf-8")).hexdigest()
+
+    def key_for(self, file_path, size):
+        """Generates the cache key for the current version of an image on disk
+
+        Args:
+            file_path (pathlib.Path):
+                path to the source image
+            size (QSize):
+                bounding box of the thumbnail
+
+        Returns:
+            str:
+                unique identifier for the thumbnail, or None if the source image
+                could not be found
+        """
+        try:
+            stats = os.stat(file_path)
+        except OSError:
+            return None
+        return self.make_key(file_path, stats.st_size, stats.st_mtime_ns, size)
+
+    def _entry_path(self, key):
+        """pathlib.Path: location of the cache file for the given key"""
+        return self._folder.joinpath(key[:2], key)
+
+    def _load_index(self):
+        """Scans the cache folder to initialize our index. Caller must hold the lock"""
+        if self._entries is not None:
+            return
+        found = list()
+        if self._folder.exists():
+            for cur_dir in os.scandir(self._folder):
+                if not cur_dir.is_dir():
+                    continue
+                for cur_entry in os.scandir(cur_dir.path):
+                    if not cur_entry.is_file() or cur_entry.name.endswith(".tmp"):
+                        continue
+                    stats = cur_entry.stat()
+                    found.append((stats.st_mtime_ns, cur_entry.name, stats.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in found)
+        self._total_bytes = sum(self._entries.values())
+        self._log.debug(f"Thumbnail cache contains {len(self._entries)} entries ({self._total_bytes} bytes)")
+
+    def get(self, key):
+        """Loads a thumbnail from the cache
+
+        Args:
+            key (str): unique identifier of the thumbnail, as generated by :meth:`key_for`
+
+        Returns:
+            QImage: the cached thumbnail, or None if it is not in the cache
+        """
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        entry_path = self._entry_path(key)
+        image = QImage(str(entry_path))
+        if image.isNull():
+            self._log.debug(f"Discarding unreadable thumbnail cache entry {entry_path}")
+            self.remove(key)
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return image
+
+    def put(self, key, image):
+        """Adds a thumbnail to the cache, evicting old thumbnails as needed
+
+        Args:
+            key (str): unique identifier of the thumbnail, as generated by :meth:`key_for`
+            image (QImage): thumbnail to be stored
+        """
+        entry_path = self._entry_path(key)
+        temp_path = entry_path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        image_format = "PNG" if image.hasAlphaChannel() else "JPG"
+        try:
+            entry_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            if not image.save(str(temp_path), image_format):
+                self._log.debug(f"Unable to write thumbnail cache entry {entry_path}")
+                return
+            os.replace(temp_path, entry_path)
+            entry_size = entry_path.stat().st_size
+        except OSError as err:
+            self._log.debug(f"Unable to write thumbnail cache entry {entry_path}: {err}")
+            return
+
+        with self._lock:
+            self._load_index()
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = entry_size
+            self._total_bytes += entry_size
+            evicted = self._evict()
+
+        for cur_key in evicted:
+            self._entry_path(cur_key).unlink(missing_ok=True)
+
+    def remove(self, key):
+        """Removes a thumbnail from the cache
+
+        Args:
+            key (str): unique identifier of the thumbnail to remove
+        """
+        with self._lock:
+            self._load_index()
+            self._total_bytes -= self._entries.pop(key, 0)
+        self._entry_path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        """Removes least recently used entries from the index until we are within our size limit
+
+        Caller must hold the lock, and is responsible for deleting the files for the evicted entries
+
+        Returns:
+            list (str): keys for all evicted entries
+        """
+        retval = list()
+        while self._total_bytes > self._max_bytes and self._entries:
+            key, entry_size = self._entries.popitem(last=False)
+            self._total_bytes -= entry_size
+            retval.append(key)
+        return retval
+
+    def clear(self):
+        """Removes all thumbnails from the cache"""
+        with self._lock:
+            shutil.rmtree(self._folder, ignore_errors=True)
+            self._entries = OrderedDict()
+            self._total_bytes = 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,189 @@
+"""Background service for generating image thumbnails off of the GUI thread"""
+import logging
+import os
+from collections import OrderedDict
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QSize, Signal, Slot
+from qtpy.QtGui import QImage
+from friendlypics2.misc.image_decoder import decode_thumbnail, thumbnail_pixel_size
+from friendlypics2.misc import instrumentation
+
+#: Default bounding box for thumbnails, in logical pixels
+DEFAULT_THUMBNAIL_SIZE = QSize(100, 100)
+
+
+class _TaskSignals(QObject):
+    """Signals raised by thumbnail tasks. QRunnable is not a QObject so it can't own signals itself"""
+    finished = Signal(object, QImage, object)
+
+
+class ThumbnailTask(QRunnable):
+    """Unit of work that decodes a single thumbnail on a worker thread"""
+    def __init__(self, file_path, size, device_pixel_ratio, signals, cache=None):
+        """
+        Args:
+            file_path (pathlib.Path):
+                path to the image to generate a thumbnail for
+            size (QSize):
+                bounding box for the generated thumbnail, in logical pixels
+            device_pixel_ratio (float):
+                ratio of device pixels to logical pixels on the screen showing the thumbnail
+            signals (_TaskSignals):
+                object used to report the results back to the GUI thread
+            cache (DiskThumbnailCache):
+                optional persistent cache to load thumbnails from and save them to
+        """
+        super().__init__()
+        self._file_path = file_path
+        self._size = size
+        self._device_pixel_ratio = device_pixel_ratio
+        self._signals = signals
+        self._cache = cache
+
+    def run(self):
+        """Decodes the image. Executed on a worker thread from the pool"""
+        try:
+            stats = os.stat(self._file_path)
+        except OSError:
+            self._signals.finished.emit(self._file_path, QImage(), None)
+            return
+
+        pixel_size = thumbnail_pixel_size(self._size, self._device_pixel_ratio)
+        key = None
+        image = None
+        if self._cache:
+            key = self._cache.make_key(self._file_path, stats.st_size, stats.st_mtime_ns, pixel_size)
+            with instrumentation.span("thumbnail/disk_cache_get"):
+                image = self._cache.get(key)
+            instrumentation.count("thumbnail/disk_miss" if image is None else "thumbnail/disk_hit")
+        if image is None:
+            with instrumentation.span("thumbnail/decode"):
+                image = decode_thumbnail(self._file_path, pixel_size)
+            if key and not image.isNull():
+                with instrumentation.span("thumbnail/disk_cache_put"):
+                    self._cache.put(key, image)
+        image.setDevicePixelRatio(self._device_pixel_ratio)
+        self._signals.finished.emit(self._file_path, image, stats.st_mtime_ns)
+
+
+class ThumbnailLoader(QObject):
+    """Generates thumbnails asynchronously using a pool of worker threads
+
+    Requests are held in a bounded queue and handed to the thread pool no faster than it
+    can consume them. When the queue overflows the oldest requests are discarded, since
+    those typically belong to images that have already been scrolled out of view. The
+    most recent requests are serviced first for the same reason.
+    """
+    #: Signal emitted on the GUI thread when a thumbnail has been generated. Provides the
+    #: path of the source image, the generated thumbnail, which will be a null image
+    #: if the source could not be decoded, and the modification time of the source image
+    #: in nanoseconds, which will be None if the source could not be found
+    thumbnail_ready = Signal(object, QImage, object)
+
+    def __init__(self, worker_count, queue_size, cache=None, parent=None):
+        """
+        Args:
+            worker_count (int):
+                maximum number of thumbnails to decode in parallel
+            queue_size (int):
+                maximum number of pending requests to hold before discarding old ones
+            cache (DiskThumbnailCache):
+                optional persistent cache used to avoid regenerating thumbnails
+            parent (QObject):
+                optional Qt object that owns this loader
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._cache = cache
+        self._worker_count = max(1, worker_count)
+        self._queue_size = max(1, queue_size)
+        self._thumbnail_size = QSize(DEFAULT_THUMBNAIL_SIZE)
+        self._device_pixel_ratio = 1.0
+        self._pending = OrderedDict()
+        self._active = set()
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self._worker_count)
+
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._task_finished)
+
+    @property
+    def thumbnail_size(self):
+        """QSize: bounding box for all thumbnails generated by this loader"""
+        return self._thumbnail_size
+
+    @thumbnail_size.setter
+    def thumbnail_size(self, value):
+        self._thumbnail_size = QSize(value)
+
+    @property
+    def device_pixel_ratio(self):
+        """float: ratio of device pixels to logical pixels on the screen showing the thumbnails.
+        Thumbnails are decoded at their logical size multiplied by this ratio."""
+        return self._device_pixel_ratio
+
+    @device_pixel_ratio.setter
+    def device_pixel_ratio(self, value):
+        self._device_pixel_ratio = value
+
+    @property
+    def worker_count(self):
+        """int: maximum number of thumbnails decoded in parallel"""
+        return self._worker_count
+
+    @property
+    def pending_count(self):
+        """int: number of requests waiting to be processed, including those in progress"""
+        return len(self._pending) + len(self._active)
+
+    def request(self, file_path):
+        """Queues a request to generate a thumbnail for an image
+
+        Repeated requests for the same image are coalesced, so it is safe to call this
+        every time a view asks for a thumbnail that isn't available yet
+
+        Args:
+            file_path (pathlib.Path):
+                path to the image to generate a thumbnail for
+        """
+        if file_path in self._active:
+            return
+        if file_path in self._pending:
+            self._pending.move_to_end(file_path)
+            return
+
+        self._pending[file_path] = None
+        while len(self._pending) > self._queue_size:
+            dropped, _ = self._pending.popitem(last=False)
+            self._log.debug(f"Thumbnail queue full, discarding request for {dropped}")
+        self._dispatch()
+
+    def clear(self):
+        """Discards all pending requests. Thumbnails already being decoded will still be reported"""
+        self._pending.clear()
+
+    def shutdown(self):
+        """Discards all pending requests and waits for active tasks to finish"""
+        self.clear()
+        self._pool.waitForDone()
+
+    def _dispatch(self):
+        """Hands pending requests to the thread pool while there are idle workers"""
+        while self._pending and len(self._active) < self._worker_count:
+            file_path, _ = self._pending.popitem(last=True)
+            self._active.add(file_path)
+            self._pool.start(ThumbnailTask(
+                file_path, self._thumbnail_size, self._device_pixel_ratio, self._signals, self._cache))
+
+    @Slot(object, QImage, object)
+    def _task_finished(self, file_path, image, mtime):
+        """Callback for when a worker thread has finished generating a thumbnail"""
+        self._active.discard(file_path)
+        if image.isNull():
+            self._log.debug(f"Unable to generate thumbnail for {file_path}")
+        self.thumbnail_ready.emit(file_path, image, mtime)
+        self._dispatch()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,159 @@
+"""Service for prioritizing thumbnail generation based on what the user can currently see"""
+import heapq
+import logging
+from collections import OrderedDict
+from qtpy.QtCore import QObject, Slot
+from qtpy.QtGui import QImage
+
+
+class ThumbnailScheduler(QObject):
+    """Decides which thumbnails to generate next based on the rows that are visible in a view
+
+    Requests are held here and only handed to the loader when it has idle workers, so
+    the order in which thumbnails are generated can be changed right up until decoding
+    starts. Requests closest to the visible rows are serviced first, and requests that
+    drift too far out of view are discarded. The caller can also request thumbnails for
+    a margin of rows above and below the visible rows so they are ready before the user
+    scrolls to them.
+    """
+    def __init__(self, loader, prefetch_rows, queue_size, parent=None):
+        """
+        Args:
+            loader (ThumbnailLoader):
+                service used to generate the thumbnails
+            prefetch_rows (int):
+                number of rows above and below the visible rows to generate thumbnails for
+            queue_size (int):
+                maximum number of pending requests to hold before discarding the
+                ones furthest from view
+            parent (QObject):
+                optional Qt object that owns this scheduler
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._loader = loader
+        self._prefetch_rows = max(0, prefetch_rows)
+        self._queue_size = max(1, queue_size)
+        self._visible = None
+        self._pending = OrderedDict()
+        # priority, path and row of the pending requests, ordered so the most urgent comes first.
+        # Requests that have since been coalesced, discarded or dispatched are skipped when popped.
+        self._heap = list()
+        self._loader.thumbnail_ready.connect(self._thumbnail_ready)
+
+    @property
+    def prefetch_rows(self):
+        """int: number of rows above and below the visible rows to generate thumbnails for"""
+        return self._prefetch_rows
+
+    @property
+    def visible_range(self):
+        """tuple (int, int): first and last visible rows, or None if they haven't been reported yet"""
+        return self._visible
+
+    @property
+    def prefetch_range(self):
+        """tuple (int, int):
+        first and last rows that thumbnails should be generated for, including the prefetch
+        margin. None if the visible rows haven't been reported yet."""
+        if self._visible is None:
+            return None
+        first, last = self._visible
+        return max(0, first - self._prefetch_rows), last + self._prefetch_rows
+
+    @property
+    def pending_count(self):
+        """int: number of requests waiting to be handed to the loader"""
+        return len(self._pending)
+
+    def request(self, file_path, row):
+        """Queues a request to generate a thumbnail for an image
+
+        Repeated requests for the same image are coalesced, with the most recently
+        reported row used to prioritize the request. When the queue is full the oldest
+        requests are discarded.
+
+        Args:
+            file_path (pathlib.Path):
+                path to the image to generate a thumbnail for
+            row (int):
+                row in the view where the image is shown
+        """
+        self._pending.pop(file_path, None)
+        self._pending[file_path] = row
+        heapq.heappush(self._heap, (self._priority(row), file_path, row))
+        # Views request thumbnails as they paint each row, so the oldest requests are the
+        # ones most likely to have scrolled out of view since
+        while len(self._pending) > self._queue_size:
+            dropped = next(iter(self._pending))
+            del self._pending[dropped]
+            self._log.debug(f"Thumbnail queue full, discarding request for {dropped}")
+        if len(self._heap) > 2 * self._queue_size:
+            self._rebuild_heap()
+        self._dispatch()
+
+    def set_visible_range(self, first, last):
+        """Updates the range of rows visible to the user, discarding any pending requests
+        for rows that are outside of the visible range and its prefetch margin
+
+        Args:
+            first (int): first visible row
+            last (int): last visible row
+        """
+        self._visible = (first, last)
+        low, high = self.prefetch_range
+        stale = [cur_path for cur_path, cur_row in self._pending.items() if not low <= cur_row <= high]
+        for cur_path in stale:
+            del self._pending[cur_path]
+        if stale:
+            self._log.debug(f"Cancelled {len(stale)} thumbnail requests that scrolled out of view")
+        # the priority of every request depends on the visible rows
+        self._rebuild_heap()
+
+    def clear(self):
+        """Discards all pending requests and stops receiving notifications from the loader"""
+        self._pending.clear()
+        self._heap = list()
+        self._loader.thumbnail_ready.disconnect(self._thumbnail_ready)
+
+    def _priority(self, row):
+        """Ranks a row by its distance from the visible rows. Lower values are more urgent.
+
+        Args:
+            row (int): row to rank
+
+        Returns:
+            tuple: sort key for the row
+        """
+        if self._visible is None:
+            return 0, row
+        first, last = self._visible
+        if first <= row <= last:
+            return 0, row - first
+        # rows just below the view come before those just above, since most scrolling is downwards
+        if row > last:
+            return 1, 2 * (row - last) - 1
+        return 1, 2 * (first - row)
+
+    def _rebuild_heap(self):
+        """Helper method that ranks all pending requests again, dropping those that are no longer pending"""
+        self._heap = [(self._priority(cur_row), cur_path, cur_row) for cur_path, cur_row in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    def _dispatch(self):
+        """Hands the most urgent pending requests to the loader while it has idle workers"""
+        while self._pending and self._loader.pending_count < self._loader.worker_count:
+            _, file_path, row = heapq.heappop(self._heap)
+            if self._pending.get(file_path) != row:
+                continue
+            del self._pending[file_path]
+            self._loader.request(file_path)
+
+    @Slot(object, QImage, object)
+    def _thumbnail_ready(self, _file_path, _image, _mtime):
+        """Callback for when the loader finishes generating a thumbnail, freeing up a worker"""
+        self._dispatch()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
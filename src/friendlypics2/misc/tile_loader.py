@@ -0,0 +1,436 @@
+"""Background service for decoding large images a tile at a time, at several levels of detail
+
+Each image is described by an :class:`ImagePyramid`. Level 0 of the pyramid is the image
+at full resolution, and each level after that is half the size of the one before it, down
+to a level that fits in a single tile. Views request only the tiles they are showing, at
+the level closest to their zoom, so the full resolution image is never decoded as a whole.
+
+Tiles are decoded a row at a time, since decoders such as JPEG have to read through every
+row of the image above the area they are asked for.
+
+Formats that can't decode part of an image, such as PNG and TIFF, are decoded at full
+resolution whatever level is asked for, and the result scaled down. For these formats the
+full resolution bitmap is held in memory while a level is decoded, so images larger than
+REGIONLESS_SOURCE_LIMIT are not decoded at all. Each decode produces the tiles of the level
+asked for and of every coarser level, so zooming out never decodes the image again, and
+only one level of an image is decoded at a time. Their finest level is also limited to
+REGIONLESS_PIXEL_LIMIT, to bound the memory used by its tiles.
+"""
+import logging
+from collections import OrderedDict
+from qtpy.QtCore import QObject, QPoint, QRect, QRunnable, QSize, Qt, QThreadPool, Signal, Slot
+from qtpy.QtGui import QImageIOHandler, QImageReader, QTransform
+from friendlypics2.misc.image_decoder import decode_region
+from friendlypics2.misc import instrumentation
+
+#: Width and height of each tile, in pixels of its pyramid level
+TILE_SIZE = 512
+# Maximum number of pixels in the finest level decoded for formats that can't decode part of an image
+REGIONLESS_PIXEL_LIMIT = 32 * 1024 * 1024
+#: Maximum number of pixels in images whose format can't decode part of an image. These are
+#: always decoded at full resolution, using 4 bytes per pixel
+REGIONLESS_SOURCE_LIMIT = 48 * 1024 * 1024
+
+
+class ImagePyramid:
+    """Describes how an image is divided into tiles at each level of detail"""
+    def __init__(self, size, region_support=True, transformation=QImageIOHandler.TransformationNone):
+        """
+        Args:
+            size (QSize):
+                dimensions of the full resolution image, as stored in the file
+            region_support (bool):
+                True if the decoder for the image can decode part of the image at a time
+            transformation (QImageIOHandler.Transformations):
+                transformations needed to display the image upright
+        """
+        self._size = QSize(size)
+        self._region_support = region_support
+        self._transformation = transformation
+        self._level_count = 1
+        while max(self._size.width(), self._size.height()) > TILE_SIZE << (self._level_count - 1):
+            self._level_count += 1
+        self._min_level = 0
+        if not region_support:
+            while self._min_level < self._level_count - 1 and \
+                    self._level_area(self._min_level) > REGIONLESS_PIXEL_LIMIT:
+                self._min_level += 1
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Reads the layout of an image from its header, without decoding it
+
+        Args:
+            file_path (pathlib.Path): path to the image
+
+        Returns:
+            ImagePyramid: layout of the image, or None if the image could not be read
+        """
+        reader = QImageReader(str(file_path))
+        size = reader.size()
+        if not size.isValid() or size.isEmpty():
+            return None
+        return cls(size, reader.supportsOption(QImageIOHandler.ClipRect), reader.transformation())
+
+    def _level_area(self, level):
+        """int: number of pixels in the given level of the pyramid"""
+        size = self.level_size(level)
+        return size.width() * size.height()
+
+    @property
+    def size(self):
+        """QSize: dimensions of the full resolution image, as stored in the file"""
+        return QSize(self._size)
+
+    @property
+    def display_size(self):
+        """QSize: dimensions of the full resolution image once it is displayed upright"""
+        return self._size.transposed() if self._transformation & QImageIOHandler.TransformationRotate90 \
+            else QSize(self._size)
+
+    @property
+    def region_support(self):
+        """bool: True if tiles may be decoded without decoding the rest of the level they belong to"""
+        return self._region_support
+
+    @property
+    def decodable(self):
+        """bool: False if the image is too large to decode without decoding part of it at a time"""
+        return self._region_support or self._size.width() * self._size.height() <= REGIONLESS_SOURCE_LIMIT
+
+    @property
+    def level_count(self):
+        """int: number of levels in the pyramid. The last level fits in a single tile"""
+        return self._level_count
+
+    @property
+    def min_level(self):
+        """int: finest level of detail that may be decoded"""
+        return self._min_level
+
+    def display_transform(self):
+        """Calculates the transformation that displays the image upright
+
+        Returns:
+            QTransform: maps coordinates in the image as stored in the file to coordinates
+            in the upright image
+        """
+        width = self._size.width()
+        height = self._size.height()
+        retval = QTransform()
+        if self._transformation & QImageIOHandler.TransformationMirror:
+            retval = retval * QTransform(-1, 0, 0, 1, width, 0)
+        if self._transformation & QImageIOHandler.TransformationFlip:
+            retval = retval * QTransform(1, 0, 0, -1, 0, height)
+        if self._transformation & QImageIOHandler.TransformationRotate90:
+            retval = retval * QTransform(0, 1, -1, 0, height, 0)
+        return retval
+
+    def level_size(self, level):
+        """Calculates the dimensions of the image at a given level of the pyramid
+
+        Args:
+            level (int): level of the pyramid
+
+        Returns:
+            QSize: dimensions of the level, rounded up
+        """
+        scale = 1 << level
+        return QSize(-(-self._size.width() // scale), -(-self._size.height() // scale))
+
+    def level_for_scale(self, scale):
+        """Finds the level of the pyramid to draw the image from at a given scale
+
+        Args:
+            scale (float): number of screen pixels per pixel of the full resolution image
+
+        Returns:
+            int: the smallest level whose resolution is at least the given scale
+        """
+        level = 0
+        while level < self._level_count - 1 and scale <= 0.5 / (1 << level):
+            level += 1
+        return max(level, self._min_level)
+
+    def tile_grid(self, level):
+        """Calculates the number of tiles in a given level of the pyramid
+
+        Args:
+            level (int): level of the pyramid
+
+        Returns:
+            tuple (int, int): number of columns and rows of tiles
+        """
+        size = self.level_size(level)
+        return -(-size.width() // TILE_SIZE), -(-size.height() // TILE_SIZE)
+
+    def tile_rect(self, level, column, row):
+        """Calculates the area of a level of the pyramid covered by a tile
+
+        Args:
+            level (int): level of the pyramid
+            column (int): column of the tile
+            row (int): row of the tile
+
+        Returns:
+            QRect: area covered by the tile, in pixels of the level
+        """
+        rect = QRect(column * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        return rect.intersected(QRect(QPoint(0, 0), self.level_size(level)))
+
+    def tiles_in(self, level, rect):
+        """Finds the tiles of a level of the pyramid that cover part of the image
+
+        Args:
+            level (int): level of the pyramid
+            rect (QRectF): area of the full resolution image, as stored in the file
+
+        Returns:
+            list (tuple (int, int)): column and row of each tile overlapping the area
+        """
+        columns, rows = self.tile_grid(level)
+        span = TILE_SIZE << level
+        first_column = max(0, int(rect.left() // span))
+        last_column = min(columns - 1, int(rect.right() // span))
+        first_row = max(0, int(rect.top() // span))
+        last_row = min(rows - 1, int(rect.bottom() // span))
+        return [(cur_column, cur_row)
+                for cur_row in range(first_row, last_row + 1)
+                for cur_column in range(first_column, last_column + 1)]
+
+
+class _TileSignals(QObject):
+    """Signals raised by tile tasks. QRunnable is not a QObject so it can't own signals itself"""
+    finished = Signal(object, object, object)
+
+
+class TileTask(QRunnable):
+    """Unit of work that decodes a row of tiles on a worker thread. For formats that can't
+    decode part of an image, decodes an entire level and every coarser level instead"""
+    def __init__(self, file_path, pyramid, band, columns, signals):
+        """
+        Args:
+            file_path (pathlib.Path):
+                path to the image to decode
+            pyramid (ImagePyramid):
+                layout of the image
+            band (tuple (int, int)):
+                level of the pyramid and row of tiles to decode. The row is None to decode
+                every tile in the level and in all coarser levels
+            columns (set (int)):
+                columns of the tiles to decode within the row. Ignored when decoding a level
+            signals (_TileSignals):
+                object used to report the results back to the GUI thread
+        """
+        super().__init__()
+        self._file_path = file_path
+        self._pyramid = pyramid
+        self._band = band
+        self._columns = columns
+        self._signals = signals
+
+    def run(self):
+        """Decodes the tiles. Executed on a worker thread from the pool"""
+        level, row = self._band
+        if row is None:
+            results = self._decode_levels(level)
+        else:
+            results = self._decode_row(level, row)
+        instrumentation.count("viewer/tiles_decoded", len(results))
+        self._signals.finished.emit(self._file_path, self._band, results)
+
+    def _decode_row(self, level, row):
+        """Helper method that decodes the requested tiles in a row
+
+        Args:
+            level (int): level of the pyramid the row belongs to
+            row (int): row of tiles to decode
+
+        Returns:
+            list (tuple (tuple, QImage)): key and image of each tile
+        """
+        # decoding the span between the first and last tile costs little more than
+        # decoding the tiles alone, so do it in one pass
+        first = min(self._columns)
+        last = max(self._columns)
+        clip = self._pyramid.tile_rect(level, first, row).united(self._pyramid.tile_rect(level, last, row))
+        with instrumentation.span("viewer/decode_tiles"):
+            image = decode_region(self._file_path, self._pyramid.level_size(level), clip)
+        if image.isNull():
+            return list()
+        return self._split(image, level, [(cur_column, row) for cur_column in range(first, last + 1)],
+                           clip.topLeft())
+
+    def _decode_levels(self, level):
+        """Helper method that decodes every tile in a level, and derives the tiles of every
+        coarser level from it so the image doesn't need to be decoded again for them
+
+        Args:
+            level (int): finest level of the pyramid to decode
+
+        Returns:
+            list (tuple (tuple, QImage)): key and image of each tile
+        """
+        with instrumentation.span("viewer/decode_tiles"):
+            image = decode_region(self._file_path, self._pyramid.level_size(level))
+        retval = list()
+        for cur_level in range(level, self._pyramid.level_count):
+            if image.isNull():
+                break
+            if cur_level != level:
+                image = image.scaled(self._pyramid.level_size(cur_level), Qt.IgnoreAspectRatio,
+                                     Qt.SmoothTransformation)
+            columns, rows = self._pyramid.tile_grid(cur_level)
+            tiles = [(cur_column, cur_row) for cur_row in range(rows) for cur_column in range(columns)]
+            retval.extend(self._split(image, cur_level, tiles, QPoint(0, 0)))
+        return retval
+
+    def _split(self, image, level, tiles, origin):
+        """Helper method that cuts tiles out of a decoded part of a level
+
+        Args:
+            image (QImage): decoded part of the level
+            level (int): level of the pyramid the image belongs to
+            tiles (list (tuple (int, int))): column and row of each tile to cut out
+            origin (QPoint): position of the image within the level
+
+        Returns:
+            list (tuple (tuple, QImage)): key and image of each tile
+        """
+        return [((level, cur_column, cur_row),
+                 image.copy(self._pyramid.tile_rect(level, cur_column, cur_row).translated(-origin)))
+                for cur_column, cur_row in tiles]
+
+
+class TileLoader(QObject):
+    """Decodes the tiles of an image asynchronously using a pool of worker threads
+
+    Like the thumbnail loader, requests are queued and handed to the thread pool no faster
+    than it can consume them, and the most recent requests are serviced first. Views are
+    expected to clear the queue and request the tiles they need again whenever they move,
+    so tiles that have scrolled out of view are never decoded.
+    """
+    #: Signal emitted on the GUI thread when a batch of tiles has been decoded. Provides
+    #: the path to the image, and a list of the key and image of each tile. Keys are tuples
+    #: of the level, column and row of the tile. The list is empty if the image could not be decoded
+    tiles_ready = Signal(object, object)
+
+    def __init__(self, worker_count, parent=None):
+        """
+        Args:
+            worker_count (int):
+                maximum number of rows of tiles to decode in parallel
+            parent (QObject):
+                optional Qt object that owns this loader
+        """
+        super().__init__(parent)
+        self._log = logging.getLogger(__name__)
+        self._worker_count = max(1, worker_count)
+        self._file_path = None
+        self._pyramid = None
+        # columns requested for each band of tiles, keyed by level and row
+        self._pending = OrderedDict()
+        # columns being decoded for each band, keyed by image path, level and row
+        self._active = dict()
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self._worker_count)
+
+        self._signals = _TileSignals()
+        self._signals.finished.connect(self._task_finished)
+
+    @property
+    def pending_count(self):
+        """int: number of bands of tiles waiting to be decoded, including those in progress"""
+        return len(self._pending) + len(self._active)
+
+    def set_image(self, file_path, pyramid):
+        """Changes the image tiles are decoded from, discarding all pending requests.
+        Results for the previous image that are still being decoded will be reported.
+
+        Args:
+            file_path (pathlib.Path): path to the image
+            pyramid (ImagePyramid): layout of the image
+        """
+        self._file_path = file_path
+        self._pyramid = pyramid
+        self._pending.clear()
+
+    def request(self, level, column, row):
+        """Queues a request to decode a tile of the current image
+
+        Args:
+            level (int): level of the pyramid the tile belongs to
+            column (int): column of the tile
+            row (int): row of the tile
+        """
+        if not self._pyramid.region_support:
+            # decoding a level also decodes every coarser level
+            if any(cur_key[0] == self._file_path and cur_key[1] <= level for cur_key in self._active):
+                return
+            band = (level, None)
+        else:
+            band = (level, row)
+            active = self._active.get((self._file_path,) + band)
+            if active is not None and column in active:
+                return
+        columns = self._pending.get(band)
+        if columns is None:
+            columns = self._pending[band] = set()
+        else:
+            self._pending.move_to_end(band)
+        columns.add(column)
+        self._dispatch()
+
+    def clear(self):
+        """Discards all pending requests. Tiles already being decoded will still be reported"""
+        self._pending.clear()
+
+    def shutdown(self):
+        """Discards all pending requests and waits for active tasks to finish"""
+        self.clear()
+        self._pool.waitForDone()
+
+    def _dispatch(self):
+        """Hands pending requests to the thread pool while there are idle workers"""
+        while len(self._active) < self._worker_count:
+            # bands that are already being decoded wait for their task to finish
+            band = next((cur_band for cur_band in reversed(self._pending) if not self._busy(cur_band)), None)
+            if band is None:
+                return
+            columns = self._pending.pop(band)
+            self._active[(self._file_path,) + band] = columns
+            self._pool.start(TileTask(self._file_path, self._pyramid, band, columns, self._signals))
+
+    def _busy(self, band):
+        """Helper method that checks whether a band of the current image must wait for a task that is
+        already running
+
+        Args:
+            band (tuple (int, int)): level of the pyramid and row of tiles
+
+        Returns:
+            bool: True if the band must wait
+        """
+        if band[1] is not None:
+            return (self._file_path,) + band in self._active
+        # formats that can't decode part of an image hold the full resolution bitmap in memory
+        # while they are decoded, so only decode one level of the image at a time
+        return any(cur_key[0] == self._file_path for cur_key in self._active)
+
+    @Slot(object, object, object)
+    def _task_finished(self, file_path, band, tiles):
+        """Callback for when a worker thread has finished decoding a band of tiles"""
+        self._active.pop((file_path,) + band, None)
+        if not tiles:
+            self._log.debug(f"Unable to decode tiles {band} of {file_path}")
+        elif band[1] is None and file_path == self._file_path:
+            # the coarser levels were decoded along with this one
+            for cur_band in [cur for cur in self._pending if cur[0] >= band[0]]:
+                del self._pending[cur_band]
+        self.tiles_ready.emit(file_path, tiles)
+        self._dispatch()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    pass
@@ -0,0 +1,132 @@
+"""Compiles the Qt Designer forms in data/ui to Python modules in the forms sub package
+
+Building a form from generated code is much faster than parsing its XML at runtime, so
+:func:`friendlypics2.misc.gui_helpers.load_ui` uses the compiled version of a form when
+one exists that matches the current contents of the XML. Run this module whenever the
+forms are edited:
+
+    python -m friendlypics2.misc.ui_compiler
+
+Forms must be compiled with the version of pyside2-uic that matches the PySide2 version
+pinned in requirements.txt. Newer compilers generate code that relies on features of newer
+bindings, such as scoped enums, so the compiler version is part of the hash used to decide
+whether a compiled form is current.
+"""
+import hashlib
+import logging
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+# Command line for the Qt user interface compiler
+UIC_COMMAND = ["pyside2-uic"]
+#: Version of the Qt user interface compiler the compiled forms must be generated with
+UIC_VERSION = "5.15.0"
+# Location of the Qt Designer forms, relative to the root of the package
+FORMS_FOLDER = "data/ui"
+#: Suffix added to the name of each form to get the name of its compiled module
+MODULE_SUFFIX = "_ui"
+
+# Header added to each compiled form
+_HEADER = '''# pylint: skip-file
+# flake8: noqa
+"""Compiled version of {source}. Generated by friendlypics2.misc.ui_compiler, do not edit."""
+from qtpy.QtCore import *
+from qtpy.QtGui import *
+from qtpy.QtWidgets import *
+
+#: hash of the form this module was compiled from, used to detect when it is out of date
+UI_SOURCE_HASH = "{hash}"
+'''
+# Matches the imports in the generated code, which refer to a specific Qt binding. They are
+# replaced with wildcard imports from qtpy so the code works with any binding, including
+# those that keep some classes in different modules, such as QAction.
+_IMPORTS = re.compile(r"^from \w+\.Qt\w+ import (\([^)]*\)|.*)$\n", re.MULTILINE)
+# Matches the name of the class generated for a form
+_FORM_CLASS = re.compile(r"^class (Ui_\w+)\(", re.MULTILINE)
+
+
+def source_hash(ui_file, uic_version=UIC_VERSION):
+    """Generates a hash of the contents of a form, used to detect when its compiled version is out of date
+
+    Args:
+        ui_file (pathlib.Path): path to the form
+        uic_version (str): version of the Qt user interface compiler the form is compiled with
+
+    Returns:
+        str: hash of the form
+    """
+    return hashlib.sha1(f"{uic_version}\n".encode("utf-8") + ui_file.read_bytes()).hexdigest()
+
+
+def find_uic():
+    """list (str): command line for the Qt user interface compiler. None if it could not be found"""
+    if shutil.which(UIC_COMMAND[0]):
+        return UIC_COMMAND
+    return None
+
+
+def uic_version(uic):
+    """Gets the version of the Qt user interface compiler
+
+    Args:
+        uic (list (str)): command line for the Qt user interface compiler
+
+    Returns:
+        str: version reported by the compiler, such as 5.15.0
+    """
+    output = subprocess.run(uic + ["--version"], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return output.split()[-1]
+
+
+def compile_form(uic, ui_file, output_folder, version=UIC_VERSION):
+    """Compiles a single form
+
+    Args:
+        uic (list (str)): command line for the Qt user interface compiler
+        ui_file (pathlib.Path): path to the form to compile
+        output_folder (pathlib.Path): folder to write the compiled form to
+        version (str): version of the Qt user interface compiler
+
+    Returns:
+        pathlib.Path: path to the compiled form
+    """
+    code = subprocess.run(uic + [str(ui_file)], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    class_name = _FORM_CLASS.search(code).group(1)
+    code = _IMPORTS.sub("", code).replace("# -*- coding: utf-8 -*-\n", "")
+    header = _HEADER.format(source=f"{FORMS_FOLDER}/{ui_file.name}", hash=source_hash(ui_file, version))
+    output_file = output_folder.joinpath(ui_file.stem + MODULE_SUFFIX + ".py")
+    output_file.write_text(f"{header}{code.rstrip()}\n\n\n#: class that builds the form\nFORM_CLASS = {class_name}\n")
+    return output_file
+
+
+def main():
+    """Compiles all forms used by the application
+
+    Returns:
+        int: return code to report back to the shell with
+    """
+    logging.basicConfig(level=logging.INFO)
+    log = logging.getLogger(__name__)
+    uic = find_uic()
+    if uic is None:
+        log.error("Unable to find the Qt user interface compiler. Install PySide2 to get pyside2-uic.")
+        return 1
+    version = uic_version(uic)
+    if version != UIC_VERSION:
+        log.error(f"Forms must be compiled with pyside2-uic {UIC_VERSION} but found {version}. "
+                  "Install the packages listed in requirements.txt.")
+        return 1
+
+    package_folder = Path(__file__).parents[1]
+    output_folder = package_folder.joinpath("forms")
+    for cur_file in sorted(package_folder.joinpath(FORMS_FOLDER).glob("*.ui")):
+        output_file = compile_form(uic, cur_file, output_folder, version)
+        log.info(f"Compiled {cur_file.name} to {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 """Command line interface to the project"""
 import sys
+from friendlypics2.batch import BATCH_COMMANDS, run_batch
 from friendlypics2.main import run
 
 
 def main():
     """primary entry point method"""
+    if len(sys.argv) > 1 and sys.argv[1] in BATCH_COMMANDS:
+        sys.exit(run_batch(sys.argv[1:]))
     sys.exit(run(sys.argv))
 
 
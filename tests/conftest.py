@@ -0,0 +1,19 @@
+import time
+import pytest
+from qtpy.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait_until(qapp):
+    def _wait_until(condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "timed out waiting for background work"
+            qapp.processEvents()
+            time.sleep(0.01)
+    return _wait_until
@@ -0,0 +1,43 @@
+import pytest
+from friendlypics2.misc import app_settings
+from friendlypics2.misc.app_settings import AppSettings
+
+
+@pytest.fixture
+def settings_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_settings, "user_config_dir", lambda *_: str(tmp_path))
+    return tmp_path
+
+
+def test_save_round_trip(settings_folder):
+    settings = AppSettings()
+    settings.library_max_depth = 3
+    settings.pinterest_user = "someone"
+    settings.save()
+
+    loaded = AppSettings()
+    assert loaded.library_max_depth == 3
+    assert loaded.pinterest_user == "someone"
+    assert not loaded.modified
+    assert [cur.name for cur in settings_folder.iterdir()] == ["appsettings.yml"]
+
+
+def test_unchanged_settings_are_not_rewritten(settings_folder):
+    settings = AppSettings()
+    assert settings.modified
+    settings.library_max_depth = 5
+    settings.save()
+    settings.path.write_text(settings.path.read_text() + "# edited\n")
+
+    settings = AppSettings()
+    settings.library_max_depth = settings.library_max_depth
+    settings.data = dict(settings.data)
+    assert not settings.modified
+    settings.save()
+    assert settings.path.read_text().endswith("# edited\n")
+
+    settings.library_max_depth += 1
+    assert settings.modified
+    settings.save()
+    assert not settings.modified
+    assert not settings.path.read_text().endswith("# edited\n")
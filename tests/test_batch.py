@@ -0,0 +1,72 @@
+import io
+import pytest
+from PIL import Image
+from friendlypics2 import batch
+from friendlypics2.batch import Progress, run_batch, FAILED, PROCESSED, SKIPPED
+from friendlypics2.misc import app_settings
+from friendlypics2.misc.catalog import Catalog
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_settings, "user_config_dir", lambda *_: str(tmp_path / "config"))
+    monkeypatch.setattr(batch, "default_catalog_path", lambda: tmp_path / "data" / "catalog.db")
+    monkeypatch.setattr(batch, "default_cache_folder", lambda: tmp_path / "cache" / "thumbnails")
+    folder = tmp_path / "library"
+    (folder / "2020").mkdir(parents=True)
+    for cur_name, cur_colour in [("a.jpg", (250, 10, 10)), ("b.png", (10, 250, 10)), ("2020/c.jpg", (10, 10, 250))]:
+        Image.new("RGB", (640, 480), cur_colour).save(folder / cur_name)
+    (folder / "2020" / "broken.jpg").write_bytes(b"not an image")
+    (folder / "notes.txt").write_text("ignored")
+    return folder
+
+
+def _summary(capsys):
+    return capsys.readouterr().out.strip().splitlines()[-1]
+
+
+def test_index_library_and_resume(library, tmp_path, capsys):
+    assert run_batch(["index", str(library), "-j", "1"]) == 0
+    assert "indexed 4, skipped 0, failed 0 of 4 images" in _summary(capsys)
+    records = Catalog(tmp_path / "data" / "catalog.db").list_folder(library, recursive=True)
+    assert sorted(cur.path for cur in records) == sorted(
+        str(library / cur) for cur in ["a.jpg", "b.png", "2020/c.jpg", "2020/broken.jpg"])
+
+    # only images that changed since the previous run are indexed again
+    Image.new("RGB", (320, 240)).save(library / "a.jpg")
+    assert run_batch(["index", str(library), "-j", "1", "--resume"]) == 0
+    assert "indexed 1, skipped 3, failed 0 of 4 images" in _summary(capsys)
+
+
+def test_build_thumbnails_and_resume(library, tmp_path, capsys):
+    assert run_batch(["thumbs", str(library), "-j", "1"]) == 1
+    assert "generated 3, skipped 0, failed 1 of 4 images" in _summary(capsys)
+    assert len([cur for cur in (tmp_path / "cache" / "thumbnails").rglob("*") if cur.is_file()]) == 3
+
+    assert run_batch(["thumbs", str(library), "-j", "2", "--resume"]) == 1
+    assert "generated 0, skipped 3, failed 1 of 4 images" in _summary(capsys)
+
+    (library / "2020" / "broken.jpg").unlink()
+    assert run_batch(["thumbs", str(library), "-j", "1", "--resume"]) == 0
+    assert "generated 0, skipped 3, failed 0 of 3 images" in _summary(capsys)
+
+
+def test_missing_folder(tmp_path, capsys):
+    assert run_batch(["index", str(tmp_path / "missing")]) == 2
+    assert "is not a folder" in capsys.readouterr().err
+
+
+def test_progress_reports(monkeypatch):
+    monkeypatch.setattr(batch, "REPORT_INTERVAL", 0)
+    output = io.StringIO()
+    progress = Progress("indexed", 4, output)
+    for cur_outcome in [PROCESSED, SKIPPED, FAILED]:
+        progress.update(cur_outcome)
+    progress.summary(completed=False)
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 4
+    assert lines[2].startswith("3 of 4 images (75.0%), ")
+    assert lines[3].startswith("Interrupted in ")
+    assert ": indexed 1, skipped 1, failed 1 of 4 images (" in lines[3]
+    assert (progress.done, progress.failed) == (3, 1)
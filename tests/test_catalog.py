@@ -0,0 +1,88 @@
+import os
+from friendlypics2.dialogs.main_window import ImageModel
+from friendlypics2.misc.catalog import Catalog, CatalogRecord, CatalogUpdater
+from friendlypics2.misc.library_walker import LibraryWalker
+from friendlypics2.misc.thumbnail_cache import MemoryThumbnailCache
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader
+
+
+def _record(path):
+    return CatalogRecord(str(path), 100, 12345, 640, 480, "jpeg", None, None, 1)
+
+
+def test_list_folder(tmp_path):
+    root = tmp_path / "photos"
+    catalog = Catalog(tmp_path / "catalog.db")
+    catalog.update([
+        _record(root / "a.jpg"),
+        _record(root / "2020" / "b.jpg"),
+        _record(root / "2020" / "01" / "c.jpg"),
+        _record(tmp_path / "photos2" / "d.jpg"),
+    ])
+
+    assert [cur.path for cur in catalog.list_folder(root)] == [str(root / "a.jpg")]
+    recursive = sorted(cur.path for cur in catalog.list_folder(root, recursive=True))
+    assert recursive == sorted([
+        str(root / "a.jpg"),
+        str(root / "2020" / "b.jpg"),
+        str(root / "2020" / "01" / "c.jpg"),
+    ])
+
+
+def test_update_and_remove(tmp_path):
+    catalog = Catalog(tmp_path / "catalog.db")
+    catalog.update([_record(tmp_path / "a.jpg"), _record(tmp_path / "b.jpg")])
+    catalog.update([_record(tmp_path / "a.jpg")._replace(size=200)])
+    catalog.remove([str(tmp_path / "b.jpg")])
+
+    records = catalog.list_folder(tmp_path)
+    assert len(records) == 1
+    assert records[0].size == 200
+    assert os.path.exists(tmp_path / "catalog.db")
+
+
+def test_update_only_purges_visited_folders(qapp, wait_until, tmp_path):
+    root = tmp_path / "photos"
+    for cur_path in ["a.jpg", "sub/b.jpg", "sub/deeper/c.jpg", ".git/d.jpg"]:
+        root.joinpath(cur_path).parent.mkdir(parents=True, exist_ok=True)
+        root.joinpath(cur_path).write_bytes(b"data")
+    catalog = Catalog(tmp_path / "catalog.db")
+    catalog.update([_record(root / cur_path) for cur_path in
+                    ["a.jpg", "gone.jpg", "sub/b.jpg", "sub/gone.jpg", "sub/deeper/c.jpg", ".git/d.jpg"]])
+
+    walker = LibraryWalker(root, 1, [".git"], 2)
+    found = list()
+    walker.files_found.connect(found.extend)
+    finished = list()
+    walker.finished.connect(finished.append)
+    walker.start()
+    wait_until(lambda: finished)
+    assert sorted(walker.visited_folders) == [root, root / "sub"]
+
+    updater = CatalogUpdater(catalog)
+    updated = list()
+    updater.finished.connect(updated.append)
+    updater.start(root, True, found, walker.visited_folders)
+    wait_until(lambda: updated)
+    # images beyond the depth limit or in excluded folders weren't seen, but may still exist
+    remaining = sorted(cur.path for cur in catalog.list_folder(root, recursive=True))
+    assert remaining == sorted(str(root / cur_path) for cur_path in
+                               ["a.jpg", "sub/b.jpg", "sub/deeper/c.jpg", ".git/d.jpg"])
+
+
+def test_model_scans_folder_when_catalog_is_unavailable(qapp, wait_until, tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for cur in range(3):
+        (folder / f"img{cur}.jpg").touch()
+    # the catalog can't be created inside a regular file
+    (tmp_path / "data").touch()
+    catalog = Catalog(tmp_path / "data" / "catalog.db")
+    model = ImageModel(folder, ThumbnailLoader(1, 10), MemoryThumbnailCache(1024 * 1024), catalog=catalog)
+    finished = list()
+    model.scan_finished.connect(finished.append)
+    model.start_scan()
+    wait_until(lambda: finished)
+    assert finished == [True]
+    assert model.file_paths == [folder / f"img{cur}.jpg" for cur in range(3)]
+    model.close()
@@ -0,0 +1,27 @@
+from friendlypics2.misc.file_types import FileClassifier
+
+
+def test_classify_by_extension(tmp_path):
+    classifier = FileClassifier()
+    # known extensions are classified without reading the file, so it needn't exist
+    assert classifier.classify("a.JPG", str(tmp_path / "a.JPG")) == "jpeg"
+    assert classifier.classify("b.nef", str(tmp_path / "b.nef")) == "raw"
+    assert classifier.classify("a.xmp", str(tmp_path / "a.xmp")) is None
+    assert classifier.classify(".DS_Store", str(tmp_path / ".DS_Store")) is None
+
+
+def test_classify_by_content(tmp_path):
+    png = tmp_path / "image"
+    png.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 32)
+    junk = tmp_path / "junk.dat"
+    junk.write_bytes(b"not an image")
+
+    classifier = FileClassifier()
+    assert classifier.classify(png.name, str(png)) == "png"
+    assert classifier.classify(junk.name, str(junk)) is None
+
+
+def test_format_filter(tmp_path):
+    classifier = FileClassifier(["jpeg"])
+    assert classifier.classify("a.jpg", str(tmp_path / "a.jpg")) == "jpeg"
+    assert classifier.classify("a.png", str(tmp_path / "a.png")) is None
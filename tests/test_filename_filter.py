@@ -0,0 +1,103 @@
+from pathlib import Path
+from qtpy.QtCore import QModelIndex
+from friendlypics2.dialogs.main_window import ImageModel
+from friendlypics2.misc.filename_filter import FilenameFilterModel, FilenameIndex, MAX_UNINDEXED
+from friendlypics2.misc.folder_scanner import FolderScanner
+from friendlypics2.misc.thumbnail_cache import MemoryThumbnailCache
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader
+
+
+def test_search_matches_substrings():
+    root = Path("/photos")
+    paths = [root / f"{2000 + cur % 3}" / f"IMG_{cur:05d}.jpg" for cur in range(MAX_UNINDEXED * 2)]
+    index = FilenameIndex(root)
+    index.add(paths)
+    # added after the trigrams were built, so found by checking each image in turn
+    late = root / "Holiday Été.JPG"
+    index.add([late, paths[0]])
+    assert len(index) == len(paths) + 1
+
+    for query in ["img_0012", "2001/img_0001", "01/", "g", "été", "IMG_001", "missing"]:
+        expected = {cur for cur in paths + [late] if query.lower() in str(cur.relative_to(root)).lower()}
+        assert set(index.paths(index.search(query))) == expected
+
+    shorter = index.search("img_001")
+    assert index.search("img_0012", shorter).tolist() == index.search("img_0012").tolist()
+    assert index.ids([paths[5], root / "missing.jpg"]).tolist() == [5, -1]
+
+
+def test_filter_covers_rows_not_yet_exposed(qapp, wait_until, tmp_path):
+    for cur in range(1000):
+        (tmp_path / f"img{cur}.jpg").touch()
+    loader = ThumbnailLoader(1, 10)
+    model = ImageModel(tmp_path, loader, MemoryThumbnailCache(1024 * 1024), FolderScanner(tmp_path, batch_size=100))
+    proxy = FilenameFilterModel()
+    proxy.setSourceModel(model)
+    # filter while the scan is still adding batches, which get sorted once it completes
+    proxy.set_query("img1")
+    model.start_scan()
+    wait_until(lambda: not model.is_scanning)
+    assert model.rowCount(QModelIndex()) < model.max_count
+
+    while proxy.canFetchMore(QModelIndex()):
+        proxy.fetchMore(QModelIndex())
+    found = [model.path_for(proxy.mapToSource(proxy.index(cur))) for cur in range(proxy.rowCount())]
+    expected = [tmp_path / "img1.jpg"] + [tmp_path / f"img{cur}.jpg" for cur in range(10, 20)] + \
+        [tmp_path / f"img{cur}.jpg" for cur in range(100, 200)]
+    assert found == expected
+
+    proxy.set_query("img19")
+    assert proxy.rowCount() == 11
+    model.close()
+
+
+def test_filter_follows_images_removed_out_of_view(qapp, wait_until, tmp_path):
+    for cur in range(1000):
+        (tmp_path / f"img{cur}.jpg").touch()
+    model = ImageModel(tmp_path, ThumbnailLoader(1, 10), MemoryThumbnailCache(1024 * 1024))
+    proxy = FilenameFilterModel()
+    proxy.setSourceModel(model)
+    model.start_scan()
+    wait_until(lambda: not model.is_scanning)
+    proxy.set_query("img9")
+    assert model.rowCount(QModelIndex()) < model.max_count
+
+    # rows the source model hasn't exposed yet change without it notifying views
+    (tmp_path / "img950.jpg").unlink()
+    (tmp_path / "img999.jpg").unlink()
+    wait_until(lambda: len(model.file_paths) == 998)
+
+    while proxy.canFetchMore(QModelIndex()):
+        proxy.fetchMore(QModelIndex())
+    found = [model.path_for(proxy.mapToSource(proxy.index(cur))) for cur in range(proxy.rowCount())]
+    expected = [cur for cur in model.file_paths if "img9" in cur.name]
+    assert len(expected) == 1 + 10 + 98
+    assert found == expected
+    model.close()
+
+
+def test_filter_switches_source_model(qapp, wait_until, tmp_path):
+    for cur_name in ["first", "second"]:
+        (tmp_path / cur_name).mkdir()
+        for cur in range(20):
+            (tmp_path / cur_name / f"{cur_name}{cur}.jpg").touch()
+    loader = ThumbnailLoader(1, 10)
+    cache = MemoryThumbnailCache(1024 * 1024)
+    first = ImageModel(tmp_path / "first", loader, cache)
+    second = ImageModel(tmp_path / "second", loader, cache)
+    proxy = FilenameFilterModel()
+    proxy.setSourceModel(first)
+    proxy.setSourceModel(second)
+    second.start_scan()
+    wait_until(lambda: not second.is_scanning)
+    proxy.set_query("second1")
+    assert proxy.rowCount() == 11
+
+    # the previous model no longer changes what the filter exposes
+    first.start_scan()
+    wait_until(lambda: not first.is_scanning)
+    assert proxy.rowCount() == 11
+    proxy.setSourceModel(None)
+    assert proxy.rowCount() == 0
+    first.close()
+    second.close()
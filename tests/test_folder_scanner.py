@@ -0,0 +1,46 @@
+from friendlypics2.misc.folder_scanner import FolderScanner
+
+
+def test_scanner_reports_all_images(qapp, wait_until, tmp_path):
+    expected = set()
+    for cur in range(250):
+        expected.add(tmp_path / f"img{cur}.jpg")
+        (tmp_path / f"img{cur}.jpg").touch()
+    (tmp_path / "notes.txt").touch()
+    (tmp_path / "sub.jpg").mkdir()
+
+    scanner = FolderScanner(tmp_path, batch_size=100)
+    batches = list()
+    scanner.files_found.connect(batches.append)
+    finished = list()
+    scanner.finished.connect(finished.append)
+    scanner.start()
+    assert scanner.is_running
+    wait_until(lambda: finished)
+
+    assert finished == [True]
+    assert not scanner.is_running
+    assert all(len(cur_batch) <= 100 for cur_batch in batches)
+    found = [cur_path for cur_batch in batches for cur_path in cur_batch]
+    assert len(found) == len(expected)
+    assert set(found) == expected
+    assert scanner.visited_folders == [tmp_path]
+
+
+def test_scanner_stops_reporting_once_cancelled(qapp, wait_until, tmp_path):
+    for cur in range(5000):
+        (tmp_path / f"img{cur}.jpg").touch()
+    scanner = FolderScanner(tmp_path, batch_size=10)
+    found = list()
+    scanner.files_found.connect(found.extend)
+    finished = list()
+    scanner.finished.connect(finished.append)
+    scanner.start()
+    scanner.cancel()
+    count = len(found)
+    wait_until(lambda: finished)
+
+    # batches the worker thread reported before noticing the cancellation are discarded
+    assert finished == [False]
+    assert len(found) == count < 5000
+    assert scanner.visited_folders == []
@@ -0,0 +1,10 @@
+import importlib
+import pytest
+from friendlypics2.misc.gui_helpers import resource_path
+from friendlypics2.misc.ui_compiler import FORMS_FOLDER, MODULE_SUFFIX, source_hash
+
+
+@pytest.mark.parametrize("ui_file", sorted(resource_path(FORMS_FOLDER).glob("*.ui")), ids=lambda cur: cur.name)
+def test_compiled_forms_are_current(ui_file):
+    module = importlib.import_module(f"friendlypics2.forms.{ui_file.stem}{MODULE_SUFFIX}")
+    assert module.UI_SOURCE_HASH == source_hash(ui_file), "run python -m friendlypics2.misc.ui_compiler"
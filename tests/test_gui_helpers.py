@@ -0,0 +1,57 @@
+import logging
+import threading
+from qtpy.QtWidgets import QPlainTextEdit
+from friendlypics2.misc.gui_helpers import GuiLogger
+
+
+def _log_from_threads(logger, thread_count, message_count):
+    def _worker(thread_id):
+        for cur in range(message_count):
+            logger.info(f"thread {thread_id} message {cur}")
+    threads = [threading.Thread(target=_worker, args=(cur,)) for cur in range(thread_count)]
+    for cur_thread in threads:
+        cur_thread.start()
+    for cur_thread in threads:
+        cur_thread.join()
+
+
+def test_logger_forwards_records_from_other_threads(qapp, wait_until):
+    widget = QPlainTextEdit()
+    widget.show()
+    handler = GuiLogger(widget)
+    handler.setFormatter(logging.Formatter("%(message)s|%(threadName)s"))
+    logger = logging.getLogger("friendlypics2.tests.gui_logger")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        _log_from_threads(logger, 4, 25)
+        # nothing is shown until the GUI thread's timer runs
+        assert widget.toPlainText() == ""
+        wait_until(lambda: widget.blockCount() == 100)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    messages, thread_names = zip(*(cur.split("|") for cur in widget.toPlainText().splitlines()))
+    for cur_thread in range(4):
+        assert [cur for cur in messages if cur.startswith(f"thread {cur_thread} ")] == \
+            [f"thread {cur_thread} message {cur}" for cur in range(25)]
+    assert "MainThread" not in thread_names
+
+
+def test_logger_keeps_most_recent_records_while_hidden(qapp, wait_until):
+    widget = QPlainTextEdit()
+    handler = GuiLogger(widget, capacity=10)
+    logger = logging.getLogger("friendlypics2.tests.gui_logger_hidden")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        _log_from_threads(logger, 1, 25)
+        widget.show()
+        wait_until(lambda: widget.toPlainText())
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    assert widget.toPlainText().splitlines() == \
+        ["... 15 earlier messages discarded ..."] + [f"thread 0 message {cur}" for cur in range(15, 25)]
@@ -0,0 +1,84 @@
+import io
+import struct
+from PIL import Image
+from qtpy.QtCore import QSize
+from friendlypics2.misc.image_decoder import read_embedded_thumbnail, decode_thumbnail
+
+
+def _jpeg_bytes(width, height, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _exif_segment(thumbnail, orientation, width, height):
+    """Builds a little endian EXIF APP1 segment containing an embedded thumbnail"""
+    # layout: header(8) | IFD0 with 2 entries (30) | Exif IFD with 2 entries (30) | IFD1 with 2 entries (30) | thumb
+    ifd0 = 8
+    exif_ifd = ifd0 + 30
+    ifd1 = exif_ifd + 30
+    thumb_offset = ifd1 + 30
+    tiff = b"II*\x00" + struct.pack("<I", ifd0)
+    tiff += struct.pack("<H", 2)
+    tiff += struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+    tiff += struct.pack("<HHII", 0x8769, 4, 1, exif_ifd)
+    tiff += struct.pack("<I", ifd1)
+    tiff += struct.pack("<H", 2)
+    tiff += struct.pack("<HHII", 0xA002, 4, 1, width)
+    tiff += struct.pack("<HHII", 0xA003, 4, 1, height)
+    tiff += struct.pack("<I", 0)
+    tiff += struct.pack("<H", 2)
+    tiff += struct.pack("<HHII", 0x0201, 4, 1, thumb_offset)
+    tiff += struct.pack("<HHII", 0x0202, 4, 1, len(thumbnail))
+    tiff += struct.pack("<I", 0)
+    tiff += thumbnail
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _write_image(path, thumb_size, orientation=1, image_size=(1600, 1200)):
+    thumbnail = _jpeg_bytes(*thumb_size, (0, 255, 0))
+    main = _jpeg_bytes(*image_size, (255, 0, 0))
+    path.write_bytes(main[:2] + _exif_segment(thumbnail, orientation, *image_size) + main[2:])
+
+
+def test_embedded_thumbnail(tmp_path):
+    image_file = tmp_path / "test.jpg"
+    _write_image(image_file, (160, 120))
+
+    image = read_embedded_thumbnail(image_file, QSize(100, 100))
+    assert image is not None
+    assert image.size() == QSize(100, 75)
+    assert image.pixelColor(50, 37).green() > 200
+
+
+def test_embedded_thumbnail_orientation(tmp_path):
+    image_file = tmp_path / "test.jpg"
+    _write_image(image_file, (160, 120), orientation=6)
+
+    image = read_embedded_thumbnail(image_file, QSize(100, 100))
+    assert image.size() == QSize(75, 100)
+
+
+def test_embedded_thumbnail_too_small(tmp_path):
+    image_file = tmp_path / "test.jpg"
+    _write_image(image_file, (160, 120))
+
+    assert read_embedded_thumbnail(image_file, QSize(200, 200)) is None
+    image = decode_thumbnail(image_file, QSize(200, 200))
+    assert image.size() == QSize(200, 150)
+    assert image.pixelColor(100, 75).red() > 200
+
+
+def test_letterboxed_thumbnail_ignored(tmp_path):
+    image_file = tmp_path / "test.jpg"
+    _write_image(image_file, (160, 120), image_size=(1800, 1200))
+
+    assert read_embedded_thumbnail(image_file, QSize(100, 100)) is None
+
+
+def test_no_exif_data(tmp_path):
+    image_file = tmp_path / "test.jpg"
+    image_file.write_bytes(_jpeg_bytes(640, 480, (0, 0, 255)))
+
+    assert read_embedded_thumbnail(image_file, QSize(100, 100)) is None
@@ -0,0 +1,43 @@
+from pathlib import Path
+from friendlypics2.misc.catalog import CatalogRecord
+from friendlypics2.misc.image_sort import natural_key, sort_key, group_label, SORT_NAME, SORT_TAKEN, SORT_SIZE, \
+    SORT_DIMENSIONS, GROUP_DAY, GROUP_MONTH, GROUP_NONE
+
+
+def _record(path, size=100, width=640, height=480, taken=None):
+    return CatalogRecord(str(path), size, 1600000000 * 10 ** 9, width, height, "jpeg", taken, None, 1)
+
+
+def test_natural_order():
+    names = ["IMG_10.jpg", "img_9.jpg", "IMG_100.jpg", "a.jpg", "IMG_9b.jpg"]
+    assert sorted(names, key=lambda name: natural_key(Path(name))) == \
+        ["a.jpg", "img_9.jpg", "IMG_9b.jpg", "IMG_10.jpg", "IMG_100.jpg"]
+
+
+def test_sort_keys():
+    paths = [Path(f"/photos/{cur}.jpg") for cur in "abcd"]
+    metadata = [
+        _record(paths[0], size=300, taken="2021-03-14 10:00:00"),
+        _record(paths[1], size=100, width=None, height=None, taken="2020-01-01 08:00:00"),
+        _record(paths[2], size=200, width=4000, height=3000),
+        None,
+    ]
+    items = list(zip(paths, metadata))
+
+    def _order(order):
+        return [cur[0].stem for cur in sorted(items, key=lambda cur: sort_key(order, natural_key(cur[0]), cur[1]))]
+
+    assert _order(SORT_NAME) == ["a", "b", "c", "d"]
+    # images without a date taken fall back to their modification date, from 2020-09-13
+    assert _order(SORT_TAKEN) == ["b", "c", "a", "d"]
+    assert _order(SORT_SIZE) == ["b", "c", "a", "d"]
+    assert _order(SORT_DIMENSIONS) == ["a", "c", "b", "d"]
+
+
+def test_group_labels():
+    record = _record("/photos/a.jpg", taken="2021-03-14 10:00:00")
+    assert group_label(SORT_TAKEN, GROUP_MONTH, record) == "March 2021"
+    assert "14" in group_label(SORT_TAKEN, GROUP_DAY, record)
+    assert group_label(SORT_TAKEN, GROUP_NONE, record) is None
+    assert group_label(SORT_NAME, GROUP_DAY, record) is None
+    assert group_label(SORT_TAKEN, GROUP_DAY, None) is None
@@ -0,0 +1,36 @@
+import json
+from friendlypics2.misc import instrumentation
+
+
+def test_disabled_collects_nothing():
+    instrumentation.clear()
+    instrumentation.set_enabled(False)
+    with instrumentation.span("test/span"):
+        pass
+    instrumentation.count("test/counter")
+    assert instrumentation.stats() == ([], [])
+
+
+def test_spans_counters_and_trace(tmp_path):
+    instrumentation.clear()
+    instrumentation.set_enabled(True)
+    try:
+        for cur in range(20):
+            instrumentation.record("test/span", 0, (cur + 1) * 1000000)
+        instrumentation.count("test/counter", 3)
+        instrumentation.count("test/counter")
+    finally:
+        instrumentation.set_enabled(False)
+
+    spans, counters = instrumentation.stats()
+    assert [(cur.name, cur.count) for cur in spans] == [("test/span", 20)]
+    assert spans[0].p50 == 0.011
+    assert spans[0].p95 == 0.02
+    assert spans[0].max == 0.02
+    assert [(cur.name, cur.total) for cur in counters] == [("test/counter", 4)]
+
+    instrumentation.write_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert len([cur for cur in events if cur["ph"] == "X"]) == 20
+    assert [cur["args"]["total"] for cur in events if cur["ph"] == "C"] == [3, 4]
+    instrumentation.clear()
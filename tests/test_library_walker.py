@@ -0,0 +1,29 @@
+import pytest
+from friendlypics2.misc.file_types import FileClassifier
+from friendlypics2.misc.library_walker import LibraryWalker, walk_library
+
+
+def test_walk_library(tmp_path):
+    for cur_path in ["b.jpg", "a.png", "notes.txt", "sub/c.jpg", "sub/deeper/d.jpg", ".git/e.jpg"]:
+        tmp_path.joinpath(cur_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(cur_path).write_bytes(b"data")
+
+    found = list(walk_library(tmp_path, 1, [".git"], FileClassifier()))
+    assert found == [tmp_path / "a.png", tmp_path / "b.jpg", tmp_path / "sub" / "c.jpg"]
+
+
+def test_library_walker_reports_throughput(qapp, wait_until, tmp_path):
+    for cur_path in ["a.jpg", "b.jpg", "sub/c.jpg", "sub/deeper/d.jpg"]:
+        tmp_path.joinpath(cur_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(cur_path).write_bytes(b"data")
+    walker = LibraryWalker(tmp_path, 1, list(), 2)
+    assert walker.stats is None
+    finished = list()
+    walker.finished.connect(finished.append)
+    walker.start()
+    wait_until(lambda: finished)
+
+    stats = walker.stats
+    assert (stats.folders, stats.files) == (2, 3)
+    assert stats.file_rate == pytest.approx(3 / stats.elapsed)
+    assert walker.stats == stats
@@ -0,0 +1,71 @@
+from qtpy.QtCore import QModelIndex
+from friendlypics2.dialogs.main_window import ImageModel
+from friendlypics2.misc.folder_scanner import FolderScanner
+from friendlypics2.misc.thumbnail_cache import MemoryThumbnailCache
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader
+
+
+def _make_folder(folder, count):
+    folder.mkdir()
+    for cur in range(count):
+        (folder / f"img{cur}.jpg").touch()
+    return folder
+
+
+def test_closed_model_ignores_late_scan_results(qapp, wait_until, tmp_path):
+    folder_a = _make_folder(tmp_path / "a", 5000)
+    folder_b = _make_folder(tmp_path / "b", 5)
+    loader = ThumbnailLoader(1, 10)
+    cache = MemoryThumbnailCache(1024 * 1024)
+    scanner_a = FolderScanner(folder_a, batch_size=10)
+    model_a = ImageModel(folder_a, loader, cache, scanner_a)
+    model_a.start_scan()
+
+    # open the next folder while the first one is still being scanned
+    assert model_a.is_scanning
+    model_a.close()
+    count = model_a.max_count
+    events = list()
+    model_a.scan_progress.connect(lambda found: events.append(("progress", found)))
+    model_a.scan_finished.connect(lambda completed: events.append(("finished", completed)))
+    model_b = ImageModel(folder_b, loader, cache)
+    finished_b = list()
+    model_b.scan_finished.connect(finished_b.append)
+    model_b.start_scan()
+
+    wait_until(lambda: not scanner_a.is_running and finished_b)
+    qapp.processEvents()
+    assert events == []
+    assert model_a.max_count == count
+    assert finished_b == [True]
+    assert model_b.max_count == 5
+    model_b.close()
+
+
+def test_model_follows_changes_to_watched_folder(qapp, wait_until, tmp_path):
+    folder = _make_folder(tmp_path / "photos", 3)
+    model = ImageModel(folder, ThumbnailLoader(1, 10), MemoryThumbnailCache(1024 * 1024))
+    scans = list()
+    model.scan_finished.connect(scans.append)
+    model.start_scan()
+    wait_until(lambda: scans)
+
+    # a full rescan would report its progress and completion again
+    model.scan_progress.connect(scans.append)
+    changes = list()
+    model.images_changed.connect(changes.append)
+    removed = list()
+    model.rowsRemoved.connect(lambda _parent, first, last: removed.append((first, last)))
+
+    (folder / "img10.jpg").touch()
+    wait_until(lambda: changes)
+    assert changes == [4]
+    assert model.file_paths == [folder / f"img{cur}.jpg" for cur in [0, 1, 2, 10]]
+    assert model.rowCount(QModelIndex()) == 4
+
+    (folder / "img1.jpg").unlink()
+    wait_until(lambda: len(changes) == 2)
+    assert model.file_paths == [folder / f"img{cur}.jpg" for cur in [0, 2, 10]]
+    assert removed == [(1, 1)]
+    assert scans == [True]
+    model.close()
@@ -0,0 +1,45 @@
+import random
+import numpy as np
+from friendlypics2.misc.perceptual_hash import BKTree, hamming_distance, dhash_batch, phash_batch, \
+    find_duplicate_groups
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(1234)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    # add some near duplicates of the first few values
+    values += [cur ^ (1 << rng.randrange(64)) for cur in values[:20]]
+    tree = BKTree()
+    for cur_index, cur_value in enumerate(values):
+        tree.add(cur_value, cur_index)
+    assert len(tree) == len(values)
+
+    for cur_value in values[:50]:
+        expected = sorted(idx for idx, other in enumerate(values) if hamming_distance(cur_value, other) <= 4)
+        assert sorted(idx for _, idx in tree.search(cur_value, 4)) == expected
+
+
+def test_hashes_tolerate_small_changes():
+    rng = np.random.default_rng(42)
+    base = rng.integers(0, 256, size=(32, 32)).astype(np.float32)
+    brighter = np.clip(base + 10, 0, 255)
+    other = rng.integers(0, 256, size=(32, 32)).astype(np.float32)
+
+    phashes = phash_batch(np.stack([base, brighter, other]))
+    assert hamming_distance(phashes[0], phashes[1]) <= 2
+    assert hamming_distance(phashes[0], phashes[2]) > 10
+
+    dhashes = dhash_batch(np.stack([base[:8, :9], brighter[:8, :9], other[:8, :9]]))
+    assert dhashes[0] == dhashes[1] or hamming_distance(dhashes[0], dhashes[1]) <= 2
+    assert all(0 <= cur < (1 << 64) for cur in phashes + dhashes)
+
+
+def test_find_duplicate_groups():
+    hashes = [
+        ("a", 0b0000, 0b1111),
+        ("b", 0b0001, 0b1110),
+        ("c", 0b0011, 0b1100),
+        ("d", (1 << 64) - 1, 0),
+    ]
+    assert find_duplicate_groups(hashes, 1) == [["a", "b", "c"]]
+    assert find_duplicate_groups(hashes, 0) == []
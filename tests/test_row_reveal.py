@@ -0,0 +1,19 @@
+from friendlypics2.misc.row_reveal import RowRevealPolicy, MIN_BATCH
+
+
+def test_batch_grows_while_scrolling_quickly():
+    policy = RowRevealPolicy(100)
+    batches = [policy.next_batch(100000) for _ in range(4)]
+    assert batches == [100, 200, 400, 800]
+    assert policy.next_batch(50) == 50
+
+
+def test_batch_limited_by_layout_cost():
+    policy = RowRevealPolicy(20)
+    policy.record(100, 1.0)
+    for _ in range(5):
+        batch = policy.next_batch(100000)
+    # never fewer than a screens worth of rows, regardless of cost
+    assert batch == 20
+    assert policy.reveal_rate > 0
+    assert RowRevealPolicy(1).next_batch(100) == MIN_BATCH
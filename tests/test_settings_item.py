@@ -0,0 +1,34 @@
+from friendlypics2.dialogs.settings_dlg import SettingsItem, count_matches
+
+
+def test_children_are_created_on_demand():
+    root = SettingsItem("", {"view": {"sort_order": "name"}, "folders": {f"f{cur}": cur for cur in range(10)}})
+    assert root.childCount() == 0
+    assert root.total_children == 2
+
+    assert root.fetch_more(5) == 2
+    folders = root.child(1)
+    assert folders.path == ("folders",)
+    assert folders.childCount() == 0
+
+    assert folders.fetch_more(4) == 4
+    assert folders.fetch_more(4, {("folders", "f5"): 99}) == 4
+    assert folders.can_fetch_more()
+    assert [folders.child(cur).row() for cur in range(8)] == list(range(8))
+    assert folders.child(5).data(1) == 99
+    assert folders.child(7).path == ("folders", "f7")
+
+
+def test_filter_keeps_matching_settings_and_their_groups():
+    data = {"view": {"sort_order": "name", "group_by": "date"},
+            "folders": {"/photos/a": {"sort_order": "date"}, "/photos/b": {"scroll": 3}},
+            "library": {"recursive": True}}
+    root = SettingsItem("", data, filter_text="sort")
+    root.fetch_more(10)
+    assert [cur.data(0) for cur in root.child_items] == ["view", "folders"]
+
+    folders = root.child(1)
+    folders.fetch_more(10)
+    assert [cur.data(0) for cur in folders.child_items] == ["/photos/a"]
+    assert count_matches(data, "sort") == 2
+    assert count_matches(data, "photos") == 4
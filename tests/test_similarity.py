@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image
+from friendlypics2.misc.catalog import Catalog
+from friendlypics2.misc.similarity import EmbeddingStore, SimilarityFinder, embed_batch, EMBEDDING_PIXELS, EMBEDDING_SIZE, \
+    INITIAL_CAPACITY
+
+
+def _solid(red, green, blue):
+    return np.tile(np.array([red, green, blue], np.uint8), (EMBEDDING_PIXELS, EMBEDDING_PIXELS, 1))
+
+
+def test_embeddings_compare_colours():
+    vectors = embed_batch(np.stack([_solid(250, 10, 10), _solid(230, 30, 20), _solid(10, 10, 250)]))
+    assert vectors.shape == (3, EMBEDDING_SIZE)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_store_nearest_and_reload(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.random((INITIAL_CAPACITY + 10, EMBEDDING_SIZE)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    stats = SimpleNamespace(st_size=100, st_mtime_ns=12345)
+    paths = [tmp_path / f"{cur}.jpg" for cur in range(len(vectors))]
+
+    store = EmbeddingStore(tmp_path / "embeddings.npy", Catalog(tmp_path / "catalog.db"))
+    store.add([(cur_path, stats, cur_vector) for cur_path, cur_vector in zip(paths, vectors)])
+    assert store.count == len(vectors)
+    assert store.is_current(paths[5], stats)
+
+    results = store.nearest(vectors[5], 3, exclude=paths[5])
+    expected = np.argsort(-(vectors @ vectors[5]))[1:4]
+    assert [cur_path for cur_path, _ in results] == [paths[cur] for cur in expected]
+
+    reloaded = EmbeddingStore(tmp_path / "embeddings.npy", Catalog(tmp_path / "catalog.db"))
+    assert np.allclose(reloaded.get(paths[-1]), vectors[-1])
+    assert reloaded.nearest(vectors[0], 1)[0][0] == paths[0]
+
+
+def test_store_nearest_limited_to_candidates(tmp_path):
+    rng = np.random.default_rng(11)
+    vectors = rng.random((INITIAL_CAPACITY + 10, EMBEDDING_SIZE)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    stats = SimpleNamespace(st_size=100, st_mtime_ns=12345)
+    paths = [tmp_path / f"{cur}.jpg" for cur in range(len(vectors))]
+    last = len(vectors) - 1
+    # a few candidates are copied out of the matrix, most of the library is scored in place
+    sparse = set(range(0, last, 7)) | {last}
+    dense = set(range(len(vectors))) - set(range(3, last, 7))
+
+    for cur_name, cur_rows in [("sparse", sparse), ("dense", dense)]:
+        store = EmbeddingStore(tmp_path / f"{cur_name}.npy", Catalog(tmp_path / f"{cur_name}.db"))
+        store.add([(cur_path, stats, cur_vector) for cur_path, cur_vector in zip(paths[:last], vectors[:last])])
+        rows = sorted(cur_rows - {0, last})
+        candidates = frozenset(str(paths[cur]) for cur in cur_rows)
+        expected = [paths[rows[cur]] for cur in np.argsort(-(vectors[rows] @ vectors[0]))[:5]]
+        assert [cur_path for cur_path, _ in store.nearest(vectors[0], 5, paths[0], candidates)] == expected
+
+        # candidates analysed after the first search are found by later ones
+        store.add([(paths[last], stats, vectors[0])])
+        assert store.nearest(vectors[0], 1, paths[0], candidates)[0][0] == paths[last]
+
+
+def test_search_skips_deleted_images_and_other_folders(qapp, wait_until, tmp_path):
+    folder = tmp_path / "photos"
+    other = tmp_path / "other"
+    folder.mkdir()
+    other.mkdir()
+    # solid colours in the same histogram bin have identical embeddings, so give each
+    # image a different share of red to make the order of the results unambiguous
+    colours = {folder / "a.png": 64, folder / "b.png": 56, other / "d.png": 32, folder / "c.png": 0}
+    for cur_path, cur_red in colours.items():
+        image = Image.new("RGB", (64, 48), (10, 10, 250))
+        image.paste((250, 10, 10), (0, 0, cur_red, 48))
+        image.save(cur_path)
+
+    store = EmbeddingStore(tmp_path / "embeddings.npy", Catalog(tmp_path / "catalog.db"))
+    finder = SimilarityFinder(store, 10)
+    results = list()
+    finder.finished.connect(results.append)
+    finder.start(folder / "a.png", list(colours))
+    wait_until(lambda: results)
+    assert [cur_path for cur_path, _ in results[0]] == [folder / "b.png", other / "d.png", folder / "c.png"]
+
+    (folder / "b.png").unlink()
+    candidates = frozenset(str(folder / cur) for cur in ["a.png", "b.png", "c.png"])
+    finder.start(folder / "a.png", list(), candidates=candidates)
+    wait_until(lambda: len(results) == 2)
+    assert [cur_path for cur_path, _ in results[1]] == [folder / "c.png"]
@@ -0,0 +1,106 @@
+import os
+from qtpy.QtCore import QSize, Qt
+from qtpy.QtGui import QImage
+from friendlypics2.misc.thumbnail_cache import DiskThumbnailCache, MemoryThumbnailCache
+
+
+def _make_thumbnail():
+    image = QImage(32, 32, QImage.Format_RGB32)
+    image.fill(Qt.red)
+    return image
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryThumbnailCache(300)
+    cache.put("a", "icon-a", 100)
+    cache.put("b", "icon-b", 100)
+    cache.put("c", "icon-c", 100)
+    assert cache.get("a") == "icon-a"
+
+    cache.put("d", "icon-d", 100)
+    assert "b" not in cache
+    assert cache.get("a") == "icon-a"
+    assert cache.get("c") == "icon-c"
+    assert cache.total_bytes == 300
+
+
+def test_memory_cache_respects_byte_budget():
+    cache = MemoryThumbnailCache(250)
+    cache.put("a", "icon-a", 100)
+    cache.put("b", "icon-b", 200)
+    assert "a" not in cache
+    assert len(cache) == 1
+
+    cache.put("b", "icon-b", 50)
+    assert cache.total_bytes == 50
+
+
+def test_memory_cache_hit_and_miss_counts():
+    cache = MemoryThumbnailCache(1000)
+    cache.put("a", "icon-a", 100)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_disk_cache_evicts_least_recently_used(qapp, tmp_path):
+    folder = tmp_path / "cache"
+    cache = DiskThumbnailCache(folder, 1024 * 1024)
+    cache.put("aa01", _make_thumbnail())
+    entry_size = cache.total_bytes
+
+    cache = DiskThumbnailCache(folder, int(entry_size * 3.5))
+    cache.put("bb02", _make_thumbnail())
+    cache.put("cc03", _make_thumbnail())
+    assert cache.get("aa01") is not None
+
+    cache.put("dd04", _make_thumbnail())
+    assert "bb02" not in cache
+    assert not (folder / "bb" / "bb02").exists()
+    assert all(cur_key in cache for cur_key in ["aa01", "cc03", "dd04"])
+    assert cache.total_bytes == entry_size * 3
+
+    # usage history is kept in the modification times of the entries, so it survives between runs
+    for offset, cur_key in enumerate(["cc03", "aa01", "dd04"]):
+        os.utime(folder / cur_key[:2] / cur_key, (1000000 + offset, 1000000 + offset))
+    reloaded = DiskThumbnailCache(folder, int(entry_size * 3.5))
+    reloaded.put("ee05", _make_thumbnail())
+    assert "cc03" not in reloaded
+    assert reloaded.get("aa01") is not None
+
+
+def test_disk_cache_ignores_modified_sources(qapp, tmp_path):
+    source = tmp_path / "image.jpg"
+    source.write_bytes(b"original")
+    cache = DiskThumbnailCache(tmp_path / "cache", 1024 * 1024)
+    size = QSize(100, 100)
+    key = cache.key_for(source, size)
+    cache.put(key, _make_thumbnail())
+    assert cache.get(cache.key_for(source, size)) is not None
+    assert cache.key_for(source, QSize(200, 200)) not in cache
+
+    stats = source.stat()
+    os.utime(source, ns=(stats.st_atime_ns, stats.st_mtime_ns + 1000000000))
+    assert cache.key_for(source, size) not in cache
+
+    source.write_bytes(b"modified contents")
+    os.utime(source, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+    assert cache.key_for(source, size) not in cache
+    assert cache.key_for(tmp_path / "missing.jpg", size) is None
+
+
+def test_disk_cache_clear(qapp, tmp_path):
+    folder = tmp_path / "cache"
+    cache = DiskThumbnailCache(folder, 1024 * 1024)
+    cache.put("aa01", _make_thumbnail())
+    cache.put("bb02", _make_thumbnail())
+    cache.clear()
+    assert cache.total_bytes == 0
+    assert "aa01" not in cache
+    assert cache.get("bb02") is None
+    assert not folder.exists()
+
+    cache.put("cc03", _make_thumbnail())
+    assert DiskThumbnailCache(folder, 1024 * 1024).get("cc03") is not None
@@ -0,0 +1,44 @@
+from PIL import Image
+from qtpy.QtCore import QSize
+from friendlypics2.misc.thumbnail_cache import DiskThumbnailCache
+from friendlypics2.misc.thumbnail_loader import ThumbnailLoader, DEFAULT_THUMBNAIL_SIZE
+
+
+def test_loader_generates_thumbnails(qapp, wait_until, tmp_path):
+    image_path = tmp_path / "photo.jpg"
+    Image.new("RGB", (800, 600), (200, 100, 50)).save(image_path)
+    broken_path = tmp_path / "broken.jpg"
+    broken_path.write_bytes(b"not an image")
+
+    loader = ThumbnailLoader(2, 10)
+    loader.thumbnail_size = QSize(100, 100)
+    results = dict()
+    loader.thumbnail_ready.connect(lambda file_path, image, mtime: results.update({file_path: (image, mtime)}))
+    loader.request(image_path)
+    loader.request(broken_path)
+    loader.request(tmp_path / "missing.jpg")
+    wait_until(lambda: len(results) == 3)
+
+    image, mtime = results[image_path]
+    assert image.size() == QSize(100, 75)
+    assert mtime == image_path.stat().st_mtime_ns
+    assert results[broken_path][0].isNull()
+    assert results[tmp_path / "missing.jpg"][0].isNull()
+    assert results[tmp_path / "missing.jpg"][1] is None
+    assert loader.pending_count == 0
+
+
+def test_loader_saves_thumbnails_to_disk_cache(qapp, wait_until, tmp_path):
+    image_path = tmp_path / "photo.png"
+    Image.new("RGB", (400, 400), (20, 200, 50)).save(image_path)
+    cache = DiskThumbnailCache(tmp_path / "cache", 1024 * 1024)
+    loader = ThumbnailLoader(1, 10, cache)
+    loader.device_pixel_ratio = 2.0
+    results = list()
+    loader.thumbnail_ready.connect(lambda file_path, image, mtime: results.append(image))
+    loader.request(image_path)
+    wait_until(lambda: results)
+
+    assert results[0].size() == QSize(2 * DEFAULT_THUMBNAIL_SIZE.width(), 2 * DEFAULT_THUMBNAIL_SIZE.height())
+    assert results[0].devicePixelRatio() == 2.0
+    assert cache.key_for(image_path, results[0].size()) in cache
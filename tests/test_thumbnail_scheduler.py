@@ -0,0 +1,75 @@
+from pathlib import Path
+from qtpy.QtCore import QObject, Signal
+from qtpy.QtGui import QImage
+from friendlypics2.misc.thumbnail_scheduler import ThumbnailScheduler
+
+
+class _FakeLoader(QObject):
+    """Thumbnail loader with a single worker that only finishes when told to"""
+    thumbnail_ready = Signal(object, QImage, object)
+
+    def __init__(self):
+        super().__init__()
+        self.worker_count = 1
+        self.pending_count = 1
+        self.requested = list()
+
+    def request(self, file_path):
+        self.pending_count += 1
+        self.requested.append(file_path)
+
+    def finish_all(self):
+        while self.pending_count:
+            self.pending_count -= 1
+            self.thumbnail_ready.emit(Path("done.jpg"), QImage(), None)
+
+
+def _path(row):
+    return Path(f"img{row}.jpg")
+
+
+def test_visible_rows_are_dispatched_before_prefetch_rows():
+    loader = _FakeLoader()
+    scheduler = ThumbnailScheduler(loader, 5, 100)
+    scheduler.set_visible_range(10, 12)
+    for cur_row in [8, 13, 11, 10]:
+        scheduler.request(_path(cur_row), cur_row)
+    assert loader.requested == []
+    assert scheduler.pending_count == 4
+
+    loader.finish_all()
+    assert loader.requested == [_path(10), _path(11), _path(13), _path(8)]
+    assert scheduler.pending_count == 0
+
+
+def test_rows_scrolled_out_of_view_are_dropped():
+    loader = _FakeLoader()
+    scheduler = ThumbnailScheduler(loader, 2, 100)
+    for cur_row in range(30):
+        scheduler.request(_path(cur_row), cur_row)
+    assert scheduler.pending_count == 30
+
+    scheduler.set_visible_range(20, 25)
+    assert scheduler.prefetch_range == (18, 27)
+    assert scheduler.pending_count == 10
+
+    loader.finish_all()
+    assert loader.requested[:6] == [_path(cur_row) for cur_row in range(20, 26)]
+    assert sorted(loader.requested) == sorted(_path(cur_row) for cur_row in range(18, 28))
+
+
+def test_repeated_and_discarded_requests_are_dispatched_once():
+    loader = _FakeLoader()
+    scheduler = ThumbnailScheduler(loader, 0, 3)
+    scheduler.set_visible_range(10, 14)
+    scheduler.request(_path(1), 30)
+    for cur_row in range(10, 14):
+        scheduler.request(_path(cur_row), cur_row)
+    # moved into view after being discarded, and reported again at a new row
+    scheduler.request(_path(1), 40)
+    scheduler.request(_path(1), 14)
+    assert scheduler.pending_count == 3
+
+    loader.finish_all()
+    assert loader.requested == [_path(12), _path(13), _path(1)]
+    assert scheduler.pending_count == 0
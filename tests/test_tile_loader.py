@@ -0,0 +1,85 @@
+from PIL import Image
+from qtpy.QtCore import QPointF, QRect, QRectF, QSize
+from qtpy.QtGui import QImageIOHandler
+from friendlypics2.misc.tile_loader import ImagePyramid, TileLoader, TILE_SIZE, REGIONLESS_PIXEL_LIMIT, \
+    REGIONLESS_SOURCE_LIMIT
+
+
+def test_pyramid_levels():
+    pyramid = ImagePyramid(QSize(12000, 8400))
+    assert pyramid.level_count == 6
+    assert pyramid.level_size(0) == QSize(12000, 8400)
+    assert pyramid.level_size(3) == QSize(1500, 1050)
+    assert pyramid.level_size(5) == QSize(375, 263)
+    assert pyramid.tile_grid(0) == (24, 17)
+    assert pyramid.tile_grid(5) == (1, 1)
+    assert pyramid.tile_rect(0, 23, 16) == QRect(23 * TILE_SIZE, 16 * TILE_SIZE, 224, 208)
+
+
+def test_level_for_scale():
+    pyramid = ImagePyramid(QSize(12000, 8400))
+    assert pyramid.level_for_scale(2.0) == 0
+    assert pyramid.level_for_scale(0.75) == 0
+    assert pyramid.level_for_scale(0.5) == 1
+    assert pyramid.level_for_scale(0.3) == 1
+    assert pyramid.level_for_scale(0.01) == 5
+
+
+def test_regionless_formats_limit_finest_level():
+    pyramid = ImagePyramid(QSize(12000, 12000), region_support=False)
+    size = pyramid.level_size(pyramid.min_level)
+    assert pyramid.min_level == 2
+    assert size.width() * size.height() <= REGIONLESS_PIXEL_LIMIT
+    assert pyramid.level_for_scale(1.0) == 2
+
+
+def test_tiles_in_visible_area():
+    pyramid = ImagePyramid(QSize(4000, 3000))
+    assert pyramid.tiles_in(0, QRectF(600, 100, 500, 400)) == [(1, 0), (2, 0)]
+    assert pyramid.tiles_in(1, QRectF(-500, -500, 20000, 20000)) == \
+        [(cur_column, cur_row) for cur_row in range(3) for cur_column in range(4)]
+    assert pyramid.tiles_in(0, QRectF(-500, -500, 100, 100)) == []
+
+
+def test_display_transform_rotates_image_upright():
+    pyramid = ImagePyramid(QSize(400, 300), transformation=QImageIOHandler.TransformationRotate90)
+    assert pyramid.display_size == QSize(300, 400)
+    transform = pyramid.display_transform()
+    assert transform.map(QPointF(0, 0)) == QPointF(300, 0)
+    assert transform.map(QPointF(400, 300)) == QPointF(0, 400)
+
+
+def test_regionless_formats_limit_source_size():
+    assert ImagePyramid(QSize(12000, 12000)).decodable
+    assert ImagePyramid(QSize(8000, 6000), region_support=False).decodable
+    assert not ImagePyramid(QSize(12000, 8400), region_support=False).decodable
+    assert REGIONLESS_SOURCE_LIMIT < 12000 * 8400
+
+
+def test_regionless_formats_decode_coarser_levels_once(qapp, wait_until, tmp_path):
+    file_path = tmp_path / "image.png"
+    Image.new("RGB", (2000, 1500), (200, 100, 50)).save(file_path)
+    pyramid = ImagePyramid.from_file(file_path)
+    assert not pyramid.region_support
+    loader = TileLoader(4)
+    batches = list()
+    loader.tiles_ready.connect(lambda _path, tiles: batches.append(tiles))
+    loader.set_image(file_path, pyramid)
+    # requests for the same or coarser levels are covered by the level being decoded
+    loader.request(1, 0, 0)
+    loader.request(2, 0, 0)
+    loader.request(1, 1, 1)
+    wait_until(lambda: batches)
+    qapp.processEvents()
+    loader.shutdown()
+
+    assert len(batches) == 1
+    keys = [cur_key for cur_key, _ in batches[0]]
+    expected = [(cur_level, cur_column, cur_row) for cur_level in range(1, pyramid.level_count)
+                for cur_row in range(pyramid.tile_grid(cur_level)[1])
+                for cur_column in range(pyramid.tile_grid(cur_level)[0])]
+    assert keys == expected
+    for cur_key, cur_image in batches[0]:
+        assert cur_image.size() == pyramid.tile_rect(*cur_key).size()
+        assert cur_image.pixelColor(0, 0).getRgb()[:3] == (200, 100, 50)
+    assert loader.pending_count == 0